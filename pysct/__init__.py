@@ -11,6 +11,7 @@ __license__ = 'Apache 2.0'
 __copyright__ = 'Copyright © 2020, SAS Institute Inc., ' \
                 'Cary, NC, USA.  All Rights Reserved.'
 
+import importlib
 import logging
 import sys
 
@@ -20,8 +21,42 @@ if sys.version_info < (3, ):
          'This package only supports python 3.6 or higher.' % (sys.version_info.major, sys.version_info.minor),
          UserWarning, 2)
 
-from .datastep_translators import *
-from .nlp_translator import *
+from .dispatch import translate, score_code_type
+
+## module of each public function, imported on first use so a job translating one kind of
+## export only imports the translators it needs
+_LAZY = {
+    "DS_translate": "datastep_translators",
+    "DS_translate_multi": "datastep_translators",
+    "EPS_translate": "datastep_translators",
+    "nlp_sentiment_translate": "nlp_translator",
+    "nlp_category_translate": "nlp_translator",
+    "nlp_topics_translate": "nlp_translator",
+    "nlp_concepts_translate": "nlp_translator",
+    "nlp_pipeline_translate": "nlp_translator",
+    "DS_translate_numpy": "numpy_translator",
+    "batch_translate": "batch",
+    "TranslationCache": "cache",
+    "write_connection_pool": "connection_pool",
+    "write_async_module": "async_scoring"
+}
+
+__all__ = ["translate", "score_code_type"] + list(_LAZY)
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in _LAZY:
+            raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+        value = getattr(importlib.import_module("." + _LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY))
+else:
+    ## module level __getattr__ needs python 3.7
+    for name, module in _LAZY.items():
+        globals()[name] = getattr(importlib.import_module("." + module, __name__), name)
 
 # Prevent package from emitting log records unless consuming
 # application configures logging.
@@ -0,0 +1,8 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,153 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import textwrap
+import zlib
+
+## CAS import file type of the astore files found inside the exported .zip files
+_ASTORE_FILE_TYPES = {".sashdat": "HDAT",
+                      ".astore": "ASTORE"}
+
+##################################
+###### Astore helpers       ######
+##################################
+
+def find_astore_member(archives, preferred = ()):
+    """ Finds the astore file inside an exported .zip file.
+
+    Parameters
+    ----------
+    archives : zipfile.ZipFile
+        The opened .zip file
+    preferred : list
+        Member names to look for first, e.g. the astore name with the ".sashdat" extension
+
+    Returns
+    -------
+    str
+        The name of the zip member holding the astore.
+    """
+
+    members = archives.namelist()
+    by_basename = {os.path.basename(member): member for member in members}
+
+    for name in preferred:
+        if name in by_basename:
+            return by_basename[name]
+
+    for member in members:
+        if os.path.splitext(member)[1].lower() in _ASTORE_FILE_TYPES:
+            return member
+
+    raise Exception("No astore file (.astore or .sashdat) was found in {}, "
+                    "it must be inside the .zip file to be streamed".format(archives.filename))
+
+
+def astore_checksum(archives, preferred = ()):
+    """ Checksum of the astore inside an exported .zip file, its CRC-32 and size read from the zip
+    directory (nothing is decompressed). Returns `None` when the .zip file has no astore. """
+
+    try:
+        info = archives.getinfo(find_astore_member(archives, preferred))
+    except Exception:
+        return None
+
+    return "{:08x}{:x}".format(info.CRC, info.file_size)
+
+
+def file_checksum(path):
+    """ Checksum of an astore file on disk, as `astore_checksum` computes it, the file is read in chunks
+    to get its CRC-32. Returns `None` when the file is not there at translation time. """
+
+    if not os.path.isfile(path):
+        return None
+
+    crc = 0
+    with open(path, "rb") as f:
+        chunk = f.read(1024 ** 2)
+        while chunk:
+            crc = zlib.crc32(chunk, crc)
+            chunk = f.read(1024 ** 2)
+
+    return "{:08x}{:x}".format(crc & 0xffffffff, os.path.getsize(path))
+
+
+def _streamed_astore_upload_code(in_file, member, hostname,
+                                 astore_caslib = "astore_caslib",
+                                 astore_name = "astore_name",
+                                 chunk_size = 8 * 1024 ** 2):
+    """ Python code that uploads the astore streaming it straight out of the exported .zip file.
+    `astore_caslib` and `astore_name` are python expressions of the generated script. """
+
+    file_type = _ASTORE_FILE_TYPES.get(os.path.splitext(member)[1].lower(), "ASTORE")
+
+    return """## Uploading the astore straight from the exported .zip file, it is read and sent
+## in bounded chunks, nothing is extracted to disk nor held whole in memory
+import json
+import zipfile
+import requests
+
+astore_zip_file = \"{0}\" ## change if the .zip file was moved
+astore_member = \"{1}\"
+cas_rest_url = \"http://{2}:8777\" ## change to your CAS REST endpoint if needed
+
+class ZipMemberStream(object):
+    \"\"\" File like object read by requests, at most `chunk_size` bytes at a time. \"\"\"
+
+    def __init__(self, zip_file, member, chunk_size = {3}):
+        self.archives = zipfile.ZipFile(zip_file, "r")
+        self.member = self.archives.open(member)
+        self.len = self.archives.getinfo(member).file_size ## sent as Content-Length
+        self.chunk_size = chunk_size
+
+    def read(self, size = -1):
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        return self.member.read(size)
+
+    def close(self):
+        self.member.close()
+        self.archives.close()
+
+astore_stream = ZipMemberStream(astore_zip_file, astore_member)
+try:
+    response = requests.put(cas_rest_url + "/cas/sessions/" + conn._session + "/actions/table.upload",
+                            data = astore_stream,
+                            headers = {{"Content-Type": "application/octet-stream",
+                                       "JSON-Parameters": json.dumps({{
+                                           "casOut": {{"caslib": {4}, "name": {5}, "replace": True}},
+                                           "importOptions": {{"fileType": \"{6}\"}}}})}},
+                            auth = ('username', 'password')) ## use your own credentials
+    response.raise_for_status()
+finally:
+    astore_stream.close()
+
+""".format(os.path.abspath(in_file).replace("\\", "/"), member, hostname, chunk_size,
+           astore_caslib, astore_name, file_type)
+
+
+def _resident_astore_code(load_code, astore_caslib, astore_name, checksum = None):
+    """ Wraps the python code that loads or uploads an astore so that it only runs when the astore
+    is not in memory yet. With a `checksum` the in-memory table is named after it, so a table with
+    that name is this exact astore and identical astores of other exports share it. Without one the
+    astore is only looked up by `astore_name`, any table of that name is taken for it.
+    `astore_caslib` and `astore_name` are python expressions of the generated script. """
+
+    code = "## Model residency check: the astore is only loaded when it is not in memory yet\n"
+    if checksum is not None:
+        code += """astore_checksum = \"{0}\" ## CRC-32 and size of the astore when the code was translated
+{1} = "pysct_astore_" + astore_checksum ## identical astores share the same in-memory table
+""".format(checksum, astore_name)
+
+    code += """
+if conn.table.tableExists(caslib = {0}, name = {1}).exists > 0:
+    print("The astore " + {1} + " is already in memory, skipping the load")
+else:
+{2}
+    ## promoting to global scope so the next sessions find it in memory
+    conn.table.promote(caslib = {0}, name = {1})
+
+""".format(astore_caslib, astore_name, textwrap.indent(load_code.rstrip("\n"), "    "))
+
+    return code
@@ -0,0 +1,284 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import textwrap
+
+## python module written next to the generated scripts when `asynchronous = True`
+_ASYNC_MODULE = '''## asyncio CAS client, generated by pysct
+## The scripts written with `asynchronous = True` define an `async def score(cas = None)` coroutine
+## that calls the CAS REST API with aiohttp instead of SWAT, so hundreds of scoring jobs can share
+## one event loop. CAS runs one action at a time per session: run jobs concurrently, each with its
+## own session (the default), e.g. with `run_all`. Needs python 3.7 or higher (asyncio.run).
+# pip install aiohttp
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import zipfile
+
+import aiohttp
+
+
+class CASError(Exception):
+    pass
+
+
+def _rows(table):
+    """ Rows of a CAS REST result table as dicts. """
+    if not table:
+        return []
+    names = [column["name"] for column in table["schema"]]
+    return [dict(zip(names, row)) for row in table["rows"]]
+
+
+def _check(name, result):
+    disposition = result.get("disposition") or {{}}
+    if disposition.get("severity") == "Error":
+        raise CASError("{{}} failed: {{}}".format(name, disposition.get("formattedStatus") or disposition.get("reason")))
+    return result.get("results") or {{}}
+
+
+class Session(object):
+    """ A CAS session reached through the CAS REST API. """
+
+    def __init__(self, http, url, session):
+        self.http = http
+        self.url = url
+        self.session = session
+
+    async def action(self, _action, **parameters):
+        """ Runs a CAS action, e.g. `await cas.action("table.loadTable", ...)`, returns its results. """
+        async with self.http.post("{{}}/cas/sessions/{{}}/actions/{{}}".format(self.url, self.session, _action),
+                                  json = parameters) as response:
+            response.raise_for_status()
+            return _check(_action, await response.json(content_type = None))
+
+    async def head(self, caslib, name, rows = 5):
+        """ First rows of a table, as a list of dicts. """
+        results = await self.action("table.fetch", table = {{"caslib": caslib, "name": name}}, to = rows, index = False)
+        return _rows(results.get("Fetch"))
+
+    async def columns(self, caslib, name):
+        results = await self.action("table.columnInfo", table = {{"caslib": caslib, "name": name}})
+        return [row["Column"] for row in _rows(results.get("ColumnInfo"))]
+
+    async def table_exists(self, caslib, name):
+        results = await self.action("table.tableExists", caslib = caslib, name = name)
+        return results.get("exists", 0) > 0
+
+    async def upload(self, path, caslib, name, file_type, member = None, chunk_size = {chunk_size}):
+        """ Uploads a file, a member of a .zip file or `bytes` (e.g. CSV rows), sending it in bounded chunks. """
+
+        if isinstance(path, bytes):
+            size = len(path)
+        elif member is None:
+            size = os.path.getsize(path)
+        else:
+            with zipfile.ZipFile(path, "r") as archives:
+                size = archives.getinfo(member).file_size
+
+        async def chunks():
+            with contextlib.ExitStack() as stack:
+                if isinstance(path, bytes):
+                    f = io.BytesIO(path)
+                elif member is None:
+                    f = stack.enter_context(open(path, "rb"))
+                else:
+                    archives = stack.enter_context(zipfile.ZipFile(path, "r"))
+                    f = stack.enter_context(archives.open(member))
+                chunk = f.read(chunk_size)
+                while chunk:
+                    yield chunk
+                    chunk = f.read(chunk_size)
+
+        headers = {{"Content-Type": "application/octet-stream",
+                    "Content-Length": str(size),
+                    "JSON-Parameters": json.dumps({{
+                        "casOut": {{"caslib": caslib, "name": name, "replace": True}},
+                        "importOptions": {{"fileType": file_type}}}})}}
+        async with self.http.put("{{}}/cas/sessions/{{}}/actions/table.upload".format(self.url, self.session),
+                                 data = chunks(), headers = headers) as response:
+            response.raise_for_status()
+            return _check("table.upload", await response.json(content_type = None))
+
+
+@contextlib.asynccontextmanager
+async def connect(hostname, port = 8777, protocol = "http", username = None, password = None, session = None):
+    """ Opens a CAS session, ended on exit. An open `session` is used as is and left open. """
+
+    if session is not None:
+        yield session
+        return
+
+    url = "{{}}://{{}}:{{}}".format(protocol, hostname, port)
+    auth = aiohttp.BasicAuth(username, password) if username is not None else None
+    async with aiohttp.ClientSession(auth = auth) as http:
+        async with http.put(url + "/cas/sessions") as response:
+            response.raise_for_status()
+            session = (await response.json(content_type = None))["session"]
+        try:
+            yield Session(http, url, session)
+        finally:
+            async with http.delete(url + "/cas/sessions/" + session):
+                pass
+
+
+async def run_all(coroutines, limit = {limit}):
+    """ Runs scoring coroutines on the current event loop, at most `limit` at the same time. """
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+'''
+
+##################################
+###### asyncio scoring      ######
+##################################
+
+def write_async_module(out_dir = ".",
+                       module_name = "cas_async",
+                       limit = 16,
+                       chunk_size = 8 * 1024 ** 2,
+                       overwrite = False):
+    """ Writes the python module that the scripts generated with `asynchronous = True` import.
+    It opens CAS sessions, runs actions, fetches rows and uploads files through the CAS REST API
+    with aiohttp, and has `run_all` to score many jobs on the same event loop.
+
+    Parameters
+    ----------
+    out_dir : str
+        Directory of the generated scripts. Default: "."
+    module_name : str
+        Name of the module. Default: "cas_async"
+    limit : int
+        Default number of jobs `run_all` runs at the same time. Default: 16
+    chunk_size : int
+        Bytes sent at a time by uploads. Default: 8388608
+    overwrite : bool
+        If `False` an existing module is kept as is, it is only generated once. Default: `False`
+
+    Returns
+    -------
+    str
+        The module filepath.
+
+    Example
+    -------
+    write_async_module("/path/to/scripts")
+    """
+
+    ## the module and the scripts importing it use asyncio.run and other python 3.7 APIs
+    if sys.version_info < (3, 7):
+        raise Exception("The asyncio scripts need python 3.7 or higher, this is python {}.{}"
+                        .format(sys.version_info.major, sys.version_info.minor))
+
+    out_file = os.path.join(out_dir or ".", module_name + ".py")
+
+    if overwrite or not os.path.exists(out_file):
+        with open(out_file, "wt") as f:
+            f.write(_ASYNC_MODULE.format(limit = limit, chunk_size = chunk_size))
+
+    return out_file
+
+
+def _async_header_code(module_name = "cas_async"):
+    """ Imports of a script written with `asynchronous = True`, replaces the SWAT header. """
+
+    return """## asyncio scoring coroutine: the CAS REST API is called with aiohttp instead of SWAT, so the
+## script can run next to hundreds of others on one event loop ({0}.py, next to this file)
+# pip install aiohttp
+
+import asyncio
+
+import {0}
+
+""".format(module_name)
+
+
+def _async_score_code(hostname, body, tables, module_name = "cas_async"):
+    """ The `async def score(cas = None)` coroutine. `body` is the python code of the CAS calls,
+    awaiting `cas` methods, and `tables` the (caslib, name) python expressions of the tables whose
+    first rows are returned. """
+
+    returned = ",\n                ".join("{1}: await cas.head({0}, {1})".format(caslib, name)
+                                         for caslib, name in tables)
+
+    return """
+async def score(cas = None):
+    \"\"\" Runs the scoring and returns the first rows of the output tables by name. `cas` is an
+    open {0} session, when it is `None` a new one is opened and ended at the end. \"\"\"
+
+    async with {0}.connect(hostname = \"{1}\", ## change if needed
+{4}port = 8777,
+{4}protocol = "http",
+{4}username = "username", ## use your own credentials
+{4}password = "password",
+{4}session = cas) as cas:
+
+{2}
+        return {{{3}}}
+
+
+if __name__ == "__main__":
+    ## several jobs: asyncio.run({0}.run_all([score(), ...]))
+    print(asyncio.run(score()))
+""".format(module_name, hostname, textwrap.indent(body.strip("\n"), " " * 8), returned,
+           " " * len("    async with {}.connect(".format(module_name)))
+
+
+def _async_column_names_code(copyVars):
+    """ `column_names` for astore.score, `copyVars` is `None`, "ALL" or a list. """
+
+    if isinstance(copyVars, str):
+        copyVars = [copyVars]
+    if copyVars is None:
+        return "column_names = None\n"
+    if copyVars == ["ALL"]:
+        return "column_names = await cas.columns(in_caslib, in_castable)\n"
+    return "column_names = {}\n".format(list(copyVars))
+
+
+def _async_upload_code(in_file, member, astore_caslib, astore_name):
+    """ Awaits the upload of an astore streamed straight out of the exported .zip file.
+    `astore_caslib` and `astore_name` are python expressions of the generated script. """
+
+    file_type = "HDAT" if member.lower().endswith(".sashdat") else "ASTORE"
+
+    return """## Uploading the astore straight from the exported .zip file, in bounded chunks
+await cas.upload(\"{0}\", ## change if the .zip file was moved
+                 {1}, {2}, \"{3}\", member = \"{4}\")
+""".format(os.path.abspath(in_file).replace("\\", "/"), astore_caslib, astore_name, file_type, member)
+
+
+def _async_resident_code(load_code, astore_caslib, astore_name, checksum = None):
+    """ Async version of `_resident_astore_code`, the load only runs when the astore is not in memory. """
+
+    code = "## Model residency check: the astore is only loaded when it is not in memory yet\n"
+    if checksum is not None:
+        code += """astore_checksum = \"{0}\" ## CRC-32 and size of the astore when the code was translated
+{1} = "pysct_astore_" + astore_checksum ## identical astores share the same in-memory table
+""".format(checksum, astore_name)
+
+    code += """if await cas.table_exists({0}, {1}):
+    print("The astore " + {1} + " is already in memory, skipping the load")
+else:
+{2}
+    ## promoting to global scope so the next sessions find it in memory
+    await cas.action("table.promote", caslib = {0}, name = {1})
+""".format(astore_caslib, astore_name, textwrap.indent(load_code.rstrip("\n"), "    "))
+
+    return code
+
+
+def _check_asynchronous(connection_pool):
+    if connection_pool:
+        raise Exception("connection_pool and asynchronous can not be combined, the SWAT pool is not "
+                        "used by the asyncio scripts: pass an open cas_async session to score() to share one")
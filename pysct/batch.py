@@ -0,0 +1,150 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import concurrent.futures
+import glob
+import inspect
+import json
+import os
+import re
+import time
+
+from .dispatch import score_code_type, _translator, _OUT_CASTABLE_ARGUMENT
+
+##################################
+###### Batch Translate      ######
+##################################
+
+def _list_score_files(in_files):
+
+    if isinstance(in_files, (list, tuple)):
+        return list(in_files)
+    if os.path.isdir(in_files):
+        return sorted(glob.glob(os.path.join(in_files, "*.zip")))
+    return sorted(glob.glob(in_files))
+
+
+def _translate_one(task):
+    """ Translates a single score code file, never raises so one bad export does not stop the batch. """
+
+    record = {"in_file": task["in_file"],
+              "translator": None,
+              "status": "ok",
+              "out_file": None,
+              "seconds": None,
+              "error": None}
+
+    start = time.perf_counter()
+    try:
+        translator = task["translator"] or score_code_type(task["in_file"])
+        record["translator"] = translator
+
+        function = _translator(translator)
+        accepted = inspect.signature(function).parameters
+
+        arguments = {key: value for key, value in task["arguments"].items()
+                     if key in accepted and value is not None}
+        arguments[_OUT_CASTABLE_ARGUMENT[translator]] = task["out_castable"]
+
+        out = function(in_file = task["in_file"],
+                       out_file = task["out_file"],
+                       **arguments)
+        record["out_file"] = out["out_file"]
+    except Exception as error:
+        record["status"] = "failed"
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+    record["seconds"] = time.perf_counter() - start
+
+    return record
+
+
+def batch_translate(in_files, out_dir,
+                    in_caslib, in_castable,
+                    out_caslib, out_castable = None,
+                    key_column = None,
+                    document_column = None,
+                    hostname = None,
+                    translator = None,
+                    max_workers = None,
+                    manifest_file = None,
+                    **kwargs):
+    """ Translates a whole directory (or glob) of score code .zip files across a process pool,
+    picking the translator of each file from its content.
+
+    Parameters
+    ----------
+    in_files : str or list
+        A directory with .zip files, a glob pattern such as "exports/*.zip" or a list of filepaths
+    out_dir : str
+        Directory where the .py files are written, one per .zip named after it
+    in_caslib : str
+        Name of the input table caslib
+    in_castable : str
+        Name of the input table
+    out_caslib : str
+        Name of the output table caslib
+    out_castable : str
+        Name of the output table. Default: `None`, the name of each .zip file is used
+    key_column : str
+        Key column name for unique identifier, needed by the sentiment, category and concepts translators
+    document_column : str
+        text variable column name, needed by the sentiment, category and concepts translators
+    hostname : str
+        sas viya hostname to be used. Default: `None`, each translator default is kept
+    translator : str
+        Name of the translator function to use for every file. Default: `None`, guessed per file
+    max_workers : int
+        Number of worker processes. Default: `None`, one per CPU. Use 1 to translate in the current process
+    manifest_file : str
+        If set, the manifest is also written as JSON to this filepath
+    **kwargs
+        Other arguments forwarded to the translators that accept them, e.g. `copyVars = "ALL"`
+
+    Returns
+    -------
+    Dict
+        A manifest with the totals and, in "files", the status, timing, output path and error of each file.
+
+    Example
+    -------
+    batch_translate("/path/to/exports", "/path/to/scripts", "public", "hmeq", "casuser")
+    """
+
+    files = _list_score_files(in_files)
+    os.makedirs(out_dir, exist_ok = True)
+
+    arguments = dict(kwargs,
+                     in_caslib = in_caslib,
+                     in_castable = in_castable,
+                     out_caslib = out_caslib,
+                     key_column = key_column,
+                     document_column = document_column,
+                     hostname = hostname)
+
+    tasks = []
+    for in_file in files:
+        name = os.path.splitext(os.path.basename(in_file))[0]
+        tasks.append({"in_file": in_file,
+                      "translator": translator,
+                      "out_file": os.path.join(out_dir, name + ".py"),
+                      "out_castable": out_castable or re.sub(r"\W+", "_", name),
+                      "arguments": arguments})
+
+    start = time.perf_counter()
+    if max_workers == 1:
+        records = [_translate_one(task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+            records = list(executor.map(_translate_one, tasks))
+
+    manifest = {"out_dir": out_dir,
+                "seconds": time.perf_counter() - start,
+                "succeeded": sum(record["status"] == "ok" for record in records),
+                "failed": sum(record["status"] != "ok" for record in records),
+                "files": records}
+
+    if manifest_file is not None:
+        with open(manifest_file, "wt") as f:
+            json.dump(manifest, f, indent = 2)
+
+    return manifest
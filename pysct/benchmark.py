@@ -0,0 +1,415 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import concurrent.futures
+import contextlib
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import timeit
+import tracemalloc
+import zipfile
+
+try:
+    import resource
+except ImportError: ## windows, peak RSS is not reported
+    resource = None
+
+from .dispatch import _REGISTRY, _OUT_CASTABLE_ARGUMENT, _translator
+from .metadata import macro_variables
+from .mock_cas import MockCAS
+
+## macro variables read by the VTA translators
+_MACRO_NAMES = ["cas_server_hostname", "language",
+                "mco_binary_caslib", "mco_binary_table_name",
+                "liti_binary_caslib", "liti_binary_table_name",
+                "input_astore_caslib_name", "input_astore_name"]
+
+##################################
+###### Micro benchmarks     ######
+##################################
+
+def synthetic_score_code(size_mb = 4, lets_first = True):
+    """ Builds a VTA like score code of about `size_mb` MB made of the `%let` statements and
+    DATA step lines. With `lets_first = False` the `%let` statements come after the DATA step lines. """
+
+    header = "".join('%let {} = "value_{}";\n'.format(name, name) for name in _MACRO_NAMES)
+    line = "if missing(VAR_{0}) then VAR_{0} = 0; _LP0 = _LP0 + 0.125 * VAR_{0};\n"
+
+    body = []
+    size = len(header)
+    while size < size_mb * 1024 ** 2:
+        body.append(line.format(len(body)))
+        size += len(body[-1])
+
+    if lets_first:
+        return header + "".join(body)
+    return "".join(body) + header
+
+
+def _per_field_regex(rawScore):
+    """ How the translators used to read the macro variables, one lookbehind search per field. """
+
+    return {name: re.search('(?<=%let ' + name + ' = ")(.*)(?=";)', rawScore).group(0)
+            for name in _MACRO_NAMES}
+
+
+def benchmark_macro_variables(size_mb = 4, lets_first = True, repeat = 5):
+    """ Compares the single pass `%let` extractor with one regex search per field.
+
+    Parameters
+    ----------
+    size_mb : float
+        Size of the synthetic score code in MB. Default: 4
+    lets_first : bool
+        If `False` the `%let` statements are placed after the DATA step lines, where a
+        per field search has to walk the whole code. Default: `True`
+    repeat : int
+        Number of timed runs, the best one is reported. Default: 5
+
+    Returns
+    -------
+    Dict
+        Best time in seconds of each approach and the speedup of the single pass.
+
+    Example
+    -------
+    benchmark_macro_variables(size_mb = 16)
+    """
+
+    rawScore = synthetic_score_code(size_mb, lets_first)
+
+    single_pass = min(timeit.repeat(lambda: macro_variables(rawScore), number = 1, repeat = repeat))
+    per_field = min(timeit.repeat(lambda: _per_field_regex(rawScore), number = 1, repeat = repeat))
+
+    return {"size_mb": len(rawScore) / 1024 ** 2,
+            "lets_first": lets_first,
+            "fields": len(_MACRO_NAMES),
+            "per_field_regex_seconds": per_field,
+            "single_pass_seconds": single_pass,
+            "speedup": per_field / single_pass}
+
+
+##################################
+###### Translator benchmarks ######
+##################################
+
+## arguments passed to every translator, the output table argument is added per translator
+_ARGUMENTS = {"in_caslib": "public",
+              "in_castable": "bench_in",
+              "out_caslib": "casuser",
+              "key_column": "id",
+              "document_column": "text",
+              "hostname": "bench.example.com"}
+
+## options reading the astore out of the .zip file, so the astore size is part of the measure
+_ASTORE_ARGUMENTS = {"EPS_translate": {"check_resident": True, "stream_upload": True},
+                     "nlp_sentiment_translate": {"astore": True, "check_resident": True, "stream_upload": True},
+                     "nlp_topics_translate": {"check_resident": True, "stream_upload": True}}
+
+## metrics compared with the baseline, and the smallest increase reported as a regression
+_METRICS = {"seconds": 0.01, "peak_alloc_mb": 1.0, "peak_rss_mb": 5.0}
+
+## metrics of the scripts run against the mock CAS, they do not depend on the machine so any increase
+## is a regression, whatever the tolerance
+_MOCK_METRICS = ["round_trips", "sessions"]
+
+_WRITE_MB = 1024 ** 2
+
+
+def _write_filler(f, size, line, written = 0):
+    """ Writes `line` (formatted with a counter) to the binary file `f` until it holds `size` bytes. """
+
+    number = 0
+    block = []
+    block_size = 0
+    while written < size:
+        text = line.format(number).encode("UTF-8")
+        block.append(text)
+        block_size += len(text)
+        written += len(text)
+        number += 1
+        if block_size >= _WRITE_MB:
+            f.write(b"".join(block))
+            block = []
+            block_size = 0
+    f.write(b"".join(block))
+
+
+def synthetic_export(out_file, translator, size_mb = 0.001, lets = 200, astore_mb = 1):
+    """ Writes a synthetic score code .zip file, shaped like a SAS Viya export, that `translator` reads.
+    Members are written in chunks, so exports of hundreds of MB do not need as much memory.
+
+    Parameters
+    ----------
+    out_file : str
+        Filepath of the .zip file
+    translator : str
+        Name of the translator, e.g. "DS_translate" or "nlp_topics_translate"
+    size_mb : float
+        Size of the score code in MB. Default: 0.001
+    lets : int
+        Number of `%let` statements added to the VTA score codes. Default: 200
+    astore_mb : float
+        Size of the astore in MB, for the translators of astore models. Default: 1
+
+    Returns
+    -------
+    str
+        The .zip filepath.
+
+    Example
+    -------
+    synthetic_export("big_ds.zip", "DS_translate", size_mb = 100)
+    """
+
+    size = int(size_mb * 1024 ** 2)
+    astore_size = int(astore_mb * 1024 ** 2)
+
+    macros = {"cas_server_hostname": "bench.example.com", "language": "ENGLISH"}
+    if translator == "nlp_category_translate":
+        macros.update(mco_binary_caslib = "Analytics_Project", mco_binary_table_name = "categories_binary")
+    if translator == "nlp_concepts_translate":
+        macros.update(liti_binary_caslib = "Analytics_Project", liti_binary_table_name = "concepts_binary")
+    if translator == "nlp_topics_translate":
+        macros.update(input_astore_caslib_name = "Analytics_Project", input_astore_name = "topics_astore")
+    header = "".join('%let {} = "{}";\n'.format(name, value) for name, value in macros.items())
+    header += "".join('%let bench_macro_{0} = "value_{0}";\n'.format(number) for number in range(lets))
+
+    members = []
+    if translator == "DS_translate":
+        members.append(("dmcas_scorecode.sas",
+                        "/*---------------------------------------------------------\n"
+                        "  Generated SAS Scoring Code\n"
+                        "  * Host: bench.example.com;\n"
+                        "* Encoding: utf-8;\n"
+                        "---------------------------------------------------------*/\n",
+                        "if missing(VAR_{0}) then VAR_{0} = 0; _LP0 = _LP0 + 0.125 * VAR_{0};\n"))
+    elif translator == "EPS_translate":
+        members.append(("dmcas_epscorecode.sas",
+                        "package ds2score / overwrite=yes;\n"
+                        " dcl package score _BENCH_ast();\n"
+                        " method init(); _BENCH_ast.setvars(); end;\n",
+                        " dcl double VAR_{0};\n"))
+        members.append(("_BENCH_ast.sashdat", None, None))
+    elif translator == "nlp_sentiment_translate":
+        members.append(("ScoreCode.sas", header, "/* sentiment rule {0} */\n"))
+        members.append(("AstoreScoreCode.sas", header, "/* sentiment rule {0} */\n"))
+        members.append(("SentimentModel.astore", None, None))
+    elif translator == "nlp_topics_translate":
+        members.append(("AstoreScoreCode.sas", header, "/* topic term {0} */\n"))
+        members.append(("TopicsModel.astore", None, None))
+    elif translator in ("nlp_category_translate", "nlp_concepts_translate"):
+        members.append(("ScoreCode.sas", header, "/* rule {0} */\n"))
+    else:
+        raise Exception("unknown translator {}".format(translator))
+
+    with zipfile.ZipFile(out_file, "w") as archives:
+        for member, code_header, line in members:
+            ## astores do not compress, they are stored as they are
+            if code_header is None:
+                with archives.open(zipfile.ZipInfo(member), "w", force_zip64 = True) as f:
+                    chunk = os.urandom(min(astore_size, _WRITE_MB))
+                    written = 0
+                    while written < astore_size:
+                        f.write(chunk[:astore_size - written])
+                        written += len(chunk)
+                continue
+
+            info = zipfile.ZipInfo(member)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archives.open(info, "w", force_zip64 = True) as f:
+                f.write(code_header.encode("UTF-8"))
+                _write_filler(f, size, line, len(code_header))
+                if translator == "EPS_translate":
+                    f.write(b"endpackage;\n")
+
+    return out_file
+
+
+def _translate(translator, in_file, out_file, arguments):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _translator(translator)(in_file = in_file, out_file = out_file, **arguments)
+
+
+def _peak_rss_mb():
+    ## on linux ru_maxrss survives fork and exec, the high water mark of /proc is the one of this process
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    ## bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 ** 2
+
+
+def _measure(task):
+    """ Runs in a new process, so its peak RSS is the one of this translation only. """
+
+    translator, in_file, out_file, arguments, repeat = task
+
+    if repeat:
+        seconds = []
+        for run in range(repeat):
+            start = time.perf_counter()
+            _translate(translator, in_file, out_file, arguments)
+            seconds.append(time.perf_counter() - start)
+        return {"seconds": min(seconds), "peak_rss_mb": _peak_rss_mb()}
+
+    ## allocations are traced in a run of their own, tracing slows the translation down
+    tracemalloc.start()
+    try:
+        _translate(translator, in_file, out_file, arguments)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_alloc_mb": peak / 1024 ** 2}
+
+
+def _in_new_process(task):
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers = 1, mp_context = context) as executor:
+        return executor.submit(_measure, task).result()
+
+
+def benchmark_translators(sizes_mb = (0.001, 1, 16),
+                          translators = None,
+                          lets = 200,
+                          astore_mb = 16,
+                          repeat = 3,
+                          work_dir = None,
+                          mock_cas = False):
+    """ Measures the wall time, the peak RSS and the peak of python allocations of the translators on
+    synthetic exports (see `synthetic_export`) of several score code sizes. Each measure runs in a new
+    process. The astore models are translated with the options that read the astore from the .zip file.
+    With `mock_cas` the translated scripts are also run against a `MockCAS`, counting their round trips.
+
+    Parameters
+    ----------
+    sizes_mb : list
+        Score code sizes in MB. Default: (0.001, 1, 16)
+    translators : list
+        Names of the translators. Default: `None`, every translator
+    lets : int
+        Number of `%let` statements of the VTA score codes. Default: 200
+    astore_mb : float
+        Size of the astores in MB. Default: 16
+    repeat : int
+        Number of timed runs, the best one is reported. Default: 3
+    work_dir : str
+        Directory of the synthetic exports and translated files. Default: `None`, a temporary directory
+    mock_cas : bool
+        If `True` every translated script runs against a `MockCAS`. Default: `False`
+
+    Returns
+    -------
+    Dict
+        The results by case, e.g. "DS_translate:16MB", with "seconds", "peak_rss_mb" and "peak_alloc_mb",
+        and "round_trips" and "sessions" of the script with `mock_cas`.
+
+    Example
+    -------
+    benchmark_translators(sizes_mb = [1, 100, 500], translators = ["DS_translate"])
+    """
+
+    translators = translators or list(_REGISTRY)
+    results = {}
+
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        for translator in translators:
+            accepted = inspect.signature(_translator(translator)).parameters
+            arguments = {key: value for key, value in _ARGUMENTS.items() if key in accepted}
+            arguments.update(_ASTORE_ARGUMENTS.get(translator, {}))
+            arguments[_OUT_CASTABLE_ARGUMENT[translator]] = "bench_out"
+
+            for size_mb in sizes_mb:
+                case = "{}:{:g}MB".format(translator, size_mb)
+                in_file = os.path.join(work_dir, "{}_{:g}MB.zip".format(translator, size_mb))
+                out_file = os.path.join(work_dir, "{}_{:g}MB.py".format(translator, size_mb))
+                synthetic_export(in_file, translator, size_mb, lets, astore_mb)
+
+                result = {"translator": translator, "size_mb": size_mb}
+                result.update(_in_new_process((translator, in_file, out_file, arguments, repeat)))
+                result.update(_in_new_process((translator, in_file, out_file, arguments, 0)))
+                if mock_cas:
+                    summary = MockCAS().run(out_file)
+                    result.update({metric: summary[metric] for metric in _MOCK_METRICS})
+                results[case] = result
+
+                os.remove(in_file)
+                os.remove(out_file)
+
+    return results
+
+
+def save_baseline(results, baseline_file):
+    """ Saves the results of `benchmark_translators` as the baseline later runs are compared with. """
+
+    with open(baseline_file, "wt") as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
+    return baseline_file
+
+
+def compare_baseline(results, baseline_file, tolerance = 0.25):
+    """ Compares the results of `benchmark_translators` with a saved baseline.
+
+    Parameters
+    ----------
+    results : dict
+        Results of `benchmark_translators`
+    baseline_file : str
+        Filepath of the baseline written by `save_baseline`
+    tolerance : float
+        Relative increase of a metric over the baseline that is a regression. Default: 0.25. The round
+        trips and sessions of the mock CAS runs are counts, any increase of them is a regression
+
+    Returns
+    -------
+    list
+        The regressions, dicts with the case, the metric, the baseline and the current value.
+    """
+
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for case, result in sorted(results.items()):
+        if case not in baseline:
+            continue
+        for metric, floor in _METRICS.items():
+            before = baseline[case].get(metric)
+            after = result.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append({"case": case,
+                                    "metric": metric,
+                                    "baseline": before,
+                                    "current": after,
+                                    "ratio": after / before if before else None})
+        for metric in _MOCK_METRICS:
+            before = baseline[case].get(metric)
+            after = result.get(metric)
+            if before is not None and after is not None and after > before:
+                regressions.append({"case": case,
+                                    "metric": metric,
+                                    "baseline": before,
+                                    "current": after,
+                                    "ratio": after / before if before else None})
+    return regressions
+
+
+if __name__ == "__main__":
+    for size_mb in (1, 4, 16):
+        for lets_first in (True, False):
+            print(benchmark_macro_variables(size_mb, lets_first, repeat = 3))
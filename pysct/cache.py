@@ -0,0 +1,151 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from . import __version__
+
+##################################
+###### Translation cache    ######
+##################################
+
+class TranslationCache(object):
+    """ On disk cache of translated score codes.
+
+    Entries are keyed on the export (its absolute path, and the name, CRC-32 and size of every member,
+    taken from the zip central directory so nothing is decompressed), the name of the written .py file,
+    the translation arguments and the pysct version, as the scripts embed all of them. Each entry keeps
+    the result dict and a copy of the written .py file. Entries not used for `max_age` seconds are
+    dropped and, above `max_size` bytes, the least recently used ones are evicted.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory where the entries are kept, created if needed
+    max_size : int
+        Maximum size of the cache in bytes. Default: 512 MB
+    max_age : int
+        Seconds an entry is kept without being used. Default: 30 days
+
+    Example
+    -------
+    cache = TranslationCache("/path/to/cache")
+    DS_translate("filepath.zip", ..., cache = cache)
+    """
+
+    def __init__(self, cache_dir, max_size = 512 * 1024 ** 2, max_age = 30 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok = True)
+
+    def key(self, in_file, member, translator, arguments):
+        """ Builds the cache key of a translation. The scripts embed the absolute `in_file` path (streamed
+        astores), its file name (metrics) and the name of `out_file` (watermark file), and every member of
+        the export may be read (the astore, inputVar.json), so all of them are part of the key. Only the
+        directory of `out_file` is left out. """
+
+        with zipfile.ZipFile(in_file, "r") as archives:
+            archives.getinfo(member)
+            members = sorted([info.filename, info.CRC, info.file_size] for info in archives.infolist())
+
+        out_file = arguments.get("out_file")
+        arguments = {name: value for name, value in arguments.items()
+                     if name not in ("in_file", "out_file", "cache")}
+
+        content = json.dumps([__version__, translator, member, os.path.abspath(in_file),
+                              None if out_file is None else os.path.basename(out_file), members, arguments],
+                             sort_keys = True, default = repr)
+
+        return hashlib.sha256(content.encode("UTF-8")).hexdigest()
+
+    def _paths(self, key):
+        return (os.path.join(self.cache_dir, key + ".json"),
+                os.path.join(self.cache_dir, key + ".py"))
+
+    def get(self, key, out_file):
+        """ Returns the cached result dict, writing `out_file` only if it is missing or differs
+        from the cached one. Returns `None` when there is no entry. """
+
+        result_path, code_path = self._paths(key)
+        try:
+            with open(result_path, "rt") as f:
+                result = json.load(f)
+            now = time.time()
+            os.utime(result_path, (now, now))
+            os.utime(code_path, (now, now))
+        except (OSError, ValueError):
+            return None
+
+        if os.path.exists(out_file) and filecmp.cmp(code_path, out_file, shallow = False):
+            print("The file {} is up to date".format(out_file))
+        else:
+            shutil.copyfile(code_path, out_file)
+            print("The file was successfully written to {}".format(out_file))
+
+        result["out_file"] = out_file
+        return result
+
+    def put(self, key, result):
+        """ Stores a translation result, the .py file is copied from `result["out_file"]`. """
+
+        result_path, code_path = self._paths(key)
+
+        ## writing to temporary files first so concurrent workers never read half an entry,
+        ## the .json goes last since its presence is what makes the entry visible
+        handle, temp_path = tempfile.mkstemp(dir = self.cache_dir, suffix = ".tmp")
+        os.close(handle)
+        shutil.copyfile(result["out_file"], temp_path)
+        os.replace(temp_path, code_path)
+
+        handle, temp_path = tempfile.mkstemp(dir = self.cache_dir, suffix = ".tmp")
+        with os.fdopen(handle, "wt") as f:
+            json.dump(result, f)
+        os.replace(temp_path, result_path)
+
+        self.evict()
+
+    def evict(self):
+        """ Drops expired entries, then the least recently used ones until the cache fits in `max_size`. """
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            paths = self._paths(key)
+            try:
+                entries.append((os.path.getmtime(paths[0]),
+                                sum(os.path.getsize(path) for path in paths),
+                                paths))
+            except OSError:
+                continue
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        oldest = time.time() - self.max_age
+
+        for last_used, size, paths in entries:
+            if last_used >= oldest and total <= self.max_size:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+def _open_cache(cache):
+    """ Accepts a `TranslationCache` or a cache directory path. """
+
+    if cache is None or isinstance(cache, TranslationCache):
+        return cache
+    return TranslationCache(cache)
@@ -0,0 +1,169 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import os
+import sys
+
+from .batch import batch_translate
+
+
+def _batch_command(args):
+
+    manifest_file = args.manifest or os.path.join(args.out_dir, "manifest.json")
+
+    manifest = batch_translate(in_files = args.in_files,
+                               out_dir = args.out_dir,
+                               in_caslib = args.in_caslib,
+                               in_castable = args.in_castable,
+                               out_caslib = args.out_caslib,
+                               out_castable = args.out_castable,
+                               key_column = args.key_column,
+                               document_column = args.document_column,
+                               hostname = args.hostname,
+                               translator = args.translator,
+                               max_workers = args.workers,
+                               manifest_file = manifest_file,
+                               copyVars = args.copy_vars,
+                               cache = args.cache)
+
+    for record in manifest["files"]:
+        if record["status"] != "ok":
+            print("FAILED {}: {}".format(record["in_file"], record["error"]), file = sys.stderr)
+
+    print("{} translated, {} failed in {:.2f}s, manifest written to {}".format(
+        manifest["succeeded"], manifest["failed"], manifest["seconds"], manifest_file))
+
+    return 1 if manifest["failed"] else 0
+
+
+def _benchmark_command(args):
+    ## imported here, translating does not need the benchmark and its synthetic exports
+    from .benchmark import benchmark_translators, save_baseline, compare_baseline
+
+    results = benchmark_translators(sizes_mb = args.sizes,
+                                    translators = args.translators,
+                                    lets = args.lets,
+                                    astore_mb = args.astore_mb,
+                                    repeat = args.repeat,
+                                    mock_cas = args.mock_cas)
+
+    print("{:<40} {:>10} {:>12} {:>14}".format("case", "seconds", "peak RSS MB", "peak alloc MB"))
+    for case, result in results.items():
+        print("{:<40} {:>10.4f} {:>12} {:>14.1f}".format(
+            case, result["seconds"],
+            "-" if result["peak_rss_mb"] is None else "{:.1f}".format(result["peak_rss_mb"]),
+            result["peak_alloc_mb"]))
+
+    if args.output:
+        save_baseline(results, args.output)
+
+    if args.baseline is None:
+        return 0
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        save_baseline(results, args.baseline)
+        print("baseline written to {}".format(args.baseline))
+        return 0
+
+    regressions = compare_baseline(results, args.baseline, args.tolerance)
+    for regression in regressions:
+        print("REGRESSION {case} {metric}: {baseline:.4f} -> {current:.4f}".format(**regression), file = sys.stderr)
+    print("{} regression(s) against {}".format(len(regressions), args.baseline))
+
+    return 1 if regressions else 0
+
+
+def _mock_run_command(args):
+    from .mock_cas import MockCAS
+
+    failed = 0
+    for script in args.scripts:
+        summary = MockCAS(latency = args.latency, bandwidth = args.bandwidth).run(script)
+
+        if args.json:
+            print(json.dumps({"script": script, **summary}, indent = 2))
+        else:
+            print("{}: {} round trip(s), {} session(s), {} bytes sent, {} bytes uploaded, {} bytes received".format(
+                script, summary["round_trips"], summary["sessions"], summary["request_bytes"],
+                summary["upload_bytes"], summary["response_bytes"]))
+            for action, calls in summary["actions"].items():
+                print("    {:<36} {:>5}".format(action, calls["calls"]))
+
+        if args.max_round_trips is not None and summary["round_trips"] > args.max_round_trips:
+            print("{} makes {} round trips, more than {}".format(script, summary["round_trips"], args.max_round_trips),
+                  file = sys.stderr)
+            failed += 1
+
+    return 1 if failed else 0
+
+
+def main(argv = None):
+    """ Command line entry point, `python -m pysct batch --help` lists the options. """
+
+    parser = argparse.ArgumentParser(prog = "pysct",
+                                     description = "Translator for SAS Viya Score code to python")
+    commands = parser.add_subparsers(dest = "command")
+    commands.required = True
+
+    batch = commands.add_parser("batch", help = "translate a directory or glob of score code .zip files")
+    batch.add_argument("in_files", help = "directory with .zip files or a glob pattern")
+    batch.add_argument("out_dir", help = "directory where the .py files are written")
+    batch.add_argument("--in-caslib", required = True)
+    batch.add_argument("--in-castable", required = True)
+    batch.add_argument("--out-caslib", required = True)
+    batch.add_argument("--out-castable", default = None,
+                       help = "output table name, defaults to the name of each .zip file")
+    batch.add_argument("--key-column", default = None)
+    batch.add_argument("--document-column", default = None)
+    batch.add_argument("--hostname", default = None)
+    batch.add_argument("--translator", default = None,
+                       help = "translator function for every file, guessed per file by default")
+    batch.add_argument("--copy-vars", default = None, type = json.loads,
+                       help = 'copyVars as JSON, e.g. \'"ALL"\' or \'["ID", "text"]\'')
+    batch.add_argument("--cache", default = None,
+                       help = "translation cache directory, unchanged score codes are not translated again")
+    batch.add_argument("--workers", default = None, type = int,
+                       help = "number of worker processes, one per CPU by default")
+    batch.add_argument("--manifest", default = None,
+                       help = "manifest filepath, defaults to out_dir/manifest.json")
+    batch.set_defaults(function = _batch_command)
+
+    benchmark = commands.add_parser("benchmark", help = "measure the translators on synthetic exports, offline")
+    benchmark.add_argument("--sizes", nargs = "+", type = float, default = [0.001, 1, 16],
+                           help = "score code sizes in MB, e.g. 0.001 1 16 100 500")
+    benchmark.add_argument("--translators", nargs = "+", default = None,
+                           help = "translator functions, every translator by default")
+    benchmark.add_argument("--lets", default = 200, type = int,
+                           help = "number of %%let statements of the VTA score codes")
+    benchmark.add_argument("--astore-mb", default = 16, type = float,
+                           help = "size of the astores in MB")
+    benchmark.add_argument("--repeat", default = 3, type = int,
+                           help = "number of timed runs, the best one is kept")
+    benchmark.add_argument("--baseline", default = None,
+                           help = "baseline JSON file, compared with the results or written when missing")
+    benchmark.add_argument("--save-baseline", action = "store_true",
+                           help = "overwrite the baseline with the results")
+    benchmark.add_argument("--tolerance", default = 0.25, type = float,
+                           help = "relative increase over the baseline reported as a regression")
+    benchmark.add_argument("--output", default = None,
+                           help = "JSON file the results are written to")
+    benchmark.add_argument("--mock-cas", action = "store_true",
+                           help = "run the translated scripts against a mock CAS, counting their round trips")
+    benchmark.set_defaults(function = _benchmark_command)
+
+    mock_run = commands.add_parser("mock-run", help = "run generated scripts against a mock CAS, counting their round trips")
+    mock_run.add_argument("scripts", nargs = "+", help = "scripts written by the translators")
+    mock_run.add_argument("--latency", default = 0.0, type = float,
+                          help = "seconds every round trip waits")
+    mock_run.add_argument("--bandwidth", default = None, type = float,
+                          help = "bytes per second of the simulated network")
+    mock_run.add_argument("--json", action = "store_true",
+                          help = "print the summaries as JSON")
+    mock_run.add_argument("--max-round-trips", default = None, type = int,
+                          help = "fail when a script makes more round trips, e.g. in CI")
+    mock_run.set_defaults(function = _mock_run_command)
+
+    args = parser.parse_args(argv)
+    return args.function(args)
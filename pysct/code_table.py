@@ -0,0 +1,60 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## stores DATA_STEP once in a global table named after its hash, the scripts then run it with runCodeTable
+_CODE_TABLE_CODE = '''## Server side score code: the DATA step is stored once in a global CAS table named after its hash,
+## every run after the first one only sends the name of that table to dataStep.runCodeTable
+import hashlib
+
+code_caslib = "{code_caslib}"
+code_table = "pysct_code_" + hashlib.sha1(DATA_STEP.encode("UTF-8")).hexdigest()[:16]
+
+if conn.table.tableExists(caslib = code_caslib, name = code_table).exists > 0:
+    print("The score code " + code_table + " is already stored, skipping the upload")
+else:
+    ## the code is sent as hex literals of 4000 characters, at most 16000 UTF-8 bytes (SAS literals are up
+    ## to 32767 characters), so quotes and line breaks of the code need no escaping
+    chunks = [DATA_STEP[start:start + 4000].encode("UTF-8").hex() for start in range(0, len(DATA_STEP), 4000)]
+    store_code = "data {{}}.{{}}(promote=yes);\\n".format(code_caslib, code_table)
+    store_code += "    length ModelName varchar(64) DataStepSrc varchar(*);\\n"
+    store_code += "    ModelName = \\"{{}}\\";\\n    DataStepSrc = \\"\\";\\n".format(code_table)
+    store_code += "".join("    DataStepSrc = DataStepSrc || \\"{{}}\\"x;\\n".format(chunk) for chunk in chunks)
+    conn.dataStep.runCode(code = store_code + "run;\\n")
+
+'''
+
+##################################
+###### Code table           ######
+##################################
+
+def _code_table_code(code_caslib = "casuser"):
+    """ Python code, written after the `DATA_STEP` string, storing it in the global table `code_table`
+    of `code_caslib` unless a previous run already did. """
+
+    return _CODE_TABLE_CODE.format(code_caslib = code_caslib)
+
+
+def _run_code_table_code(in_caslib, in_castable, out_caslib, out_castable,
+                         conn = "conn",
+                         where = None,
+                         promote = False,
+                         result = "out"):
+    """ Python code running the stored score code on the input table with `dataStep.runCodeTable`.
+    The arguments are python expressions of the generated script. """
+
+    table = "{{\"caslib\": {}, \"name\": {}".format(in_caslib, in_castable)
+    table += "}" if where is None else ", \"where\": {}}}".format(where)
+    casout = "{{\"caslib\": {}, \"name\": {}, \"replace\": True".format(out_caslib, out_castable)
+    casout += ", \"promote\": True}" if promote else "}"
+
+    prefix = "{} = {}.dataStep.runCodeTable(".format(result, conn) if result else "{}.dataStep.runCodeTable(".format(conn)
+    padding = " " * len(prefix)
+
+    return "{0}codeTable = {{\"caslib\": code_caslib, \"name\": code_table}},\n" \
+           "{1}table = {2},\n" \
+           "{1}casOut = {3})\n".format(prefix, padding, table, casout)
+
+
+def _check_code_table(code_table, asynchronous):
+    if code_table and asynchronous:
+        raise Exception("code_table is only available for the SWAT scripts, not with asynchronous")
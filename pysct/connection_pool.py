@@ -0,0 +1,212 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+## python module written next to the generated scripts when `connection_pool = True`
+_POOL_MODULE = '''## Shared CAS connection pool, generated by pysct
+## The scripts written with `connection_pool = True` borrow their session from here with
+## `acquire()` and give it back with `release()`. Running several of them in the same python
+## process (e.g. with runpy or importlib) pays the CAS session startup only once.
+# documentation: https://github.com/sassoftware/python-swat/
+# pip install swat
+
+import atexit
+import threading
+import time
+
+import swat
+
+MAX_SIZE = {max_size} ## maximum number of sessions open for the same server and user
+IDLE_TIMEOUT = {idle_timeout} ## seconds an unused session is kept open
+HEALTH_CHECK_AFTER = {health_check_after} ## sessions idle longer than this are pinged before being reused
+
+_lock = threading.Condition()
+_idle = {{}} ## connection key -> list of (session, last used time)
+_open = {{}} ## connection key -> number of open sessions, idle or borrowed
+_keys = {{}} ## id(session) -> connection key
+
+
+def _key(connection):
+    return tuple(sorted((name, repr(value)) for name, value in connection.items()))
+
+
+def _healthy(conn):
+    try:
+        return conn.builtins.ping().severity == 0
+    except Exception:
+        return False
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _forget(conn):
+    """ Must be called holding the lock. """
+    key = _keys.pop(id(conn), None)
+    if key is not None:
+        _open[key] -= 1
+        _lock.notify_all()
+
+
+def _expired():
+    """ Must be called holding the lock, returns the sessions idle for longer than IDLE_TIMEOUT. """
+    oldest = time.time() - IDLE_TIMEOUT
+    expired = []
+    for sessions in _idle.values():
+        while sessions and sessions[0][1] < oldest:
+            expired.append(sessions.pop(0)[0])
+    for conn in expired:
+        _forget(conn)
+    return expired
+
+
+def acquire(timeout = None, **connection):
+    """ Borrows a session, `connection` takes the same arguments as `swat.CAS`.
+    Waits up to `timeout` seconds (forever if `None`) when MAX_SIZE sessions are borrowed. """
+
+    key = _key(connection)
+    deadline = None if timeout is None else time.time() + timeout
+
+    while True:
+        conn = None
+        with _lock:
+            expired = _expired()
+            if _idle.get(key):
+                conn, last_used = _idle[key].pop()
+            elif _open.get(key, 0) < MAX_SIZE:
+                _open[key] = _open.get(key, 0) + 1
+            else:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no CAS session available after {{}} seconds".format(timeout))
+                _lock.wait(remaining)
+                continue
+
+        for expired_conn in expired:
+            _close(expired_conn)
+
+        ## new session
+        if conn is None:
+            try:
+                conn = swat.CAS(**connection)
+            except Exception:
+                with _lock:
+                    _open[key] -= 1
+                    _lock.notify_all()
+                raise
+            with _lock:
+                _keys[id(conn)] = key
+            return conn
+
+        ## idle session, checked only if it was not used recently
+        if time.time() - last_used < HEALTH_CHECK_AFTER or _healthy(conn):
+            return conn
+
+        with _lock:
+            _forget(conn)
+        _close(conn)
+
+
+def release(conn):
+    """ Gives a session back to the pool. """
+
+    with _lock:
+        key = _keys.get(id(conn))
+        if key is None:
+            return
+        _idle.setdefault(key, []).append((conn, time.time()))
+        _lock.notify_all()
+
+
+def close_all():
+    """ Closes every idle session, borrowed sessions are closed when released after this. """
+
+    with _lock:
+        sessions = [conn for idle in _idle.values() for conn, _ in idle]
+        _idle.clear()
+        for conn in sessions:
+            _forget(conn)
+    for conn in sessions:
+        _close(conn)
+
+
+atexit.register(close_all)
+'''
+
+##################################
+###### CAS connection pool  ######
+##################################
+
+def write_connection_pool(out_dir = ".",
+                          module_name = "cas_pool",
+                          max_size = 4,
+                          idle_timeout = 300,
+                          health_check_after = 30,
+                          overwrite = False):
+    """ Writes the python module that the scripts generated with `connection_pool = True` import.
+    It keeps a thread safe pool of `swat.CAS` sessions with a maximum size, idle eviction and a
+    health check (`builtins.ping`) before reusing sessions that were idle.
+
+    Parameters
+    ----------
+    out_dir : str
+        Directory of the generated scripts. Default: "."
+    module_name : str
+        Name of the module. Default: "cas_pool"
+    max_size : int
+        Maximum number of sessions open for the same server and user. Default: 4
+    idle_timeout : int
+        Seconds an unused session is kept open. Default: 300
+    health_check_after : int
+        Sessions idle for more seconds than this are pinged before being reused. Default: 30
+    overwrite : bool
+        If `False` an existing module is kept as is, it is only generated once. Default: `False`
+
+    Returns
+    -------
+    str
+        The module filepath.
+
+    Example
+    -------
+    write_connection_pool("/path/to/scripts", max_size = 8)
+    """
+
+    out_file = os.path.join(out_dir or ".", module_name + ".py")
+
+    if overwrite or not os.path.exists(out_file):
+        with open(out_file, "wt") as f:
+            f.write(_POOL_MODULE.format(max_size = max_size,
+                                        idle_timeout = idle_timeout,
+                                        health_check_after = health_check_after))
+
+    return out_file
+
+
+def _pooled_connection_code(hostname, module_name = "cas_pool"):
+    """ Python code that borrows `conn` from the pool, replaces the `swat.CAS(...)` call. """
+
+    return """## Borrowing a session from the shared connection pool ({0}.py, next to this file)
+import {0}
+
+conn = {0}.acquire(hostname = \"{1}\", ## change if needed
+                port = 8777,
+                protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
+                username='username', ## use your own credentials
+                password='password') ## we encorage using .authinfo \n
+
+""".format(module_name, hostname)
+
+
+def _pooled_release_code(module_name = "cas_pool"):
+    """ Python code that gives `conn` back to the pool at the end of the script. """
+
+    return """
+## Giving the session back to the pool
+{0}.release(conn)
+""".format(module_name)
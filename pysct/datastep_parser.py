@@ -0,0 +1,165 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+import zlib
+
+## SAS DATA step tokens, comments and quoted strings are kept whole so they are never rewritten
+_TOKEN = re.compile(r"""
+    (?P<comment>/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*'(?:dt|d|t|n|x)?|"(?:[^"]|"")*"(?:dt|d|t|n|x)?)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<space>\s+)
+  | (?P<op>\*\*|\|\||<=|>=|\^=|~=|=:|.)
+""", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+## statements whose names are all variable (or array) definitions
+_DECLARATIONS = {"length", "retain", "array"}
+
+## statements that only reference variables, they tell nothing about reads or writes
+_REFERENCES = {"label", "format", "informat", "attrib", "drop", "keep"}
+
+## statements that would change the rows written when several models run in the same DATA step
+_ROW_STATEMENTS = {"stop", "delete", "output", "set", "merge", "update", "modify", "by", "data", "run"}
+
+_KEYWORDS = {"if", "then", "else", "do", "end", "to", "by", "while", "until", "and", "or", "not",
+             "in", "eq", "ne", "lt", "gt", "le", "ge", "select", "when", "otherwise", "goto",
+             "link", "return", "drop", "keep", "label", "format", "informat", "attrib",
+             "_temporary_", "_numeric_", "_character_", "_all_"} | _DECLARATIONS
+
+##################################
+###### DATA step tokenizer  ######
+##################################
+
+def tokenize(code):
+    """ Splits DATA step code in (kind, text) tokens, kind is one of "comment", "string",
+    "number", "name", "space" or "op". Joining the texts gives back the code unchanged.
+    `* ... ;` comment statements are returned as a single "comment" token. """
+
+    tokens = []
+    statement_start = True
+    position = 0
+    length = len(code)
+
+    while position < length:
+        if statement_start and code[position] == "*":
+            end = code.find(";", position)
+            end = length if end == -1 else end + 1
+            tokens.append(("comment", code[position:end]))
+            position = end
+            continue
+
+        match = _TOKEN.match(code, position)
+        kind = match.lastgroup
+        text = match.group(0)
+        tokens.append((kind, text))
+        position = match.end()
+
+        if kind not in ("space", "comment"):
+            statement_start = text == ";"
+
+    return tokens
+
+
+def statements(tokens):
+    """ Groups the indexes of the meaningful tokens (no spaces nor comments) by statement.
+    `if ... then` and `else` start a new statement, as does the statement after `do;` and
+    the one after a statement label (`label:`). """
+
+    statement = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind in ("space", "comment"):
+            continue
+        statement.append(index)
+        lower = text.lower()
+        label = text == ":" and len(statement) == 2 and tokens[statement[0]][0] == "name"
+        if text == ";" or label or (kind == "name" and lower in ("then", "else")):
+            yield statement
+            statement = []
+    if statement:
+        yield statement
+
+
+def variable_usage(tokens):
+    """ Finds the variables, arrays and statement labels defined by DATA step code.
+
+    Returns
+    -------
+    Tuple
+        (defined, read_first, names, labels): the lower case names assigned or declared; those
+        among them that are read before being defined (inputs changed in place, such as imputed
+        values); every name referenced by the code; and the statement labels, jumped to with
+        `goto` or `link`, which are neither variables defined nor read.
+    """
+
+    defined = set()
+    first_use = {}
+    names = set()
+    labels = set()
+
+    for statement in statements(tokens):
+        words = [tokens[index] for index in statement]
+        first = words[0][1].lower() if words[0][0] == "name" else None
+
+        if first in _ROW_STATEMENTS or (first == "return" and not _uses_link(tokens)):
+            raise Exception("The score code has a `{}` statement, it can not be combined with "
+                            "other models in the same DATA step".format(words[0][1]))
+
+        for position, (kind, text) in enumerate(words):
+            if kind != "name":
+                continue
+            lower = text.lower()
+            if lower in _KEYWORDS:
+                continue
+            names.add(lower)
+
+            following = words[position + 1][1] if position + 1 < len(words) else None
+            after = words[position + 2][1] if position + 2 < len(words) else None
+            previous = words[position - 1][1].lower() if position > 0 else None
+
+            if (position == 0 and following == ":") or previous in ("goto", "link"):
+                labels.add(lower)
+                continue
+
+            if first in _REFERENCES:
+                continue
+
+            assigned = following == "=" and after != "=" and position == (1 if previous == "do" else 0)
+            declared = first in _DECLARATIONS and position > 0
+
+            if assigned or declared:
+                defined.add(lower)
+                first_use.setdefault(lower, "defined")
+            else:
+                first_use.setdefault(lower, "read")
+
+    read_first = {name for name in defined if first_use[name] == "read"}
+
+    return defined, read_first, names, labels
+
+
+def _uses_link(tokens):
+    return any(kind == "name" and text.lower() == "link" for kind, text in tokens)
+
+
+def prefixed_name(name, prefix):
+    """ Adds a model prefix to a variable name keeping its leading underscores, so name prefix
+    lists such as `drop _:;` still match. Names are kept within the 32 characters SAS allows. """
+
+    stripped = name.lstrip("_")
+    underscores = name[:len(name) - len(stripped)]
+    new_name = underscores + prefix + stripped
+
+    if len(new_name) > 32:
+        digest = "{:08X}".format(zlib.crc32(name.lower().encode("UTF-8")))
+        new_name = new_name[:32 - len(digest)] + digest
+
+    return new_name
+
+
+def rename(tokens, renames):
+    """ Rewrites the code replacing the names (case insensitive) found in `renames`. """
+
+    return "".join(renames.get(text.lower(), text) if kind == "name" else text
+                   for kind, text in tokens)
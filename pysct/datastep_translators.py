@@ -1,8 +1,28 @@
 # Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
  
+import io
+import os
 import zipfile
-import re
+
+from .astore import find_astore_member, astore_checksum, _streamed_astore_upload_code, _resident_astore_code
+from .async_scoring import write_async_module, _check_asynchronous, _async_header_code, _async_score_code, \
+                           _async_column_names_code, _async_upload_code, _async_resident_code
+from .cache import _open_cache
+from .code_table import _code_table_code, _run_code_table_code, _check_code_table
+from .connection_pool import write_connection_pool, _pooled_connection_code, _pooled_release_code
+from .datastep_parser import tokenize, variable_usage, prefixed_name, rename
+from .download import _download_code, _check_download
+from .ingest import _ingest_code, _check_ingest
+from .incremental import _NEW_ROWS, _watermark_file_code, _incremental_start_code, _incremental_end_code, \
+                         _check_incremental
+from .metadata import astore_name as find_astore_name, input_variables, resolve_copy_vars
+from .metrics import _instrument_code, _check_metrics
+from .partitioned_scoring import _partitioned_code, _promote_astore_code, _check_partitions
+from .pipelined_scoring import _pipelined_code, _check_pipelined
+from .scoring_service import _service_header_code, _service_code
+
+__all__ = ["DS_translate", "DS_translate_multi", "EPS_translate"]
 
 ##################################
 ###### DS Translate         ######
@@ -13,7 +33,25 @@ def DS_translate(in_file,
                 in_caslib, in_castable,
                 out_caslib, out_castable,
                 out_file = "dmcas_scorecode.py", 
-                hostname = None):
+                hostname = None,
+                cache = None,
+                connection_pool = False,
+                stream = False,
+                chunk_size = 1024 ** 2,
+                return_code = None,
+                asynchronous = False,
+                partitions = None,
+                partition_column = None,
+                watermark_column = None,
+                watermark_file = None,
+                metrics_file = None,
+                code_table = False,
+                code_caslib = "casuser",
+                download_file = None,
+                download_page_rows = 100000,
+                upload_file = None,
+                upload_chunk_rows = 100000,
+                pipelined = False):
     """ Writes a .py file, wrapping a simple DataSetp code (not DS2) to be run through `SWAT`. It's used
     for models that outputs the dmcas_scorecode.sas file.
     
@@ -34,6 +72,63 @@ def DS_translate(in_file,
 
     out_file : str
         Name and path of the output file. Default: "dmcas_scorecode.py"
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    stream : bool
+        If `True` the score code is read from the .zip and written to `out_file` in chunks, so memory
+        use stays flat no matter how big the score code is. Default: `False`
+    chunk_size : int
+        Only used when `stream = True`. Number of characters read at a time. Default: 1048576
+    return_code : bool
+        Whether the data step and python code are returned in the dict. Default: `None`, they
+        are returned unless `stream = True`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    partitions : int
+        If set, the script splits the input table in this many parts and scores them at the same time,
+        each on its own session (thread pool), then appends them into `out_castable` and prints the time
+        of every part. A failed part is scored again alone. Default: `None`
+    partition_column : str
+        Only used with `partitions`. Numeric column splitting the input with `mod()`, when `None` the rows
+        are numbered in a temporary copy of the input table. Default: `None`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output table, which is promoted so it outlives the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    code_table : bool
+        If `True` the script stores the DATA step once in a global CAS table named after its hash and runs it
+        with `dataStep.runCodeTable`, so the runs after the first one send the table name instead of the
+        whole code. Not available with `asynchronous`. Default: `False`
+    code_caslib : str
+        Only used with `code_table`. The caslib of the code tables. Default: "casuser"
+    download_file : str
+        If set, the script downloads the whole output table to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+    pipelined : bool
+        If `True` the script scores `upload_file` into `download_file` in chunks of `upload_chunk_rows` rows,
+        uploading, scoring and downloading consecutive chunks at the same time on three threads and sessions,
+        so the run takes about the time of the slowest of the three. No output table is kept. Default: `False`
     
     Returns
     -------
@@ -45,17 +140,70 @@ def DS_translate(in_file,
     DS_translate("filepath.zip")
     """
 
+    arguments = dict(locals())
+    _check_partitions(partitions, asynchronous)
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+    _check_pipelined(pipelined, upload_file, download_file, asynchronous, partitions, watermark_column)
+    _check_code_table(code_table, asynchronous)
+
+    if return_code is None:
+        return_code = not stream
+
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments
+    cache = _open_cache(cache)
+    if cache is not None:
+        cache_key = cache.key(in_file, "dmcas_scorecode.sas", "DS_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
 ## reading score code
-    archives = zipfile.ZipFile(in_file, "r")
-    rawScore = archives.read("dmcas_scorecode.sas").decode("UTF-8")
+    if not stream:
+        with zipfile.ZipFile(in_file, "r") as archives:
+            rawScore = archives.read("dmcas_scorecode.sas").decode("UTF-8")
+        first_chunk = rawScore
+
+## in streaming mode only the first chunk is read upfront, the hostname is in the code header
+    if stream:
+        with zipfile.ZipFile(in_file, "r") as archives, \
+             io.TextIOWrapper(archives.open("dmcas_scorecode.sas"), encoding = "UTF-8", newline = "") as member:
+            first_chunk = member.read(max(chunk_size, 64 * 1024))
+
+    data_step_header = "data " + out_caslib + "." + out_castable + ";\n" \
+                       "    set " + in_caslib + "." + in_castable + ";\n" \
+                       "\n"
+    data_step_footer = "\n" + "run;\n"
+
+## in incremental mode the new rows are read from a view and their scores written to a new table
+    if watermark_column is not None:
+        data_step_header = "data " + out_caslib + "." + out_castable + _NEW_ROWS + ";\n" \
+                           "    set " + out_caslib + "." + in_castable + _NEW_ROWS + ";\n" \
+                           "\n"
+
+## with partitions every part (every chunk when pipelined) gets its own DATA and SET statements around
+## the score code, a code table is run on the input and output tables given to runCodeTable
+    if partitions or code_table or pipelined:
+        data_step_header = ""
+        data_step_footer = ""
 
-    DSScore = "data " + out_caslib + "." + out_castable + ";\n"
-    DSScore = DSScore + "    set " + in_caslib + "." + in_castable + ";\n"
-    DSScore = DSScore + "\n" + rawScore
-    DSScore = DSScore + "\n" + "run;\n"
+## reading score code hostname
+    if (hostname is None):
+        first_char = first_chunk.find("Host:") + 5
+        last_char = first_chunk.find(";\n* Encoding:")
+        hostname = first_chunk[first_char:last_char].strip()
 
 ## writing code header 
-    pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
+    pyscore_header = """## SWAT package needed to run the codes, below the packages in pip and conda
 # documentation: https://github.com/sassoftware/python-swat/
 # pip install swat
 # conda install -c sas-institute swat
@@ -63,14 +211,14 @@ def DS_translate(in_file,
 import swat
 """
 
-## reading score code hostname
-    if (hostname is None):
-        first_char = rawScore.find("Host:") + 5
-        last_char = rawScore.find(";\n* Encoding:")
-        hostname = rawScore[first_char:last_char].strip()
-
 ## writing score code
-    pyscore += """
+    if asynchronous:
+        pyscore_header = _async_header_code()
+        pyscore_header += 'DATA_STEP = \"\"\"\n'
+    elif connection_pool:
+        pyscore_header += _pooled_connection_code(hostname)
+    else:
+        pyscore_header += """
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -79,12 +227,82 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(hostname)
 
-    pyscore += "out = conn.dataStep.runCode("
-    pyscore +=	'code = \"\"\"\n'
-    pyscore += DSScore
-    pyscore += '\"\"\")\n'
+    if partitions or pipelined:
+        pyscore_header += """## Defining tables variables
+in_caslib = \"{}\"
+in_castable = \"{}\"
+out_caslib = \"{}\"
+out_castable = \"{}\"
 
-    pyscore += """
+""".format(in_caslib, in_castable, out_caslib, out_castable)
+        tables = ("in_caslib", "in_castable", [("out_caslib", "out_castable")])
+    else:
+        tables = ('"{}"'.format(in_caslib), '"{}"'.format(in_castable), [('"{}"'.format(out_caslib), '"{}"'.format(out_castable))])
+
+## uploading the local input data first, the scoring reads it from the input table
+    if upload_file is not None and not pipelined:
+        pyscore_header += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+    if watermark_column is not None:
+        pyscore_header += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables,
+                                                  promote = bool(partitions))
+
+    if partitions or code_table or pipelined:
+        pyscore_header += 'DATA_STEP = \"\"\"\n'
+    elif not asynchronous:
+        pyscore_header += "out = conn.dataStep.runCode("
+        pyscore_header += 'code = \"\"\"\n'
+
+    pyscore_footer = '\"\"\")\n'
+
+## storing the score code in a CAS table once, then running it from there
+    if code_table:
+        pyscore_footer = '\"\"\"\n\n'
+        pyscore_footer += _code_table_code(code_caslib)
+        if not partitions and not pipelined:
+            if watermark_column is not None:
+                pyscore_footer += _run_code_table_code('"{}"'.format(out_caslib), '"{}"'.format(in_castable + _NEW_ROWS),
+                                                       '"{}"'.format(out_caslib), '"{}"'.format(out_castable + _NEW_ROWS))
+            else:
+                pyscore_footer += _run_code_table_code('"{}"'.format(in_caslib), '"{}"'.format(in_castable),
+                                                       '"{}"'.format(out_caslib), '"{}"'.format(out_castable))
+
+## writing the partitioned scoring, every part on its own session
+    if partitions and code_table:
+        pyscore_footer += _partitioned_code(hostname,
+                                            _run_code_table_code("part_caslib", "part_castable", "out_caslib", "part_out",
+                                                                 conn = "session", where = "where", promote = True,
+                                                                 result = "result")
+                                            + 'check(result, "dataStep.runCodeTable")\n',
+                                            partitions, partition_column, connection_pool = connection_pool,
+                                            drop_partition_column = True)
+    elif partitions:
+        pyscore_footer = '\"\"\"\n\n'
+        pyscore_footer += _partitioned_code(hostname, """code = "data {}.{}(promote=yes);\\n    set {}.{}(where=({}));\\n\\n"
+code = code.format(out_caslib, part_out, part_caslib, part_castable, where)
+check(session.dataStep.runCode(code = code + DATA_STEP + "\\nrun;\\n"), "dataStep.runCode")
+""", partitions, partition_column, connection_pool = connection_pool, drop_partition_column = True)
+
+## writing the pipelined scoring, the chunks of the local file go through three threads
+    if pipelined and code_table:
+        pyscore_footer += _pipelined_code(hostname,
+                                          _run_code_table_code("chunk_caslib", "chunk_in", "chunk_caslib", "chunk_out",
+                                                               conn = "session", promote = True, result = "result")
+                                          + 'check(result, "dataStep.runCodeTable")\n',
+                                          upload_file, download_file, upload_chunk_rows,
+                                          connection_pool = connection_pool)
+    elif pipelined:
+        pyscore_footer = '\"\"\"\n\n'
+        pyscore_footer += _pipelined_code(hostname, """code = "data {}.{}(promote=yes);\\n    set {}.{};\\n\\n"
+code = code.format(chunk_caslib, chunk_out, chunk_caslib, chunk_in)
+check(session.dataStep.runCode(code = code + DATA_STEP + "\\nrun;\\n"), "dataStep.runCode")
+""", upload_file, download_file, upload_chunk_rows, connection_pool = connection_pool)
+
+    if watermark_column is not None:
+        pyscore_footer += _incremental_end_code(*tables)
+
+    if not pipelined:
+        pyscore_footer += """
 ### uncomment following lines if you want to drop previous table
 
 #conn.table.dropTable(name = \"{}\",
@@ -95,12 +313,12 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(out_castable, out_caslib)
 
-    pyscore += """
+        pyscore_footer += """
 #conn.table.promote(name = \"{}\",
 #                   caslib = \"{}\")
                    
 """.format(out_castable, out_caslib)
-    pyscore += """
+        pyscore_footer += """
 ## Defining the scored table in Python
 
 scored_table = conn.CASTable(name = \"{}\",
@@ -109,10 +327,283 @@ scored_table = conn.CASTable(name = \"{}\",
 scored_table.head()
 """.format(out_castable, out_caslib)
 
+## downloading the output table to a local file, page by page
+    if download_file is not None and not pipelined:
+        pyscore_footer += _download_code('"{}"'.format(out_caslib), '"{}"'.format(out_castable),
+                                         download_file, download_page_rows)
+
+    if connection_pool:
+        pyscore_footer += _pooled_release_code()
+
+    if asynchronous:
+        pyscore_footer = '\"\"\"\n'
+        pyscore_footer += _async_score_code(hostname,
+                                            'await cas.action("dataStep.runCode", code = DATA_STEP)\n',
+                                            [('\"{}\"'.format(out_caslib), '\"{}\"'.format(out_castable))])
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore_header = _instrument_code(pyscore_header, metrics_file, os.path.basename(in_file))
+
+## saving to file
+
+    if not stream:
+        DSScore = "".join([data_step_header, rawScore, data_step_footer])
+        pyscore = "".join([pyscore_header, DSScore, pyscore_footer])
+
+        f = open(out_file, "wt")
+        f.write(pyscore)
+        f.close()
+
+## streaming the score code to the file chunk by chunk, memory use does not depend on the code size
+    if stream:
+        with zipfile.ZipFile(in_file, "r") as archives, \
+             io.TextIOWrapper(archives.open("dmcas_scorecode.sas"), encoding = "UTF-8", newline = "") as member, \
+             open(out_file, "wt", newline = "") as f:
+            f.write(pyscore_header)
+            f.write(data_step_header)
+            chunk = member.read(chunk_size)
+            while chunk:
+                f.write(chunk)
+                chunk = member.read(chunk_size)
+            f.write(data_step_footer)
+            f.write(pyscore_footer)
+
+        DSScore = None
+        pyscore = None
+        if return_code:
+            with open(out_file, "rt", newline = "") as f:
+                pyscore = f.read()
+            DSScore = pyscore[len(pyscore_header):len(pyscore) - len(pyscore_footer)]
+
+    print("The file was successfully written to {}".format(out_file))
+
+    if not return_code:
+        DSScore = None
+        pyscore = None
+
+    out = dict({"data_step": DSScore,
+                "py_code": pyscore,
+                "out_caslib": out_caslib,
+                "out_castable": out_castable,
+                "out_file": out_file})
+
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
+
+##################################
+###### DS Multi Translate   ######
+###### fused DS translator  ######
+##################################
+
+def DS_translate_multi(in_files,
+                       in_caslib, in_castable,
+                       out_caslib, out_castable,
+                       out_file = "dmcas_multiscorecode.py",
+                       hostname = None,
+                       prefixes = None,
+                       connection_pool = False,
+                       watermark_column = None,
+                       watermark_file = None,
+                       metrics_file = None,
+                       download_file = None,
+                       download_page_rows = 100000,
+                       upload_file = None,
+                       upload_chunk_rows = 100000):
+    """ Writes a .py file that scores several DataStep (not DS2) models in a single DATA step, so the
+    input table is read once and one output table has the predictions of every model. The variables
+    that a model defines and another model also uses are renamed with a per model prefix
+    (`P_BAD1` becomes `M1_P_BAD1`, `_LP0` becomes `_M1_LP0`). Inputs that a model changes in place,
+    such as imputed values, are copied to the prefixed name first so the other models still read
+    the original values.
+
+    Parameters
+    ----------
+    in_files : list
+        The filepaths of the .zip files (with dmcas_scorecode.sas) downloaded through the SAS Viya GUI
+    in_caslib : str
+        Name of the input table caslib 
+    in_castable : str 
+        Name of the input table
+    out_caslib : str
+        Name of the output table caslib
+    out_castable  : str
+        Name of the output table
+    out_file : str
+        Name and path of the output file. Default: "dmcas_multiscorecode.py"
+    hostname : str
+        Name of the hostname. Default: None, will try to guess from the first file.
+    prefixes : list
+        One variable prefix per model. Default: `None`, "M1_", "M2_", ...
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output table, which is promoted so it outlives the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+
+    Returns
+    -------
+    Dict
+        A dict with the data step, the python score code, out castable, out caslib, the written file path
+        and, in "renamed", the variables renamed for each model (by .zip filepath).
+
+    Example 
+    -------
+    DS_translate_multi(["logistic.zip", "tree.zip"], "public", "hmeq", "casuser", "hmeq_scored")
+    """
+
+    if prefixes is None:
+        prefixes = ["M{}_".format(number + 1) for number in range(len(in_files))]
+    if len(prefixes) != len(in_files):
+        raise Exception("prefixes must have one prefix per file in in_files")
+
+## writing the shared connection pool module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+
+## reading the score codes and the variables each one defines and uses
+    models = []
+    for in_file in in_files:
+        with zipfile.ZipFile(in_file, "r") as archives:
+            rawScore = archives.read("dmcas_scorecode.sas").decode("UTF-8")
+        tokens = tokenize(rawScore)
+        models.append((in_file, rawScore, tokens) + variable_usage(tokens))
+
+## reading score code hostname from the first model
+    if (hostname is None):
+        rawScore = models[0][1]
+        first_char = rawScore.find("Host:") + 5
+        last_char = rawScore.find(";\n* Encoding:")
+        hostname = rawScore[first_char:last_char].strip()
+
+## renaming what a model defines (labels included) and any other model uses
+    all_names = set().union(*[model[5] for model in models])
+    blocks = []
+    renamed = {}
+
+    for number, (in_file, rawScore, tokens, defined, read_first, names, labels) in enumerate(models):
+        others = set().union(*[model[5] for other, model in enumerate(models) if other != number])
+
+        spelling = {}
+        for kind, text in tokens:
+            if kind == "name":
+                spelling.setdefault(text.lower(), text)
+
+        renames = {name: prefixed_name(spelling[name], prefixes[number])
+                   for name in sorted((defined | labels) & others)}
+
+        clashes = [new_name for new_name in renames.values() if new_name.lower() in all_names]
+        if clashes:
+            raise Exception("Renamed variables {} already exist in the score codes, "
+                            "use other prefixes".format(clashes))
+
+        block = "/* Model {}: {} */\n".format(number + 1, os.path.basename(in_file))
+        for name in sorted(read_first & set(renames)):
+            block += "{} = {};\n".format(renames[name], spelling[name])
+        block += rename(tokens, renames)
+
+        blocks.append(block)
+        renamed[in_file] = {spelling[name]: new_name for name, new_name in renames.items()}
+
+## in incremental mode the new rows are read from a view and their scores written to a new table
+    if watermark_column is None:
+        data_step_header = "data " + out_caslib + "." + out_castable + ";\n" \
+                           "    set " + in_caslib + "." + in_castable + ";\n"
+    else:
+        data_step_header = "data " + out_caslib + "." + out_castable + _NEW_ROWS + ";\n" \
+                           "    set " + out_caslib + "." + in_castable + _NEW_ROWS + ";\n"
+
+    DSScore = "".join([data_step_header,
+                       "\n",
+                       "\n\n".join(blocks),
+                       "\n" + "run;\n"])
+
+## writing code header 
+    pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
+# documentation: https://github.com/sassoftware/python-swat/
+# pip install swat
+# conda install -c sas-institute swat
+                
+import swat
+"""
+
+## writing score code
+    if connection_pool:
+        pyscore += _pooled_connection_code(hostname)
+    else:
+        pyscore += """
+conn = swat.CAS(hostname = \"{}\", ## change if needed
+                port = 8777,
+                protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
+                username='username', ## use your own credentials
+                password='password') ## we encorage using .authinfo \n
+
+""".format(hostname)
+
+    tables = ('"{}"'.format(in_caslib), '"{}"'.format(in_castable), [('"{}"'.format(out_caslib), '"{}"'.format(out_castable))])
+## uploading the local input data first, the scoring reads it from the input table
+    if upload_file is not None:
+        pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+    if watermark_column is not None:
+        pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables)
+
+    pyscore += "## {} models scored in a single pass over the input table\n".format(len(models))
+    pyscore += "out = conn.dataStep.runCode("
+    pyscore += 'code = \"\"\"\n'
+    pyscore += DSScore
+    pyscore += '\"\"\")\n'
+
+    if watermark_column is not None:
+        pyscore += _incremental_end_code(*tables)
+
+    pyscore += """
+## Defining the scored table in Python, with the predictions of every model
+
+scored_table = conn.CASTable(name = \"{}\",
+                             caslib = \"{}\")
+
+scored_table.head()
+""".format(out_castable, out_caslib)
+
+## downloading the output table to a local file, page by page
+    if download_file is not None:
+        pyscore += _download_code('"{}"'.format(out_caslib), '"{}"'.format(out_castable),
+                                  download_file, download_page_rows)
+
+    if connection_pool:
+        pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, ", ".join(os.path.basename(in_file) for in_file in in_files))
+
 ## saving to file
 
     f = open(out_file, "wt")
-    f.writelines(pyscore)
+    f.write(pyscore)
     f.close()
 
     print("The file was successfully written to {}".format(out_file))
@@ -121,7 +612,8 @@ scored_table.head()
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable": out_castable,
-                "out_file": out_file})
+                "out_file": out_file,
+                "renamed": renamed})
 
 ##################################
 ###### EPS Translate        ######
@@ -133,7 +625,23 @@ def EPS_translate(in_file,
                 out_caslib, out_castable,
                 hostname = "myserver.com",
                 out_file = "dmcas_epscorecode.py",
-                copyVars = None):
+                copyVars = None,
+                cache = None,
+                connection_pool = False,
+                stream_upload = False,
+                check_resident = False,
+                asynchronous = False,
+                service = False,
+                partitions = None,
+                partition_column = None,
+                watermark_column = None,
+                watermark_file = None,
+                metrics_file = None,
+                download_file = None,
+                download_page_rows = 100000,
+                upload_file = None,
+                upload_chunk_rows = 100000,
+                pipelined = False):
 
     """Writes a .py file, transforming the DS2 code, extract the astore name and
      create an astore call written using SWAT. The reason for that is because the DS2 is
@@ -157,6 +665,63 @@ def EPS_translate(in_file,
         sas viya hostname to be used, not available inside the DS2 code
     copyVars : list
         list of column names to copy to output table, if "ALL" will copy all score table data. Default: `None`
+        When the export lists its input variables (inputVar.json), "ALL" is resolved to them at translation time,
+        without a round trip at run time.
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    stream_upload : bool
+        If `True` the script uploads the astore streaming it straight out of `in_file` in bounded chunks
+        (CAS REST `table.upload`), without extracting it nor holding it whole in memory. Default: `False`
+    check_resident : bool
+        If `True` the script skips the astore load when it is already in memory. When the astore is inside
+        `in_file` the in-memory table is named after its checksum, so identical astores are loaded once.
+        Otherwise the astore is only looked up by its name. Default: `False`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    service : bool
+        If `True` the script is a real time scoring service (aiohttp, implies `asynchronous`): the astore
+        is loaded once per session, concurrent requests are coalesced into micro-batches scored by one
+        `astore.score` call, and `python script.py load-test rows.json` reports its throughput and
+        p99 latency. Default: `False`
+    partitions : int
+        If set, the script splits the input table in this many parts and scores them at the same time,
+        each on its own session (thread pool), then appends them into `out_castable` and prints the time
+        of every part. A failed part is scored again alone. Default: `None`
+    partition_column : str
+        Only used with `partitions`. Numeric column splitting the input with `mod()`, when `None` the rows
+        are numbered in a temporary copy of the input table. Default: `None`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output table, which is promoted so it outlives the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+    pipelined : bool
+        If `True` the script scores `upload_file` into `download_file` in chunks of `upload_chunk_rows` rows,
+        uploading, scoring and downloading consecutive chunks at the same time on three threads and sessions,
+        so the run takes about the time of the slowest of the three. No output table is kept. Default: `False`
 
     Returns
     -------
@@ -169,11 +734,45 @@ def EPS_translate(in_file,
 
     """
 
+    arguments = dict(locals())
+    asynchronous = asynchronous or service
+    _check_partitions(partitions, asynchronous)
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+    _check_pipelined(pipelined, upload_file, download_file, asynchronous, partitions, watermark_column)
+
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments
+    cache = _open_cache(cache)
+    if cache is not None:
+        cache_key = cache.key(in_file, "dmcas_epscorecode.sas", "EPS_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
 ## reading score code
-    archives = zipfile.ZipFile(in_file, "r")
-    rawScore = archives.read("dmcas_epscorecode.sas").decode("UTF-8")
+    with zipfile.ZipFile(in_file, "r") as archives:
+        rawScore = archives.read("dmcas_epscorecode.sas").decode("UTF-8")
+
+        astore_name = find_astore_name(rawScore)
+        variables = input_variables(archives)
+
+        if stream_upload:
+            astore_member = find_astore_member(archives, [astore_name + ".sashdat", astore_name + ".astore"])
+        if check_resident:
+            checksum = astore_checksum(archives, [astore_name + ".sashdat", astore_name + ".astore"])
 
-    astore_name = re.search('_\w+_ast', rawScore).group(0)
+## resolving "ALL" from the input variables of the export when it lists them, no round trip at run time
+    if not service:
+        copyVars = resolve_copy_vars(copyVars, variables)
 
     if copyVars == None:
         copyVars_ = "column_names = None\n"
@@ -200,6 +799,11 @@ column_names = score_table.columns.tolist()
 import swat
 
 """
+    if service:
+        pyscore = _service_header_code()
+    elif asynchronous:
+        pyscore = _async_header_code()
+
 ## defining variables
     pyscore += """## Defining tables and models variables
 in_caslib = \"{}\"
@@ -211,8 +815,50 @@ astore_file_name = \"{}\"
 
 """.format(in_caslib, in_castable, out_caslib, out_castable, astore_name, astore_name + ".sashdat")
 
+## writing the asyncio coroutine (or the service), the CAS calls are awaited inside `score()`
+    if asynchronous:
+        if stream_upload:
+            load_code = _async_upload_code(in_file, astore_member, '"Models"', "astore_name")
+        else:
+            load_code = """## Loading model to memory
+## assuming the model is already inside the viya server
+await cas.action("table.loadTable", caslib = "Models",
+                 path = astore_file_name, #case sensitive
+                 casOut = {"name": astore_name,
+                           "caslib": "Models"})
+"""
+        if check_resident:
+            load_code = _async_resident_code(load_code, '"Models"', "astore_name", checksum)
+
+    if service:
+        load_code += """
+await cas.action("builtins.loadActionSet", actionSet = "astore")
+"""
+        pyscore += _service_code(hostname, load_code, """await cas.action("astore.score", table = {"caslib": batch_caslib, "name": table},
+                 out = {"caslib": batch_caslib, "name": out, "replace": True},
+                 copyVars = copy_vars(columns),
+                 rstore = {"name": astore_name, "caslib": "Models"})
+""", copyVars = copyVars)
+
+    elif asynchronous:
+        body = load_code + "\n"
+        body += _async_column_names_code(copyVars) + "\n"
+        body += """## loading astore actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "astore")
+
+await cas.action("astore.score", table = {"caslib": in_caslib, "name": in_castable},
+                 out = {"caslib": out_caslib, "name": out_castable, "replace": True},
+                 copyVars = column_names,
+                 rstore = {"name": astore_name, "caslib": "Models"})
+"""
+        pyscore += _async_score_code(hostname, body, [("out_caslib", "out_castable")])
+
+    else:
 ## writing connection
-    pyscore += """## Connecting to SAS Viya
+        if connection_pool:
+            pyscore += _pooled_connection_code(hostname)
+        else:
+            pyscore += """## Connecting to SAS Viya
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -221,8 +867,21 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(hostname)
 
+        tables = ("in_caslib", "in_castable", [("out_caslib", "out_castable")])
+## uploading the local input data first, the scoring reads it from the input table
+        if upload_file is not None and not pipelined:
+            pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+        if watermark_column is not None:
+            pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables,
+                                               promote = bool(partitions))
+
 ## writing model call
-    pyscore += """## Loading model to memory
+        if stream_upload:
+            load_code = _streamed_astore_upload_code(in_file, astore_member, hostname,
+                                                     astore_caslib = '"Models"', astore_name = "astore_name")
+        else:
+            load_code = """## Loading model to memory
 ## assuming the model is already inside the viya server
 conn.table.loadTable(caslib= "Models",
                       path = astore_file_name, #case sensitive
@@ -231,11 +890,40 @@ conn.table.loadTable(caslib= "Models",
                                 )
 
 """
-    ## writing column names code
-    pyscore += copyVars_ + "\n"
+        if check_resident:
+            load_code = _resident_astore_code(load_code, '"Models"', "astore_name", checksum)
+        elif partitions or pipelined:
+            load_code += _promote_astore_code('"Models"', "astore_name")
+
+        pyscore += load_code
+
+        ## writing column names code, the pipelined chunks copy the columns of the local file
+        if not pipelined:
+            pyscore += copyVars_ + "\n"
+
+        ## writing the partitioned astore scoring, every part on its own session
+        if partitions:
+            pyscore += _partitioned_code(hostname, """session.loadActionSet("astore")
+check(session.astore.score(table = {"caslib": part_caslib, "name": part_castable, "where": where},
+                           out = {"caslib": out_caslib, "name": part_out, "promote": True},
+                           copyVars = column_names,
+                           rstore = {"name": astore_name, "caslib": "Models"}),
+      "astore.score")
+""", partitions, partition_column, connection_pool = connection_pool)
+
+        ## writing the pipelined astore scoring, the chunks of the local file go through three threads
+        elif pipelined:
+            pyscore += _pipelined_code(hostname, """check(session.astore.score(table = {"caslib": chunk_caslib, "name": chunk_in},
+                           out = {"caslib": chunk_caslib, "name": chunk_out, "promote": True},
+                           copyVars = copy_vars(columns),
+                           rstore = {"name": astore_name, "caslib": "Models"}),
+      "astore.score")
+""", upload_file, download_file, upload_chunk_rows, prepare_code = 'session.loadActionSet("astore")\n',
+                                       copyVars = copyVars, connection_pool = connection_pool)
 
-    ## writing astore
-    pyscore +="""## loading astore actionset and scoring
+        else:
+            ## writing astore
+            pyscore +="""## loading astore actionset and scoring
 conn.loadActionSet("astore")
 
 conn.astore.score(table = {"caslib": in_caslib, "name": in_castable},
@@ -244,13 +932,29 @@ conn.astore.score(table = {"caslib": in_caslib, "name": in_castable},
                    rstore = {"name": astore_name, "caslib": "Models"}
               )
 
-## Obtaining output/results table
+"""
+        if watermark_column is not None:
+            pyscore += _incremental_end_code(*tables)
+
+        if not pipelined:
+            pyscore += """## Obtaining output/results table
 scored_table = conn.CASTable(name = out_castable,
                               caslib = out_caslib)
                               
 scored_table.head()
 
 """
+## downloading the output table to a local file, page by page
+        if download_file is not None and not pipelined:
+            pyscore += _download_code("out_caslib", "out_castable", download_file, download_page_rows)
+
+        if connection_pool:
+            pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, os.path.basename(in_file), rest_upload = stream_upload)
+
     ## saving to file
 
     f = open(out_file, "wt")
@@ -259,8 +963,13 @@ scored_table.head()
 
     print("The file was successfully written to {}".format(out_file))
 
-    return dict({"ds2_raw": rawScore,
+    out = dict({"ds2_raw": rawScore,
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable": out_castable,
-                "out_file": out_file})
\ No newline at end of file
+                "out_file": out_file})
+
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
\ No newline at end of file
@@ -0,0 +1,164 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib
+import re
+import zipfile
+
+__all__ = ["translate", "score_code_type"]
+
+## module of each translator, imported the first time the translator is used
+_REGISTRY = {
+    "DS_translate": "datastep_translators",
+    "EPS_translate": "datastep_translators",
+    "nlp_sentiment_translate": "nlp_translator",
+    "nlp_category_translate": "nlp_translator",
+    "nlp_concepts_translate": "nlp_translator",
+    "nlp_topics_translate": "nlp_translator"
+}
+
+## name of the output table argument of each translator
+_OUT_CASTABLE_ARGUMENT = {
+    "DS_translate": "out_castable",
+    "EPS_translate": "out_castable",
+    "nlp_sentiment_translate": "out_castable_sentiment",
+    "nlp_category_translate": "out_castable_category",
+    "nlp_concepts_translate": "out_castable_concepts",
+    "nlp_topics_translate": "out_castable"
+}
+
+## the binary tables of the category and concepts models are set by %let statements at the top
+## of ScoreCode.sas, before any proc or data step
+_VTA_BINARY = re.compile(r"%let\s+(mco|liti)_binary_caslib\b|^\s*(?:proc|data)\s", re.IGNORECASE | re.MULTILINE)
+
+## bytes of ScoreCode.sas decompressed at a time while looking for the binary macro variables
+_SNIFF_CHUNK = 8 * 1024
+
+
+def _translator(name):
+    """ The translator function called `name`, its module is imported on first use. """
+
+    if name not in _REGISTRY:
+        raise Exception("{} is not a translator, use one of: {}".format(name, ", ".join(_REGISTRY)))
+
+    module = importlib.import_module("." + _REGISTRY[name], __package__)
+    return getattr(module, name)
+
+##################################
+###### Score code sniffing  ######
+##################################
+
+def _vta_score_code_type(archives):
+    """ Tells the VTA exports sharing ScoreCode.sas apart, decompressing only its %let header. """
+
+    tail = ""
+    with archives.open("ScoreCode.sas") as member:
+        chunk = member.read(_SNIFF_CHUNK)
+        while chunk:
+            text = tail + chunk.decode("UTF-8", "ignore")
+            match = _VTA_BINARY.search(text)
+            if match is not None:
+                if match.group(1) is not None and match.group(1).lower() == "mco":
+                    return "nlp_category_translate"
+                if match.group(1) is not None:
+                    return "nlp_concepts_translate"
+                break
+            ## a statement may be cut between two chunks
+            tail = text[-64:]
+            chunk = member.read(_SNIFF_CHUNK)
+
+    return "nlp_sentiment_translate"
+
+
+def score_code_type(in_file):
+    """ Identifies which translator handles a score code .zip file exported from SAS Viya. The export
+    type is read from the member names of the zip central directory, only the VTA category, concepts
+    and sentiment exports need the first statements of their ScoreCode.sas.
+
+    Parameters
+    ----------
+    in_file : str
+        The filepath of the .zip file downloaded through the SAS Viya GUI
+
+    Returns
+    -------
+    str
+        The name of the translator function, e.g. "DS_translate" or "nlp_category_translate".
+
+    Example
+    -------
+    score_code_type("filepath.zip")
+    """
+
+    with zipfile.ZipFile(in_file, "r") as archives:
+        members = set(archives.namelist())
+
+        if "dmcas_scorecode.sas" in members:
+            return "DS_translate"
+        if "dmcas_epscorecode.sas" in members:
+            return "EPS_translate"
+
+        ## only the sentiment models are exported with an astore next to their ScoreCode.sas
+        if "ScoreCode.sas" in members and "AstoreScoreCode.sas" in members:
+            return "nlp_sentiment_translate"
+        if "ScoreCode.sas" in members:
+            return _vta_score_code_type(archives)
+
+        if "AstoreScoreCode.sas" in members:
+            return "nlp_topics_translate"
+
+    raise Exception("{} does not contain a known score code file".format(in_file))
+
+##################################
+###### Translate            ######
+##################################
+
+def translate(in_file,
+              in_caslib, in_castable,
+              out_caslib, out_castable,
+              translator = None,
+              **kwargs):
+    """ Translates any score code .zip file exported from SAS Viya, calling the translator that
+    handles it (see `score_code_type`). Only the module of that translator is imported.
+
+    Parameters
+    ----------
+    in_file : str
+        The filepath of the .zip file downloaded through the SAS Viya GUI
+    in_caslib : str
+        Name of the input table caslib
+    in_castable : str
+        Name of the input table
+    out_caslib : str
+        Name of the output table caslib
+    out_castable : str
+        Name of the output table, passed as `out_castable_sentiment`, `out_castable_category` or
+        `out_castable_concepts` to the VTA translators
+    translator : str
+        Name of the translator function, e.g. "EPS_translate". Default: `None`, read from `in_file`
+    **kwargs
+        Other arguments of the translator, e.g. `out_file`, `hostname` or, for the sentiment, category
+        and concepts models, `key_column` and `document_column`
+
+    Returns
+    -------
+    Dict
+        What the translator returns, with its name in "translator".
+
+    Example
+    -------
+    translate("filepath.zip", "public", "hmeq", "casuser", "hmeq_scored", out_file = "score.py")
+    """
+
+    name = translator or score_code_type(in_file)
+    function = _translator(name)
+
+    kwargs[_OUT_CASTABLE_ARGUMENT[name]] = out_castable
+    out = function(in_file = in_file,
+                   in_caslib = in_caslib,
+                   in_castable = in_castable,
+                   out_caslib = out_caslib,
+                   **kwargs)
+    out["translator"] = name
+
+    return out
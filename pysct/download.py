@@ -0,0 +1,87 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## fetches the output table page by page into a local Parquet or CSV file, then reports the throughput
+_DOWNLOAD_CODE = '''## Downloading the whole output table in pages of DOWNLOAD_PAGE_ROWS rows, each page is written to
+## DOWNLOAD_FILE as it arrives so the memory used does not depend on the size of the table
+import os
+import sys
+import time
+
+DOWNLOAD_FILE = "{download_file}" ## .parquet (pip install pyarrow) or .csv
+DOWNLOAD_PAGE_ROWS = {page_rows} ## rows fetched per table.fetch call
+
+
+def download_table(caslib, name, path, page_rows):
+    parquet = path.lower().endswith(".parquet")
+    if parquet:
+        import pyarrow
+        import pyarrow.parquet
+
+    rows = 0
+    writer = None
+    try:
+        while True:
+            page = conn.table.fetch(table = {{"caslib": caslib, "name": name}},
+                                    to = rows + page_rows,
+                                    maxRows = page_rows,
+                                    index = False,
+                                    **{{"from": rows + 1}})["Fetch"]
+            if len(page) == 0:
+                break
+            if parquet:
+                table = pyarrow.Table.from_pandas(page, preserve_index = False)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                page.to_csv(path, mode = "a" if rows else "w", header = not rows, index = False)
+            rows += len(page)
+            if len(page) < page_rows:
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError: ## windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024.0
+
+
+download_started = time.perf_counter()
+downloaded_rows = download_table({out_caslib}, {out_castable}, DOWNLOAD_FILE, DOWNLOAD_PAGE_ROWS)
+download_seconds = max(time.perf_counter() - download_started, 1e-9)
+download_mb = os.path.getsize(DOWNLOAD_FILE) / 1024.0 ** 2 if os.path.exists(DOWNLOAD_FILE) else 0.0
+
+print("Downloaded {{}} rows to {{}} in {{:.2f}}s: {{:.0f}} rows/s, {{:.2f}} MB/s, peak memory {{}} MB".format(
+      downloaded_rows, DOWNLOAD_FILE, download_seconds, downloaded_rows / download_seconds,
+      download_mb / download_seconds, "-" if peak_rss_mb() is None else "{{:.0f}}".format(peak_rss_mb())))
+
+'''
+
+##################################
+###### Output download      ######
+##################################
+
+def _download_code(out_caslib, out_castable, download_file, page_rows = 100000):
+    """ Python code fetching the whole `out_caslib.out_castable` table (python expressions of the
+    generated script) in pages of `page_rows` rows into the local `download_file`. """
+
+    if not download_file.lower().endswith((".parquet", ".csv")):
+        raise Exception("download_file must be a .parquet or a .csv file")
+
+    return _DOWNLOAD_CODE.format(download_file = download_file.replace("\\", "/"),
+                                 page_rows = page_rows,
+                                 out_caslib = out_caslib,
+                                 out_castable = out_castable)
+
+
+def _check_download(download_file, asynchronous):
+    if download_file is not None and asynchronous:
+        raise Exception("download_file is only available for the SWAT scripts, not with asynchronous or service")
@@ -0,0 +1,128 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+##################################
+###### Incremental scoring  ######
+##################################
+
+## suffix of the view of the new input rows and of the tables their scores are written to
+_NEW_ROWS = "_pysct_new"
+
+
+def _new_rows_name(name):
+    """ Python expression of the `name` expression with the `_NEW_ROWS` suffix. """
+
+    if name.startswith("\"") and name.endswith("\""):
+        return name[:-1] + _NEW_ROWS + "\""
+    return "{} + \"{}\"".format(name, _NEW_ROWS)
+
+
+def _watermark_file_code(out_file, watermark_file = None):
+    """ Python expression of the high-water mark file path, next to the script by default. """
+
+    if watermark_file is not None:
+        return "\"{}\"".format(watermark_file.replace("\\", "/"))
+
+    name = os.path.splitext(os.path.basename(out_file))[0] + ".watermark.json"
+    return "os.path.join(os.path.dirname(os.path.abspath(__file__)), \"{}\")".format(name)
+
+
+def _incremental_start_code(watermark_column, watermark_file, in_caslib, in_castable, outputs,
+                            promote = False):
+    """ Python code, run once `conn` is open, reading the high-water mark and defining the view of the
+    input rows past it. `in_caslib`, `in_castable` and the (caslib, name) `outputs` are python
+    expressions of the generated script. When they are variables they are switched to the view and to
+    the tables of the new scores, so the scoring code after it is left as is. The view is promoted
+    with `promote`, for the partitions scored on other sessions, and dropped by `_incremental_end_code`. """
+
+    outputs_code = ", ".join("({}, {})".format(caslib, name) for caslib, name in outputs)
+    view_caslib = outputs[0][0]
+
+    code = """## Incremental scoring: only the rows whose {0} is above the high-water mark of the last run
+## are scored, then appended to the output tables (promoted, so they outlive the session)
+import json
+import math
+import os
+
+WATERMARK_COLUMN = \"{0}\" ## timestamp or increasing numeric key of the input table
+WATERMARK_FILE = {1} ## delete it to score the whole table again
+
+watermark = None
+if os.path.exists(WATERMARK_FILE):
+    with open(WATERMARK_FILE) as f:
+        watermark = json.load(f)["watermark"]
+
+incremental_tables = [{2}]
+
+## without the output tables there is nothing to append to, the whole table is scored again
+if watermark is not None and not all(conn.table.tableExists(caslib = caslib, name = name).exists > 0
+                                     for caslib, name in incremental_tables):
+    watermark = None
+
+## the high-water mark is read before scoring, rows added meanwhile are left for the next run
+high_watermark = float(conn.simple.summary(table = {{"caslib": {3}, "name": {4}}},
+                                           inputs = [WATERMARK_COLUMN],
+                                           subSet = ["MAX"]).Summary["Max"][0])
+if math.isnan(high_watermark):
+    high_watermark = watermark
+new_rows = "0 = 1" if high_watermark is None else "{{}} <= {{!r}}".format(WATERMARK_COLUMN, high_watermark)
+if watermark is not None:
+    new_rows = "{{}} > {{!r}} and ".format(WATERMARK_COLUMN, watermark) + new_rows
+
+{7}conn.table.view(caslib = {5}, name = {6}, replace = True,{8}
+                tables = [{{"caslib": {3}, "name": {4}, "where": new_rows}}])
+""".format(watermark_column, watermark_file, outputs_code, in_caslib, in_castable, view_caslib,
+           _new_rows_name(in_castable),
+           "" if not promote else "## promoted, the partitions are scored on sessions that only see global tables\n"
+                                  "conn.table.dropTable(caslib = {}, name = {}, quiet = True)\n"
+                                  .format(view_caslib, _new_rows_name(in_castable)),
+           "" if not promote else " promote = True,")
+
+    if in_castable.isidentifier():
+        code += "\n## scoring the new rows only\n"
+        code += "in_caslib_all, in_castable_all = {0}, {1}\n".format(in_caslib, in_castable)
+        code += "{0}, {1} = {2}, {3}\n".format(in_caslib, in_castable, view_caslib, _new_rows_name(in_castable))
+        for caslib, name in outputs:
+            code += "{} = {}\n".format(name, _new_rows_name(name))
+
+    return code + "\n"
+
+
+def _incremental_end_code(in_caslib, in_castable, outputs):
+    """ Python code, run after the scoring, appending the new scores to the output tables and saving
+    the high-water mark. Takes the same expressions as `_incremental_start_code`. """
+
+    view_caslib = outputs[0][0]
+
+    code = "\n## Appending the new scores to the output tables and saving the high-water mark\n"
+    if in_castable.isidentifier():
+        code += "{0}, {1} = in_caslib_all, in_castable_all\n".format(in_caslib, in_castable)
+        for caslib, name in outputs:
+            code += "{0} = {0}[:-len(\"{1}\")]\n".format(name, _NEW_ROWS)
+
+    code += """conn.table.dropTable(caslib = {0}, name = {1}, quiet = True)
+
+for caslib, name in incremental_tables:
+    if watermark is None:
+        conn.table.dropTable(caslib = caslib, name = name, quiet = True)
+    conn.dataStep.runCode(code = "data {{0}}.{{1}}{{2}}; set {{0}}.{{1}}{2}; run;"
+                                 .format(caslib, name, "" if watermark is None else "(append=yes)"))
+    if watermark is None:
+        conn.table.promote(caslib = caslib, name = name)
+    conn.table.dropTable(caslib = caslib, name = name + "{2}", quiet = True)
+
+if high_watermark is not None:
+    with open(WATERMARK_FILE, "wt") as f:
+        json.dump({{"watermark": high_watermark, "column": WATERMARK_COLUMN}}, f)
+    print("Scored the rows up to " + WATERMARK_COLUMN + " = " + repr(high_watermark))
+
+""".format(view_caslib, _new_rows_name(in_castable), _NEW_ROWS)
+
+    return code
+
+
+def _check_incremental(watermark_column, asynchronous):
+    if watermark_column is not None and asynchronous:
+        raise Exception("watermark_column is only available for the SWAT scripts, not with asynchronous or service")
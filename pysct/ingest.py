@@ -0,0 +1,142 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## reads a local .csv or .parquet file as DataFrames of at most chunk_rows rows, csv_dtypes gives the
+## types of the .csv columns (and the lengths of the text ones) over the whole file so every chunk agrees
+_READ_CHUNKS_CODE = '''def read_chunks(path, chunk_rows, dtypes = None):
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size = chunk_rows):
+            yield batch.to_pandas()
+    else:
+        for chunk in pandas.read_csv(path, chunksize = chunk_rows, dtype = dtypes):
+            yield chunk
+
+
+def csv_dtypes(path, chunk_rows, lengths = None):
+    """ The types of the columns over the whole file. Each chunk of a .csv file is parsed on its own, a
+    column can be int in one chunk and float (a missing value) or text in another, or hold only missing
+    values in the first one. The chunks must agree to be appended, a .parquet file stores its types.
+    When given, the `lengths` dict is filled in the same pass with the longest value, in UTF-8 bytes,
+    of every text column, since CAS sizes CHAR columns with the first chunk uploaded. """
+    if path.lower().endswith(".parquet"):
+        if lengths is not None:
+            for chunk in read_chunks(path, chunk_rows):
+                text_lengths(chunk, lengths)
+        return None
+    dtypes = {}
+    widths = {}
+    for chunk in pandas.read_csv(path, chunksize = chunk_rows):
+        if lengths is not None:
+            text_lengths(chunk, widths, numbers = True)
+        for column, dtype in chunk.dtypes.items():
+            if chunk[column].isna().all():
+                continue
+            previous = dtypes.setdefault(column, dtype)
+            if previous != dtype:
+                numeric = all(pandas.api.types.is_numeric_dtype(item) and not pandas.api.types.is_bool_dtype(item)
+                              for item in (previous, dtype))
+                dtypes[column] = "float64" if numeric else "object"
+    if lengths is not None:
+        lengths.update((column, width) for column, width in widths.items()
+                       if not pandas.api.types.is_numeric_dtype(dtypes.get(column, "object")))
+    return dtypes
+
+
+def text_lengths(chunk, lengths, numbers = False):
+    """ Keeps in `lengths` the longest value of each text column of `chunk`, and of its numeric columns
+    as written when `numbers` (they become text when another chunk of the column has text). """
+    for column, dtype in chunk.dtypes.items():
+        values = chunk[column].dropna()
+        if len(values) == 0 or pandas.api.types.is_bool_dtype(dtype):
+            continue
+        if pandas.api.types.is_numeric_dtype(dtype):
+            if not numbers:
+                continue
+            values = values.iloc[[values.argmin(), values.argmax()]].astype(str)
+        width = int(values.astype(str).str.encode("UTF-8").str.len().max())
+        lengths[column] = max(lengths.get(column, 1), width)
+'''
+
+## builds the input table from a local file read and uploaded in chunks, before the scoring
+_INGEST_CODE = '''## Uploading the local input data to the input table before scoring, INGEST_CHUNK_ROWS rows at a time
+## so the memory used does not depend on the size of the file
+import time
+import pandas
+
+INGEST_FILE = "{upload_file}" ## .csv or .parquet (pip install pyarrow)
+INGEST_CHUNK_ROWS = {chunk_rows} ## rows read from the file and uploaded per call
+INGEST_BINARY = False ## True when conn uses the binary protocol (protocol='cas', port 5570)
+INGEST_BATCH_ROWS = {batch_rows} ## rows per buffer sent over the binary protocol
+
+
+{read_chunks_code}
+
+def upload_chunk(chunk, caslib, name):
+    if INGEST_BINARY:
+        ## the rows go straight to CAS as binary buffers, without a CSV copy
+        from swat.cas import datamsghandlers
+        handler = datamsghandlers.PandasDataFrame(chunk, nrecs = INGEST_BATCH_ROWS)
+        conn.addtable(table = name, caslib = caslib, replace = True, **handler.args.addtable)
+    else:
+        conn.upload_frame(chunk, casout = {{"caslib": caslib, "name": name, "replace": True}})
+
+
+def ingest(chunks, caslib, name, lengths = None):
+    """ Builds caslib.name from DataFrames, e.g. read_chunks(...) or [frame] for data already in memory.
+    The first chunk creates the table, the next ones are appended to it, then it is promoted so every
+    session finds it. CAS sizes the text columns with the first chunk, longer values of the next ones
+    would be cut: `lengths` (see csv_dtypes) gives the length of the text columns over all the chunks. """
+
+    rows = 0
+    created = False
+    length = "".join(" length '{{}}'n {{}};".format(column.replace("'", "''"),
+                                                "varchar(*)" if size > 32767 else "$" + str(size))
+                     for column, size in (lengths or {{}}).items())
+    conn.table.dropTable(caslib = caslib, name = name, quiet = True)
+    for chunk in chunks:
+        if not created and not length:
+            upload_chunk(chunk, caslib, name)
+        else:
+            upload_chunk(chunk, caslib, name + "_pysct_chunk")
+            conn.dataStep.runCode(code = "data {{0}}.{{1}}{{2}};{{3}} set {{0}}.{{1}}_pysct_chunk; run;"
+                                         .format(caslib, name, "(append=yes)" if created else "", length))
+        created = True
+        rows += len(chunk)
+    conn.table.dropTable(caslib = caslib, name = name + "_pysct_chunk", quiet = True)
+    conn.table.promote(caslib = caslib, name = name)
+    return rows
+
+
+ingest_started = time.perf_counter()
+ingest_lengths = {{}}
+ingested_rows = ingest(read_chunks(INGEST_FILE, INGEST_CHUNK_ROWS, csv_dtypes(INGEST_FILE, INGEST_CHUNK_ROWS, ingest_lengths)),
+                       {in_caslib}, {in_castable}, ingest_lengths)
+print("Uploaded {{}} rows from {{}} in {{:.2f}}s".format(ingested_rows, INGEST_FILE, time.perf_counter() - ingest_started))
+
+'''
+
+##################################
+###### Input upload         ######
+##################################
+
+def _ingest_code(in_caslib, in_castable, upload_file,
+                 chunk_rows = 100000,
+                 batch_rows = 10000):
+    """ Python code, run once `conn` is open, building `in_caslib.in_castable` (python expressions of
+    the generated script) from the local `upload_file` read and uploaded `chunk_rows` rows at a time. """
+
+    if not upload_file.lower().endswith((".parquet", ".csv")):
+        raise Exception("upload_file must be a .parquet or a .csv file")
+
+    return _INGEST_CODE.format(read_chunks_code = _READ_CHUNKS_CODE,
+                               upload_file = upload_file.replace("\\", "/"),
+                               chunk_rows = chunk_rows,
+                               batch_rows = batch_rows,
+                               in_caslib = in_caslib,
+                               in_castable = in_castable)
+
+
+def _check_ingest(upload_file, asynchronous):
+    if upload_file is not None and asynchronous:
+        raise Exception("upload_file is only available for the SWAT scripts, not with asynchronous or service")
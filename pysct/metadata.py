@@ -0,0 +1,125 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import re
+
+## a %let statement, the value may be quoted or not: %let name = "value";, %let name = 'value'; or %let name = value;
+_LET_STATEMENT = re.compile(r"""%[lL][eE][tT][ \t]+(\w+)[ \t]*=[ \t]*(?:"([^"\n]*)"|'([^'\n]*)'|([^;\n]*?))[ \t]*;""")
+
+## the astore package referenced in the DS2 (EPS) score code
+_ASTORE_NAME = re.compile(r'_\w+_ast')
+
+## the input variables of the model, as exported by SAS Viya next to the score code
+_INPUT_VARIABLES = "inputVar.json"
+
+##################################
+###### Score code metadata  ######
+##################################
+
+def macro_variables(rawScore):
+    """ Reads every `%let` statement of a score code in a single pass.
+
+    Parameters
+    ----------
+    rawScore : str
+        The SAS score code
+
+    Returns
+    -------
+    Dict
+        Macro variable values by name, names are lower case since SAS macro variables are not case sensitive.
+        When a variable is set more than once the last value wins, as when SAS runs the code.
+
+    Example
+    -------
+    macro_variables('%let language = "ENGLISH";')["language"]
+    """
+
+    macros = {}
+
+    ## jumping from one "%" to the next with str.find is much faster than letting the regex
+    ## engine walk the whole (multi MB) code, the pattern is only tried where a statement may start
+    position = rawScore.find("%")
+    while position != -1:
+        statement = _LET_STATEMENT.match(rawScore, position)
+        if statement is None:
+            position += 1
+        else:
+            name, double_quoted, single_quoted, unquoted = statement.groups()
+            macros[name.lower()] = next(value for value in (double_quoted, single_quoted, unquoted) if value is not None)
+            position = statement.end()
+        position = rawScore.find("%", position)
+
+    return macros
+
+
+def macro_variable(macros, name):
+    """ Looks up a macro variable read by `macro_variables`, failing with a clear message when it is missing. """
+
+    try:
+        return macros[name.lower()]
+    except KeyError:
+        raise Exception("%let {} was not found in the score code".format(name))
+
+
+def astore_name(rawScore):
+    """ Returns the name of the astore referenced by a DS2 (dmcas_epscorecode.sas) score code. """
+
+    match = _ASTORE_NAME.search(rawScore)
+    if match is None:
+        raise Exception("no astore (_*_ast) reference was found in the score code")
+
+    return match.group(0)
+
+
+def input_variables(archives):
+    """ Returns the names of the input variables listed in the inputVar.json of an exported .zip file
+    (an open `zipfile.ZipFile`), `None` when the export has no such file. """
+
+    if _INPUT_VARIABLES not in archives.namelist():
+        return None
+
+    variables = json.loads(archives.read(_INPUT_VARIABLES).decode("UTF-8"))
+    return [variable["name"] for variable in variables]
+
+
+def resolve_copy_vars(copyVars, variables, key_column = None):
+    """ Resolves the `copyVars` of a translator with the input variables of the export (`input_variables`),
+    so the script does not ask CAS for the columns of the input table.
+
+    Parameters
+    ----------
+    copyVars : list or str
+        `None`, "ALL" or a list of column names
+    variables : list
+        The input variables of the model, `None` when the export does not list them
+    key_column : str
+        Column always copied with a list of columns, so the scores can be joined back. Default: `None`
+
+    Returns
+    -------
+    list or str
+        "ALL" becomes the list of input variables of the model, the names found in the export are written
+        as there (CAS column names are not case sensitive) and the key column comes first. `None` and, when
+        the variables are unknown, "ALL" are returned as they are.
+
+    Example
+    -------
+    resolve_copy_vars("ALL", ["LOAN", "REASON"], key_column = "ID")
+    """
+
+    if isinstance(copyVars, str):
+        copyVars = [copyVars]
+    if copyVars is None:
+        return None
+    if copyVars == ["ALL"]:
+        if variables is None:
+            return "ALL"
+        copyVars = list(variables)
+
+    if key_column is not None and key_column.lower() not in [name.lower() for name in copyVars]:
+        copyVars = [key_column] + list(copyVars)
+
+    names = {variable.lower(): variable for variable in variables or []}
+    return [names.get(name.lower(), name) for name in copyVars]
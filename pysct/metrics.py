@@ -0,0 +1,131 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## times every action SWAT runs and appends one JSON line per run to METRICS_FILE
+_METRICS_CODE = '''## Action metrics: every CAS action of this script is timed and one JSON line per run, with the
+## client wall time and the performance CAS reports for each action, is appended to METRICS_FILE
+import atexit
+import datetime
+import json
+import os
+import sys
+import time
+
+METRICS_FILE = "{metrics_file}" ## JSON lines file, one record per run
+METRICS_MODEL = "{model}"
+
+## names of the performance figures CAS returns with the results of every action
+PERFORMANCE = ["elapsed_time", "cpu_user_time", "cpu_system_time", "memory", "memory_os", "memory_quota",
+               "system_total_memory", "system_nodes", "system_cores", "data_movement_time", "data_movement_bytes"]
+
+run_metrics = {{"model": METRICS_MODEL,
+               "script": os.path.basename(__file__),
+               "started": datetime.datetime.now().isoformat(),
+               "status": "ok",
+               "actions": []}}
+run_started = time.perf_counter()
+
+
+def server_performance(result):
+    performance = getattr(result, "performance", None)
+    if performance is None:
+        return None
+    return {{name: getattr(performance, name) for name in PERFORMANCE if getattr(performance, name, None) is not None}}
+
+
+def record_action(action, started, result = None, error = None):
+    record = {{"action": action, "seconds": round(time.perf_counter() - started, 6)}}
+    if error is not None:
+        record["error"] = str(error)
+        run_metrics["status"] = "failed"
+    elif getattr(result, "severity", 0) > 1:
+        record["severity"] = result.severity
+        record["status"] = result.status
+        run_metrics["status"] = "failed"
+    record["server"] = server_performance(result)
+    run_metrics["actions"].append(record)
+
+
+## SWAT runs every action through CAS.retrieve, including the table fetches of head() and columns
+swat_retrieve = swat.CAS.retrieve
+
+
+def timed_retrieve(conn, _name_, **kwargs):
+    started = time.perf_counter()
+    try:
+        result = swat_retrieve(conn, _name_, **kwargs)
+    except Exception as error:
+        record_action(_name_, started, error = error)
+        raise
+    record_action(_name_, started, result)
+    return result
+
+
+swat.CAS.retrieve = timed_retrieve
+{rest_code}
+
+def record_failure(*exc_info):
+    run_metrics["status"] = "failed"
+    excepthook(*exc_info)
+
+
+def write_metrics():
+    run_metrics["seconds"] = round(time.perf_counter() - run_started, 6)
+    with open(METRICS_FILE, "at") as f:
+        f.write(json.dumps(run_metrics, default = str) + "\\n")
+
+
+excepthook = sys.excepthook
+sys.excepthook = record_failure
+atexit.register(write_metrics)
+
+'''
+
+## the streamed astore upload calls the CAS REST API with requests, outside of SWAT
+_REST_METRICS_CODE = '''
+## the streamed astore upload goes through the CAS REST API, outside of SWAT
+import requests
+
+requests_put = requests.put
+
+
+def timed_put(url, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = requests_put(url, *args, **kwargs)
+    except Exception as error:
+        record_action(url.rsplit("/", 1)[-1], started, error = error)
+        raise
+    record_action(url.rsplit("/", 1)[-1], started)
+    run_metrics["actions"][-1]["server"] = response.json().get("performance") if response.ok else None
+    return response
+
+
+requests.put = timed_put
+'''
+
+##################################
+###### Action metrics       ######
+##################################
+
+def _metrics_code(metrics_file, model, rest_upload = False):
+    """ Python code, written after `import swat`, timing every action of the script and appending
+    one JSON line per run to `metrics_file`. With `rest_upload` the `requests.put` calls of the
+    streamed astore upload are timed too. """
+
+    return _METRICS_CODE.format(metrics_file = metrics_file.replace("\\", "/"),
+                                model = model,
+                                rest_code = _REST_METRICS_CODE if rest_upload else "")
+
+
+def _instrument_code(pyscore, metrics_file, model, rest_upload = False):
+    """ Adds `_metrics_code` to a SWAT script, right after its `import swat`. """
+
+    position = pyscore.index("import swat")
+    position = pyscore.index("\n", position) + 1
+    return pyscore[:position] + "\n" + _metrics_code(metrics_file, model, rest_upload) + pyscore[position:]
+
+
+def _check_metrics(metrics_file, asynchronous):
+    if metrics_file is not None and asynchronous:
+        raise Exception("metrics_file is only available for the SWAT scripts, not with asynchronous or service")
@@ -0,0 +1,418 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import types
+import zipfile
+
+__all__ = ["MockCAS", "run_script"]
+
+## columns returned by the column info and fetch of the mock tables
+_COLUMNS = ["id", "text", "LOAN", "REASON"]
+
+
+def _frame(rows):
+    """ The fetched rows as a DataFrame, as SWAT returns them, or as dicts without pandas. """
+
+    try:
+        import pandas
+    except ImportError:
+        return rows
+    return pandas.DataFrame(rows, columns = _COLUMNS)
+
+##################################
+###### Mock CAS server      ######
+##################################
+
+def _payload_size(value):
+    """ Size in bytes of the JSON an action call or result would take on the wire. """
+
+    def default(item):
+        if isinstance(item, (bytes, bytearray)):
+            return "x" * len(item)
+        return str(item)
+
+    return len(json.dumps(value, default = default))
+
+
+def _rest_rows(table):
+    """ Rows of a result table of the REST API as dicts. """
+
+    names = [column["name"] for column in table["schema"]]
+    return [dict(zip(names, row)) for row in table["rows"]]
+
+
+class _Results(dict):
+    """ Stands for `swat.CASResults`, keys can be read as attributes. """
+
+    severity = 0
+    status = None
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class _ActionSet(object):
+
+    def __init__(self, conn, name):
+        self._conn = conn
+        self._name = name
+
+    def __getattr__(self, action):
+        def call(*args, **parameters):
+            return self._conn.retrieve(self._name + "." + action, **parameters)
+        return call
+
+
+class _Columns(object):
+
+    def __init__(self, table):
+        self._table = table
+
+    def tolist(self):
+        results = self._table._conn.retrieve("table.columnInfo", table = self._table._parameters)
+        return [row["Column"] for row in results["ColumnInfo"]]
+
+
+class _CASTable(object):
+    """ Stands for `swat.CASTable`, reading the columns or the first rows is a round trip. """
+
+    def __init__(self, conn, **parameters):
+        self._conn = conn
+        self._parameters = parameters
+
+    @property
+    def columns(self):
+        return _Columns(self)
+
+    def head(self, n = 5):
+        results = self._conn.retrieve("table.fetch", table = self._parameters, to = n)
+        return results["Fetch"]
+
+
+class _Connection(object):
+    """ Stands for `swat.CAS`, every action call goes through `retrieve` as in SWAT, to the `MockCAS`
+    of the class `swat_module` defines. """
+
+    _server = None
+
+    def __init__(self, *args, **connection):
+        self._session = self._server._open_session()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _ActionSet(self, name)
+
+    def retrieve(self, _name_, **parameters):
+        return self._server._action(self._session, _name_, parameters)
+
+    def loadActionSet(self, actionSet):
+        return self.retrieve("builtins.loadActionSet", actionSet = actionSet)
+
+    def upload_frame(self, frame, casout = None, **kwargs):
+        ## SWAT sends the DataFrame as a CSV file to table.upload
+        return self._server._action(self._session, "table.upload", {"casOut": casout},
+                                    upload_bytes = len(frame.to_csv(index = False).encode("UTF-8")))
+
+    def addtable(self, table, caslib = None, datamsghandler = None, **parameters):
+        ## SWAT sends the rows as binary buffers while table.addTable runs
+        return self._server._action(self._session, "table.addTable",
+                                    dict(parameters, table = table, caslib = caslib),
+                                    upload_bytes = 0 if datamsghandler is None else datamsghandler.size)
+
+    def CASTable(self, name, caslib = None, **parameters):
+        return _CASTable(self, name = name, caslib = caslib, **parameters)
+
+    def close(self):
+        self._server._close_session(self._session)
+
+
+class _PandasDataFrame(object):
+    """ Stands for `swat.cas.datamsghandlers.PandasDataFrame`. """
+
+    def __init__(self, frame, nrecs = 1000, **kwargs):
+        self.size = int(frame.memory_usage(index = False, deep = True).sum())
+        self.args = types.SimpleNamespace(addtable = {"datamsghandler": self, "vars": list(frame.columns),
+                                                      "reclen": 0})
+
+
+class _Response(object):
+
+    status_code = 200
+    ok = True
+
+    def __init__(self, results):
+        self.results = results
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"disposition": {"severity": "Normal"},
+                "performance": {"elapsedTime": self.results.performance.elapsed_time},
+                "results": self.results}
+
+
+class _AsyncSession(object):
+    """ Stands for an open `cas_async.Session`, pass it to the `score(cas = ...)` coroutines. """
+
+    def __init__(self, server):
+        self._server = server
+        self._session = server._open_session()
+
+    async def action(self, _action, **parameters):
+        await asyncio.sleep(self._server._delay(parameters))
+        results = self._server._action(self._session, _action, parameters, sleep = False)
+        ## the REST API returns the result tables as a schema and rows
+        for key, table in results.items():
+            if hasattr(table, "to_dict"):
+                table = table.to_dict("records")
+            if isinstance(table, list):
+                names = list(table[0]) if table else []
+                results[key] = {"schema": [{"name": name} for name in names],
+                                "rows": [[row[name] for name in names] for row in table]}
+        return results
+
+    async def head(self, caslib, name, rows = 5):
+        results = await self.action("table.fetch", table = {"caslib": caslib, "name": name}, to = rows)
+        return _rest_rows(results["Fetch"])
+
+    async def columns(self, caslib, name):
+        results = await self.action("table.columnInfo", table = {"caslib": caslib, "name": name})
+        return [row["Column"] for row in _rest_rows(results["ColumnInfo"])]
+
+    async def table_exists(self, caslib, name):
+        results = await self.action("table.tableExists", caslib = caslib, name = name)
+        return results["exists"] > 0
+
+    async def upload(self, path, caslib, name, file_type, member = None, chunk_size = None):
+        if isinstance(path, bytes):
+            size = len(path)
+        elif member is None:
+            size = os.path.getsize(path)
+        else:
+            with zipfile.ZipFile(path, "r") as archives:
+                size = archives.getinfo(member).file_size
+        parameters = {"casOut": {"caslib": caslib, "name": name, "replace": True},
+                      "importOptions": {"fileType": file_type}}
+        await asyncio.sleep(self._server._delay(parameters, size))
+        return self._server._action(self._session, "table.upload", parameters, upload_bytes = size, sleep = False)
+
+
+class MockCAS(object):
+    """ A local stand-in for a CAS server, generated scripts run against it unchanged (`run`).
+    Every action call is recorded with the size of its parameters, of its result and of the
+    uploaded data, and waits `latency` seconds plus the payload divided by `bandwidth`.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds every round trip waits. Default: 0
+    bandwidth : float
+        Bytes per second of the simulated network, `None` for no payload delay. Default: `None`
+    rows : int
+        Number of rows of the mock tables, used for the fetched rows and summaries. Default: 100
+
+    Example
+    -------
+    cas = MockCAS(latency = 0.005)
+    cas.run("dmcas_epscorecode.py")
+    cas.summary()
+    """
+
+    def __init__(self, latency = 0.0, bandwidth = None, rows = 100):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rows = rows
+        self.calls = []
+        self.sessions = 0
+        self.open_sessions = 0
+        self._tables = set()
+        self._lock = threading.Lock()
+
+    def _open_session(self):
+        with self._lock:
+            self.sessions += 1
+            self.open_sessions += 1
+            return "mock-session-{}".format(self.sessions)
+
+    def _close_session(self, session):
+        with self._lock:
+            self.open_sessions -= 1
+
+    def _delay(self, parameters, upload_bytes = 0):
+        if self.bandwidth is None:
+            return self.latency
+        return self.latency + (_payload_size(parameters) + upload_bytes) / float(self.bandwidth)
+
+    def _results(self, action, parameters):
+        """ Results shaped like the ones of CAS, enough for the generated scripts to go on. """
+
+        table = parameters.get("table") or {}
+        if not isinstance(table, dict):
+            table = {"name": table}
+        key = (str(parameters.get("caslib", table.get("caslib"))).lower(),
+               str(parameters.get("name", table.get("name"))).lower())
+
+        if action == "table.tableExists":
+            return {"exists": 2 if key in self._tables else 0}
+        if action == "table.promote":
+            self._tables.add(key)
+        if action == "table.dropTable":
+            self._tables.discard(key)
+        if action == "table.columnInfo":
+            return {"ColumnInfo": [{"Column": column} for column in _COLUMNS]}
+        if action == "table.fetch":
+            rows = range(parameters.get("from", 1) - 1, min(parameters.get("to", 20), self.rows))
+            return {"Fetch": _frame([{column: row for column in _COLUMNS} for row in rows])}
+        if action == "simple.summary":
+            return {"Summary": {"Column": parameters.get("inputs"), "Max": [float(self.rows)], "N": [self.rows]}}
+        if action == "builtins.ping":
+            return {}
+        return {}
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if sleep:
+            time.sleep(self._delay(parameters, upload_bytes))
+
+        with self._lock:
+            results = _Results(self._results(action, parameters))
+            results.performance = types.SimpleNamespace(elapsed_time = self._delay(parameters, upload_bytes))
+            self.calls.append({"action": action,
+                               "session": session,
+                               "request_bytes": _payload_size(parameters),
+                               "upload_bytes": upload_bytes,
+                               "response_bytes": _payload_size(results),
+                               "time": time.time()})
+        return results
+
+    def _put(self, url, data = None, headers = None, **kwargs):
+        """ Stands for `requests.put` on the CAS REST API, the streamed astore uploads. """
+
+        size = 0
+        if isinstance(data, (bytes, bytearray)):
+            size = len(data)
+        elif data is not None:
+            chunk = data.read(1024 ** 2)
+            while chunk:
+                size += len(chunk)
+                chunk = data.read(1024 ** 2)
+        parameters = json.loads((headers or {}).get("JSON-Parameters", "{}"))
+        path = url.rstrip("/").split("/")
+        session = path[path.index("sessions") + 1] if "sessions" in path else None
+        return _Response(self._action(session, path[-1], parameters, upload_bytes = size))
+
+    def swat_module(self):
+        """ A module standing for `swat`, its `CAS` sessions are opened on this server. """
+
+        module = types.ModuleType("swat")
+        module.CAS = type("CAS", (_Connection,), {"_server": self})
+        module.blob = lambda data: bytes(data)
+        module.SWATError = Exception
+        module.cas = types.ModuleType("swat.cas")
+        module.cas.datamsghandlers = types.ModuleType("swat.cas.datamsghandlers")
+        module.cas.datamsghandlers.PandasDataFrame = _PandasDataFrame
+        return module
+
+    def requests_module(self):
+        """ A module standing for `requests`, for the scripts calling the CAS REST API. """
+
+        module = types.ModuleType("requests")
+        module.put = self._put
+        return module
+
+    def session(self):
+        """ An open asyncio session, e.g. `asyncio.run(script.score(cas = mock.session()))`. """
+
+        return _AsyncSession(self)
+
+    def run(self, script, asynchronous = None):
+        """ Runs a generated script against this server, with `swat` and `requests` standing for
+        this one while it runs. The `score()` coroutine of the asyncio scripts is awaited with a
+        session of this server. Returns the summary of the calls the script made. """
+
+        first_call = len(self.calls)
+        script_dir = os.path.dirname(os.path.abspath(script))
+        replaced = {name: sys.modules.get(name) for name in ("swat", "swat.cas", "swat.cas.datamsghandlers",
+                                                             "requests", "cas_pool")}
+
+        sys.modules["swat"] = self.swat_module()
+        sys.modules["swat.cas"] = sys.modules["swat"].cas
+        sys.modules["swat.cas.datamsghandlers"] = sys.modules["swat"].cas.datamsghandlers
+        sys.modules["requests"] = self.requests_module()
+        sys.modules.pop("cas_pool", None) ## imported again, with the mock swat
+        sys.path.insert(0, script_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                namespace = runpy.run_path(script, run_name = "__mock__")
+                if asynchronous or (asynchronous is None and asyncio.iscoroutinefunction(namespace.get("score"))):
+                    asyncio.run(namespace["score"](cas = self.session()))
+                if "cas_pool" in sys.modules:
+                    sys.modules["cas_pool"].close_all()
+        finally:
+            sys.path.remove(script_dir)
+            for name, module in replaced.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+
+        return self.summary(self.calls[first_call:])
+
+    def summary(self, calls = None):
+        """ Round trips, payload bytes and the calls of each action, of `calls` (all by default). """
+
+        calls = self.calls if calls is None else calls
+        actions = collections.OrderedDict()
+        for call in calls:
+            action = actions.setdefault(call["action"], {"calls": 0, "request_bytes": 0,
+                                                         "upload_bytes": 0, "response_bytes": 0})
+            action["calls"] += 1
+            for size in ("request_bytes", "upload_bytes", "response_bytes"):
+                action[size] += call[size]
+
+        return {"round_trips": len(calls),
+                "request_bytes": sum(call["request_bytes"] for call in calls),
+                "upload_bytes": sum(call["upload_bytes"] for call in calls),
+                "response_bytes": sum(call["response_bytes"] for call in calls),
+                "sessions": len(set(call["session"] for call in calls if call["session"] is not None)),
+                "actions": actions}
+
+
+def run_script(script, latency = 0.0, bandwidth = None):
+    """ Runs a generated script against a new `MockCAS` and returns the summary of its calls.
+
+    Parameters
+    ----------
+    script : str
+        Filepath of a script written by a translator
+    latency : float
+        Seconds every round trip waits. Default: 0
+    bandwidth : float
+        Bytes per second of the simulated network, `None` for no payload delay. Default: `None`
+
+    Returns
+    -------
+    Dict
+        The number of round trips, the payload bytes, the sessions and, in "actions", the calls and
+        bytes of each action.
+
+    Example
+    -------
+    run_script("dmcas_epscorecode.py")["round_trips"]
+    """
+
+    return MockCAS(latency, bandwidth).run(script)
@@ -0,0 +1,51 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## output tables of the VTA actions: (name, action parameter, table variable of the script), the first one
+## is the document level result, always written, the others are only written when they are needed
+_OUTPUTS = {
+    "nlp_sentiment_translate": [("sentiment", "casOut", "out_castable_sentiment"),
+                                ("matches", "matchOut", "out_castable_matches"),
+                                ("features", "featureOut", "out_castable_features")],
+    "nlp_category_translate": [("category", "casOut", "out_castable_category"),
+                               ("matches", "matchOut", "out_castable_matches"),
+                               ("modeling", "modelOut", "out_castable_modeling")],
+    "nlp_concepts_translate": [("concepts", "casOut", "out_castable_concepts"),
+                               ("facts", "factOut", "out_castable_facts")]
+}
+
+##################################
+###### Output planning      ######
+##################################
+
+def _plan_outputs(translator, outputs = None):
+    """ The output tables `translator` writes, as (name, action parameter, table variable) tuples. `outputs`
+    lists the names of the tables needed, the document level one is always written. `None` writes them all. """
+
+    planned = _OUTPUTS[translator]
+    if outputs is None:
+        return planned
+
+    if isinstance(outputs, str):
+        outputs = [outputs]
+    names = [name for name, parameter, variable in planned]
+    unknown = [name for name in outputs if name not in names]
+    if unknown:
+        raise Exception("Unknown outputs of {}: {}, use some of: {}".format(translator, ", ".join(unknown),
+                                                                            ", ".join(names)))
+
+    return [planned[0]] + [output for output in planned[1:] if output[0] in outputs]
+
+
+def _out_parameters_code(planned, separator):
+    """ The output table parameters of the action call, joined by `separator` (a comma, a line break and
+    the indentation of the call). """
+
+    return separator.join("{} = {{\"caslib\": out_caslib, \"name\": {}, \"replace\": True}}".format(parameter, variable)
+                          for name, parameter, variable in planned)
+
+
+def _out_tables(planned):
+    """ The (caslib, castable) python expressions of the planned tables, as the incremental mode takes them. """
+
+    return [("out_caslib", variable) for name, parameter, variable in planned]
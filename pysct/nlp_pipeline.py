@@ -0,0 +1,83 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from .partitioned_scoring import _session_code
+
+## stage of each translator handled by the pipeline, also the name of its models in `outputs`
+_STAGES = {
+    "nlp_sentiment_translate": "sentiment",
+    "nlp_category_translate": "category",
+    "nlp_concepts_translate": "concepts",
+    "nlp_topics_translate": "topics"
+}
+
+## runs the stages scoring the same input table with each model at the same time, each on its own session
+_NLP_STAGES_CODE = '''## The models are independent and read the same input table, every stage scores it with one model at
+## the same time as the others, on its own session as a CAS session runs one action at a time. The input
+## table must be global (promoted) to be seen from the sessions.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+{session_code}
+
+def check(result, action):
+    """ SWAT does not raise on failed actions, a failed stage must raise to be reported. """
+    if result.severity > 1:
+        raise RuntimeError("{{}} failed: {{}}".format(action, result.status))
+    return result
+
+
+{stages_code}def run_stage(stage):
+    name, score = stage
+    started = time.time()
+    session = open_session()
+    try:
+        score(session)
+    finally:
+        close_session(session)
+    return name, time.time() - started
+
+
+STAGES = [{stages}]
+
+pipeline_started = time.time()
+with ThreadPoolExecutor(len(STAGES)) as executor:
+    stage_timings = list(executor.map(run_stage, STAGES))
+pipeline_seconds = time.time() - pipeline_started
+
+for name, seconds in stage_timings:
+    print("Stage {{}} scored in {{:.2f}}s".format(name, seconds))
+print("{{}} stages scored in {{:.2f}}s, {{:.2f}}s one after the other".format(
+      len(stage_timings), pipeline_seconds, sum(seconds for name, seconds in stage_timings)))
+
+'''
+
+##################################
+###### NLP stages           ######
+##################################
+
+def _nlp_stages_code(hostname, stages_code, stage_names,
+                     connection_pool = False,
+                     module_name = "cas_pool"):
+    """ Python code running the `score_<name>(session)` functions of `stages_code` (one per name of
+    `stage_names`) at the same time, each on its own session, then printing the time of every stage. """
+
+    return _NLP_STAGES_CODE.format(session_code = _session_code(hostname, connection_pool, module_name),
+                                   stages_code = stages_code,
+                                   stages = ", ".join("(\"{0}\", score_{0})".format(name) for name in stage_names))
+
+
+def _stage_function_code(name, action_set, action, parameters, setup_code = ""):
+    """ The `score_<name>(session)` function of a stage, loading `action_set` on the session then calling
+    `action` with `parameters` (python "name = value" strings). """
+
+    prefix = "    check(session.{}.{}(".format(action_set, action)
+
+    code = "def score_{}(session):\n".format(name)
+    code += "    session.loadActionSet(\"{}\")\n".format(action_set)
+    code += setup_code
+    code += prefix + (",\n" + " " * len(prefix)).join(parameters) + "),\n"
+    code += "          \"{}.{}\")\n\n\n".format(action_set, action)
+
+    return code
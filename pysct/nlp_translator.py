@@ -1,8 +1,27 @@
 # Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import os
 import zipfile
-import re
+
+from .astore import find_astore_member, astore_checksum, file_checksum, _streamed_astore_upload_code, \
+                    _resident_astore_code
+from .async_scoring import write_async_module, _check_asynchronous, _async_header_code, _async_score_code, \
+                           _async_column_names_code, _async_upload_code, _async_resident_code
+from .cache import _open_cache
+from .connection_pool import write_connection_pool, _pooled_connection_code, _pooled_release_code
+from .dispatch import score_code_type
+from .download import _download_code, _check_download
+from .ingest import _ingest_code, _check_ingest
+from .incremental import _watermark_file_code, _incremental_start_code, _incremental_end_code, _check_incremental
+from .metadata import macro_variables, macro_variable, input_variables, resolve_copy_vars
+from .metrics import _instrument_code, _check_metrics
+from .nlp_outputs import _plan_outputs, _out_parameters_code, _out_tables
+from .nlp_pipeline import _STAGES, _nlp_stages_code, _stage_function_code
+from .scoring_service import _service_header_code, _service_code
+
+__all__ = ["nlp_sentiment_translate", "nlp_category_translate",
+           "nlp_topics_translate", "nlp_concepts_translate", "nlp_pipeline_translate"]
 
 ##################################
 ### NLP Translate             ####
@@ -23,7 +42,22 @@ def nlp_sentiment_translate(
                             astore_caslib = "casuser",
                             astore_name = "Sentiment_Astore",
                             astore_path = "SentimentModel.astore",
-                            copyVars = None
+                            copyVars = None,
+                            copy_key = False,
+                            cache = None,
+                            connection_pool = False,
+                            stream_upload = False,
+                            check_resident = False,
+                            asynchronous = False,
+                            service = False,
+                            watermark_column = None,
+                            watermark_file = None,
+                            metrics_file = None,
+                            download_file = None,
+                            download_page_rows = 100000,
+                            upload_file = None,
+                            upload_chunk_rows = 100000,
+                            outputs = None
 ):
     """It will read the score code that is written as SAS Code extract the language and hostame, 
        then write a python code equivalent using the `SWAT` package.
@@ -58,10 +92,65 @@ def nlp_sentiment_translate(
         Only used when `astore = True`. The filepath to the astore file (extract from .zip first)
     copyVars : list
         Only used when `astore = True` list of column names to copy to output table, if "ALL" will copy all score table data. Default: `None`
+        When the export lists its input variables (inputVar.json), "ALL" is resolved to them at translation time,
+        without a round trip at run time.
+    copy_key : bool
+        Only used when `astore = True`. If `True` `key_column` is added to the copied columns when they are a list
+        (or "ALL" resolved from inputVar.json), so the scores can be joined back. Default: `False`
 
 
     out_file : str
         Name and path of the output file. Default: "SentimentScoreCode.py"
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    stream_upload : bool
+        Only used when `astore = True`. If `True` the script uploads the astore streaming it straight out
+        of `in_file` in bounded chunks (CAS REST `table.upload`), without extracting it first (`astore_path`
+        is not used) nor holding it whole in memory. Default: `False`
+    check_resident : bool
+        Only used when `astore = True`. If `True` the script skips the astore upload when it is already in
+        memory. When the astore is inside `in_file`, or at `astore_path` at translation time, the in-memory table
+        is named after its checksum (instead of `astore_name`), so identical astores are uploaded once. Otherwise
+        the astore is only looked up by `astore_name`. Default: `False`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    service : bool
+        If `True` the script is a real time scoring service (aiohttp, implies `asynchronous`): the model
+        is loaded once per session, concurrent requests are coalesced into micro-batches scored by one
+        `applySent` (or `astore.score`) call, and `python script.py load-test rows.json` reports its
+        throughput and p99 latency. Default: `False`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output tables, which are promoted so they outlive the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table (`out_castable_sentiment`) to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+    outputs : list
+        Names of the output tables needed, among "sentiment", "matches" and "features". The document level table is always written, the
+        action is only given the other ones listed, so the large tables nobody reads are not built (not used with `astore`).
+        Default: `None`, all of them
     
     Returns
     -------
@@ -72,6 +161,13 @@ def nlp_sentiment_translate(
     nlp_sentiment_translate("filepath.zip")
     """
 
+    arguments = dict(locals())
+    asynchronous = asynchronous or service
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+
 ## reading score code
     if out_castable_sentiment is None:
         raise Exception("out_castable_sentiment must be defined.")
@@ -79,26 +175,54 @@ def nlp_sentiment_translate(
         out_castable_matches = out_castable_sentiment + "_matches"
     if out_castable_features is None:
         out_castable_features = out_castable_sentiment + "_features"
+    planned = _plan_outputs("nlp_sentiment_translate", outputs)
 
     if in_file is None:
         raise Exception("Read file must be specified")
 
-
-
-    archives = zipfile.ZipFile(in_file, "r")
-
-    if astore == False:
-        rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
-    if astore == True:
-        rawScore = archives.read("AstoreScoreCode.sas").decode("UTF-8")
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments, the size and time of an astore
+## read from disk stand for its checksum
+    cache = _open_cache(cache)
+    if cache is not None:
+        if astore and check_resident and os.path.isfile(astore_path):
+            arguments["astore_file"] = [os.path.getsize(astore_path), os.path.getmtime(astore_path)]
+        member = "AstoreScoreCode.sas" if astore else "ScoreCode.sas"
+        cache_key = cache.key(in_file, member, "nlp_sentiment_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
+    with zipfile.ZipFile(in_file, "r") as archives:
+        if astore == False:
+            rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
+        if astore == True:
+            rawScore = archives.read("AstoreScoreCode.sas").decode("UTF-8")
+            variables = input_variables(archives)
+
+            if stream_upload:
+                astore_member = find_astore_member(archives, [os.path.basename(astore_path)])
+            if check_resident:
+                checksum = astore_checksum(archives, [os.path.basename(astore_path)])
+                if checksum is None:
+                    checksum = file_checksum(astore_path)
+
+## reading the %let macro variables once
+    macros = macro_variables(rawScore)
 
 ### getting hostname
     if hostname is None:
-        hostname = re.search('(?<=%let cas_server_hostname = ")(.*)(?=";)', rawScore).group(0)
+        hostname = macro_variable(macros, "cas_server_hostname")
 
 ## getting language
     if astore == False:
-        language = re.search('(?<=%let language = ")(.*)(?=";)', rawScore).group(0)
+        language = macro_variable(macros, "language")
 
 ## writing code header 
     pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
@@ -108,8 +232,11 @@ def nlp_sentiment_translate(
 import swat \n
 """
 
-## creating copyVars acording to the input
+## creating copyVars acording to the input, resolved from the input variables of the export when it lists
+## them, the key column is added to them when asked for
     if astore == True:
+        if not service:
+            copyVars = resolve_copy_vars(copyVars, variables, key_column if copy_key else None)
         if type(copyVars) is list:
             pass
         elif (type(copyVars) is str):
@@ -136,6 +263,11 @@ column_names = {} \n
 
 ###### writing score code
 
+    if service:
+        pyscore = _service_header_code()
+    elif asynchronous:
+        pyscore = _async_header_code()
+
 ## defining variables
     if astore == False:
         pyscore += """## Defining tables and models variables\n
@@ -171,9 +303,84 @@ astore_path = \"{}\" \n
             )
 
         
+## writing the service, the model is loaded once per session and every micro-batch is scored by one action
+    if service:
+        if astore == False:
+            load_code = """await cas.action("builtins.loadActionSet", actionSet = "sentimentAnalysis")
+"""
+            score_code = """await cas.action("sentimentAnalysis.applySent",
+                 table = {"name": table, "caslib": batch_caslib},
+                 docId = ROW_ID,
+                 text = document_column,
+                 language = language,
+                 casOut = {"caslib": batch_caslib, "name": out, "replace": True})
+"""
+        if astore == True:
+            if stream_upload:
+                load_code = _async_upload_code(in_file, astore_member, "astore_caslib", "astore_name")
+            else:
+                load_code = """## Uploading model to a new server
+await cas.upload(astore_path, astore_caslib, astore_name, "ASTORE")
+"""
+            if check_resident:
+                load_code = _async_resident_code(load_code, "astore_caslib", "astore_name", checksum)
+
+            load_code = """await cas.action("builtins.loadActionSet", actionSet = "astore")
+
+""" + load_code
+            score_code = """await cas.action("astore.score",
+                 table = {"name": table, "caslib": batch_caslib},
+                 casOut = {"caslib": batch_caslib, "name": out, "replace": True},
+                 copyVars = copy_vars(columns),
+                 rstore = {"caslib": astore_caslib, "name": astore_name}) ## if you uploaded manually, change may be needed
+"""
+        pyscore += _service_code(hostname, load_code, score_code, key_column = key_column, copyVars = copyVars)
+
+## writing the asyncio coroutine, the CAS calls are awaited inside `score()`
+    elif asynchronous:
+        if astore == False:
+            body = """## loading sentimentAnalysis actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "sentimentAnalysis")
+
+await cas.action("sentimentAnalysis.applySent",
+                 table = {"name": in_castable, "caslib": in_caslib},
+                 docId = key_column,
+                 text = document_column,
+                 language = language,
+                 """ + _out_parameters_code(planned, ",\n" + " " * 17) + """)
+"""
+        if astore == True:
+            if stream_upload:
+                load_code = _async_upload_code(in_file, astore_member, "astore_caslib", "astore_name")
+            else:
+                load_code = """## Uploading model to a new server
+await cas.upload(astore_path, astore_caslib, astore_name, "ASTORE")
+"""
+            if check_resident:
+                load_code = _async_resident_code(load_code, "astore_caslib", "astore_name", checksum)
+
+            body = _async_column_names_code(copyVars) + "\n"
+            body += """## loading actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "astore")
+
+"""
+            body += load_code + "\n"
+            body += """## The input table column names must be the equal as the training table
+await cas.action("astore.score",
+                 table = {"name": in_castable, "caslib": in_caslib},
+                 casOut = {"caslib": out_caslib, "name": out_castable_sentiment, "replace": True},
+                 copyVars = column_names,
+                 rstore = {"caslib": astore_caslib, "name": astore_name}) ## if you uploaded manually, change may be needed
+"""
+        pyscore += _async_score_code(hostname, body, [("out_caslib", "out_castable_sentiment")])
+
+    else:
 ## Writting connection
 
-    pyscore += """## Connecting to SAS Viya \n
+        if connection_pool:
+            pyscore += _pooled_connection_code(hostname)
+        else:
+            pyscore += """## Connecting to SAS Viya \n
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -182,34 +389,47 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(hostname)
 
+        if astore == True:
+            tables = ("in_caslib", "in_castable", [("out_caslib", "out_castable_sentiment")])
+        else:
+            tables = ("in_caslib", "in_castable", _out_tables(planned))
+## uploading the local input data first, the scoring reads it from the input table
+        if upload_file is not None:
+            pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+        if watermark_column is not None:
+            pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables)
+
 ## score Code apply sent
-    if astore == False:
-        pyscore += """## loading sentimentAnalysis actionset and scoring"
+        if astore == False:
+            pyscore += """## loading sentimentAnalysis actionset and scoring"
 conn.loadActionSet("sentimentAnalysis") \n
 conn.sentimentAnalysis.applySent(
         table = {"name": in_castable, "caslib": in_caslib},
         docId = key_column,
         text = document_column,
         language = language,
-        casOut = {"caslib": out_caslib, "name": out_castable_sentiment, "replace": True},
-        matchOut = {"caslib": out_caslib, "name": out_castable_matches, "replace": True},
-        featureOut = {"caslib": out_caslib, "name": out_castable_features, "replace": True}
+        """ + _out_parameters_code(planned, ",\n" + " " * 8) + """
     )\n
     """
 ### Loading astore table into memory (astore should already be inside server)
  
-    if astore == True:
+        if astore == True:
 
 ## copyVars will define castable to get column names if needed
 
-        pyscore += copyVars_
+            pyscore += copyVars_
 
 ## score action
 
-        pyscore += """## loading actionset actionset and scoring\n
+            pyscore += """## loading actionset actionset and scoring\n
 conn.loadActionSet("astore") \n
 
-## Uploading model to a new server\n
+"""
+            if stream_upload:
+                load_code = _streamed_astore_upload_code(in_file, astore_member, hostname)
+            else:
+                load_code = """## Uploading model to a new server\n
 with open(astore_path,'rb') as file:
       blob = file.read()
       
@@ -221,7 +441,13 @@ conn.astore.upload(store = store_,
                         "caslib": astore_caslib},
                     )\n
 
-## The input table column names must be the equal as the training table\n
+"""
+            if check_resident:
+                load_code = _resident_astore_code(load_code, "astore_caslib", "astore_name", checksum)
+
+            pyscore += load_code
+
+            pyscore += """## The input table column names must be the equal as the training table\n
 conn.astore.score(
         table = {"name": in_castable, "caslib": in_caslib},
         casOut = {"caslib": out_caslib, "name": out_castable_sentiment, "replace": True},
@@ -231,10 +457,13 @@ conn.astore.score(
 
     """
 
+        if watermark_column is not None:
+            pyscore += _incremental_end_code(*tables)
+
 ## reading output table
 
 
-    pyscore += """## Defining the scored cas table in Python (output)\n
+        pyscore += """## Defining the scored cas table in Python (output)\n
 
 scored_sentiment_table = conn.CASTable(name = \"{}\",
                              caslib = \"{}\")
@@ -242,6 +471,17 @@ scored_sentiment_table = conn.CASTable(name = \"{}\",
 scored_sentiment_table.head()
 """.format(out_castable_sentiment, out_caslib)
 
+## downloading the output table to a local file, page by page
+        if download_file is not None:
+            pyscore += _download_code("out_caslib", "out_castable_sentiment", download_file, download_page_rows)
+
+        if connection_pool:
+            pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, os.path.basename(in_file), rest_upload = stream_upload)
+
 ## saving to file
 
     f = open(out_file, "wt")
@@ -250,15 +490,20 @@ scored_sentiment_table.head()
 
     print("The file was successfully written to {}".format(out_file))
 
-    return dict({
+    out = dict({
                 "out_file": out_file,
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable_sentiment": out_castable_sentiment,
-                "out_castable_matches": out_castable_matches,
-                "out_castable_features": out_castable_features
+                "out_castable_matches": out_castable_matches if ("matches", "matchOut", "out_castable_matches") in planned else None,
+                "out_castable_features": out_castable_features if ("features", "featureOut", "out_castable_features") in planned else None
     })
 
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
+
 
 
 ##################################
@@ -280,7 +525,18 @@ def nlp_category_translate(
                             hostname = None,
                             out_castable_matches = None, 
                             out_castable_modeling_table = None,
-                            out_file = "CategoryScoreCode.py"
+                            out_file = "CategoryScoreCode.py",
+                            cache = None,
+                            connection_pool = False,
+                            asynchronous = False,
+                            watermark_column = None,
+                            watermark_file = None,
+                            metrics_file = None,
+                            download_file = None,
+                            download_page_rows = 100000,
+                            upload_file = None,
+                            upload_chunk_rows = 100000,
+                            outputs = None
 ):
 
     """It will read the score code that is written as SAS Code extract the mco binary and hostame information, 
@@ -309,6 +565,42 @@ def nlp_category_translate(
 
     out_file : str
         Name and path of the output file. Default: "CategoryScoreCode.py"
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output tables, which are promoted so they outlive the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table (`out_castable_category`) to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+    outputs : list
+        Names of the output tables needed, among "category", "matches" and "modeling". The document level table is always written, the
+        action is only given the other ones listed, so the large tables nobody reads are not built.
+        Default: `None`, all of them
     
     Returns
     -------
@@ -319,6 +611,12 @@ def nlp_category_translate(
     nlp_category_translate("filepath.zip")
     """
 
+    arguments = dict(locals())
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+
 ## reading score code
     if out_castable_category is None:
         raise Exception("out_castable_category must be defined.")
@@ -326,20 +624,39 @@ def nlp_category_translate(
         out_castable_matches = out_castable_category + "_matches"
     if out_castable_modeling_table is None:
         out_castable_modeling_table = out_castable_category + "_modeling"
+    planned = _plan_outputs("nlp_category_translate", outputs)
 
     if in_file is None:
         raise Exception("Read file must be specified")
 
-    archives = zipfile.ZipFile(in_file, "r")
-    rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments
+    cache = _open_cache(cache)
+    if cache is not None:
+        cache_key = cache.key(in_file, "ScoreCode.sas", "nlp_category_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
+    with zipfile.ZipFile(in_file, "r") as archives:
+        rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
+
+## reading the %let macro variables once
+    macros = macro_variables(rawScore)
 
 ### getting hostname
     if hostname is None:
-        hostname = re.search('(?<=%let cas_server_hostname = ")(.*)(?=";)', rawScore).group(0)
+        hostname = macro_variable(macros, "cas_server_hostname")
 
 ## getting binaries/astore path
-    mco_binary_caslib = re.search('(?<=%let mco_binary_caslib = ")(.*)(?=";)', rawScore).group(0)
-    mco_binary_table_name = re.search('(?<=%let mco_binary_table_name = ")(.*)(?=";)', rawScore).group(0)
+    mco_binary_caslib = macro_variable(macros, "mco_binary_caslib")
+    mco_binary_table_name = macro_variable(macros, "mco_binary_table_name")
 
 ## writing code header 
     pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
@@ -351,6 +668,9 @@ import swat \n
 
 ###### writing score code
 
+    if asynchronous:
+        pyscore = _async_header_code()
+
 ## defining variables
     pyscore += """## Defining tables and models variables\n
 
@@ -371,9 +691,26 @@ mco_binary_table_name = \"{}\"\n
             mco_binary_table_name
             )
 
+## writing the asyncio coroutine, the CAS calls are awaited inside `score()`
+    if asynchronous:
+        pyscore += _async_score_code(hostname, """## loading textRuleScore actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "textRuleScore")
+
+await cas.action("textRuleScore.applyCategory",
+                 model = {"caslib": mco_binary_caslib, "name": mco_binary_table_name},
+                 table = {"name": in_castable, "caslib": in_caslib},
+                 docId = key_column,
+                 text = document_column,
+                 """ + _out_parameters_code(planned, ",\n" + " " * 17) + """)
+""", [("out_caslib", "out_castable_category")])
+
+    else:
 ## Writing connection
 
-    pyscore += """## Connecting to SAS Viya \n
+        if connection_pool:
+            pyscore += _pooled_connection_code(hostname)
+        else:
+            pyscore += """## Connecting to SAS Viya \n
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -382,25 +719,34 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(hostname)
 
+        tables = ("in_caslib", "in_castable", _out_tables(planned))
+## uploading the local input data first, the scoring reads it from the input table
+        if upload_file is not None:
+            pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+        if watermark_column is not None:
+            pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables)
+
 ## score Code apply textRuleScore
 
-    pyscore += """## loading textRuleScore actionset and scoring\n
+        pyscore += """## loading textRuleScore actionset and scoring\n
 conn.loadActionSet("textRuleScore") \n
 conn.textRuleScore.applyCategory(
         model = {"caslib": mco_binary_caslib, "name": mco_binary_table_name},
         table = {"name": in_castable, "caslib": in_caslib},
         docId = key_column,
         text = document_column,
-        casOut = {"caslib": out_caslib, "name": out_castable_category, "replace": True},
-        matchOut = {"caslib": out_caslib, "name": out_castable_matches, "replace": True},
-        modelOut = {"caslib": out_caslib, "name": out_castable_modeling, "replace": True}
+        """ + _out_parameters_code(planned, ",\n" + " " * 8) + """
     )\n
     
     """
 
+        if watermark_column is not None:
+            pyscore += _incremental_end_code(*tables)
+
 ## reading output table
 
-    pyscore += """
+        pyscore += """
 ## Defining the scored cas table in Python (output)\n
 
 scored_category_table = conn.CASTable(name = \"{}\",
@@ -408,6 +754,17 @@ scored_category_table = conn.CASTable(name = \"{}\",
 scored_category_table.head()
 """.format(out_castable_category, out_caslib)
 
+## downloading the output table to a local file, page by page
+        if download_file is not None:
+            pyscore += _download_code("out_caslib", "out_castable_category", download_file, download_page_rows)
+
+        if connection_pool:
+            pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, os.path.basename(in_file))
+
 ## saving to file
 
     f = open(out_file, "wt")
@@ -416,15 +773,20 @@ scored_category_table.head()
 
     print("The file was successfully written to {}".format(out_file))
 
-    return dict({
+    out = dict({
                 "out_file": out_file,
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable_sentiment": out_castable_category,
-                "out_castable_matches": out_castable_matches,
-                "out_castable_modeling": out_castable_modeling_table
+                "out_castable_matches": out_castable_matches if ("matches", "matchOut", "out_castable_matches") in planned else None,
+                "out_castable_modeling": out_castable_modeling_table if ("modeling", "modelOut", "out_castable_modeling") in planned else None
     })
 
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
+
 
 ##################################
 ### NLP Translate             ####
@@ -441,7 +803,19 @@ def nlp_topics_translate(
                             out_caslib, out_castable, 
                             hostname = None,
                             copyVars = None,
-                            out_file = "topicsScoreCode.py"
+                            out_file = "topicsScoreCode.py",
+                            cache = None,
+                            connection_pool = False,
+                            stream_upload = False,
+                            check_resident = False,
+                            asynchronous = False,
+                            watermark_column = None,
+                            watermark_file = None,
+                            metrics_file = None,
+                            download_file = None,
+                            download_page_rows = 100000,
+                            upload_file = None,
+                            upload_chunk_rows = 100000
 ):
 
     """This function the score code that is written as SAS Code extract the astore and hostame information, 
@@ -463,6 +837,47 @@ def nlp_topics_translate(
         Name and path of the output file. Default: "topicsScoreCode.py"
     copyVars : list
         list of column names to copy to output table, if "ALL" will copy all score table data. Default: `None`
+        When the export lists its input variables (inputVar.json), "ALL" is resolved to them at translation time,
+        without a round trip at run time.
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    stream_upload : bool
+        If `True` the script uploads the astore streaming it straight out of `in_file` in bounded chunks
+        (CAS REST `table.upload`), without extracting it nor holding it whole in memory. Default: `False`
+    check_resident : bool
+        Only used when `stream_upload = True`. If `True` the script skips the astore upload when it is already
+        in memory. The in-memory table is named after the astore checksum recorded at translation time (instead
+        of the VTA astore name), so identical astores are uploaded once. Default: `False`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output tables, which are promoted so they outlive the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
         
     Returns
     -------
@@ -474,21 +889,50 @@ def nlp_topics_translate(
     nlp_topics_translate("filepath.zip")
     """
 
+    arguments = dict(locals())
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+
 ## reading score code
 
     if in_file is None:
         raise Exception("Read file must be specified")
 
-    archives = zipfile.ZipFile(in_file, "r")
-    rawScore = archives.read("AstoreScoreCode.sas").decode("UTF-8")
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments
+    cache = _open_cache(cache)
+    if cache is not None:
+        cache_key = cache.key(in_file, "AstoreScoreCode.sas", "nlp_topics_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
+    with zipfile.ZipFile(in_file, "r") as archives:
+        rawScore = archives.read("AstoreScoreCode.sas").decode("UTF-8")
+        variables = input_variables(archives)
+
+        if stream_upload:
+            astore_member = find_astore_member(archives)
+            checksum = astore_checksum(archives)
+
+## reading the %let macro variables once
+    macros = macro_variables(rawScore)
 
 ### getting hostname
     if hostname is None:
-        hostname = re.search('(?<=%let cas_server_hostname = ")(.*)(?=";)', rawScore).group(0)
+        hostname = macro_variable(macros, "cas_server_hostname")
 
 ## getting language
-    astore_caslib = re.search('(?<=%let input_astore_caslib_name = ")(.*)(?=";)', rawScore).group(0)
-    astore_table_name = re.search('(?<=%let input_astore_name = ")(.*)(?=";)', rawScore).group(0)
+    astore_caslib = macro_variable(macros, "input_astore_caslib_name")
+    astore_table_name = macro_variable(macros, "input_astore_name")
 
 ## writing code header 
     pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
@@ -500,7 +944,8 @@ import swat \n
 
 ###### writing score code
 
-## creating copyVars acording to the input
+## creating copyVars acording to the input, resolved from the input variables of the export when it lists them
+    copyVars = resolve_copy_vars(copyVars, variables)
     if type(copyVars) is list:
         pass
     elif (type(copyVars) is str):
@@ -525,6 +970,9 @@ column_names = score_table.columns.tolist()\n
 column_names = {} \n
 """.format(copyVars)
 
+    if asynchronous:
+        pyscore = _async_header_code()
+
 ## defining variables
     pyscore += """## Defining tables and models variables\n
 
@@ -539,9 +987,35 @@ astore_table_name = \"{}\"\n
             astore_table_name
             )
 
+## writing the asyncio coroutine, the CAS calls are awaited inside `score()`
+    if asynchronous:
+        body = ""
+        if stream_upload:
+            load_code = _async_upload_code(in_file, astore_member, "astore_caslib", "astore_table_name")
+            if check_resident:
+                load_code = _async_resident_code(load_code, "astore_caslib", "astore_table_name", checksum)
+            body += load_code + "\n"
+
+        body += _async_column_names_code(copyVars) + "\n"
+        body += """## loading astore actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "astore")
+
+## The input table column names must be the equal as the training table
+await cas.action("astore.score",
+                 table = {"name": in_castable, "caslib": in_caslib},
+                 casOut = {"caslib": out_caslib, "name": out_castable, "replace": True},
+                 copyVars = column_names,
+                 rstore = {"caslib": astore_caslib, "name": astore_table_name}) ## if you uploaded manually, change may be needed
+"""
+        pyscore += _async_score_code(hostname, body, [("out_caslib", "out_castable")])
+
+    else:
 ## Writing connection
 
-    pyscore += """## Connecting to SAS Viya \n
+        if connection_pool:
+            pyscore += _pooled_connection_code(hostname)
+        else:
+            pyscore += """## Connecting to SAS Viya \n
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -549,8 +1023,23 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
                 password='password') ## we encorage using .authinfo \n
 """.format(hostname)
 
+        tables = ("in_caslib", "in_castable", [("out_caslib", "out_castable")])
+## uploading the local input data first, the scoring reads it from the input table
+        if upload_file is not None:
+            pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+        if watermark_column is not None:
+            pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables)
+
 ### Loading astore table into memory (astore should already be inside server)
-    pyscore +="""## If Uploading model to a new server uncomment this section and add correct filepath\n
+        if stream_upload:
+            load_code = _streamed_astore_upload_code(in_file, astore_member, hostname,
+                                                     astore_caslib = "astore_caslib", astore_name = "astore_table_name")
+            if check_resident:
+                load_code = _resident_astore_code(load_code, "astore_caslib", "astore_table_name", checksum)
+            pyscore += load_code
+        else:
+            pyscore +="""## If Uploading model to a new server uncomment this section and add correct filepath\n
 #conn.table.loadTable(caslib = "Models",
 #path = "/path/to/TopicsModel.astore", ## case sensitive
 #casout = {"name": astore_table_name,
@@ -558,11 +1047,11 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 """
 
 ## copyVars will define castable to get column names if needed
-    pyscore += copyVars_
+        pyscore += copyVars_
 
 ## score action
 
-    pyscore += """## loading actionset actionset and scoring\n
+        pyscore += """## loading actionset actionset and scoring\n
 conn.loadActionSet("astore") \n
 
 ## The input table column names must be the equal as the training table\n
@@ -575,9 +1064,12 @@ conn.astore.score(
     
     """
 
+        if watermark_column is not None:
+            pyscore += _incremental_end_code(*tables)
+
 ## reading output table
 
-    pyscore += """
+        pyscore += """
 ## Defining the scored cas table in Python (output)\n
 
 scored_topics_table = conn.CASTable(name = \"{}\",
@@ -585,6 +1077,17 @@ scored_topics_table = conn.CASTable(name = \"{}\",
 scored_topics_table.head()
 """.format(out_castable, out_caslib)
 
+## downloading the output table to a local file, page by page
+        if download_file is not None:
+            pyscore += _download_code("out_caslib", "out_castable", download_file, download_page_rows)
+
+        if connection_pool:
+            pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, os.path.basename(in_file), rest_upload = stream_upload)
+
 ## saving to file
 
     f = open(out_file, "wt")
@@ -593,13 +1096,18 @@ scored_topics_table.head()
 
     print("The file was successfully written to {}".format(out_file))
 
-    return dict({
+    out = dict({
                 "out_file": out_file,
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable": out_castable
     })
 
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
+
 ##################################
 ### NLP Translate             ####
 ### Concepts code translator  ####
@@ -617,7 +1125,18 @@ def nlp_concepts_translate(
                             out_caslib, out_castable_concepts, 
                             hostname = None,
                             out_castable_facts = None, 
-                            out_file = "conceptsScoreCode.py"
+                            out_file = "conceptsScoreCode.py",
+                            cache = None,
+                            connection_pool = False,
+                            asynchronous = False,
+                            watermark_column = None,
+                            watermark_file = None,
+                            metrics_file = None,
+                            download_file = None,
+                            download_page_rows = 100000,
+                            upload_file = None,
+                            upload_chunk_rows = 100000,
+                            outputs = None
 ):
 
     """It will read the score code that is written as SAS Code extract the mco binary and hostame information, 
@@ -644,6 +1163,42 @@ def nlp_concepts_translate(
 
     out_file : str
         Name and path of the output file. Default: "conceptsScoreCode.py"
+    cache : TranslationCache or str
+        Cache of previous translations (or its directory). On a hit the cached result is returned
+        and the file is only written if it changed. Default: `None`
+    connection_pool : bool
+        If `True` the script borrows its session from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening its own. Default: `False`
+    asynchronous : bool
+        If `True` the script defines an `async def score(cas = None)` coroutine calling the CAS REST
+        API with aiohttp (through cas_async.py, written once next to `out_file`, see
+        `write_async_module`) instead of running SWAT calls at the top level. Default: `False`
+    watermark_column : str
+        If set, the script scores incrementally: only the input rows with this column (a timestamp or an
+        increasing numeric key) above the high-water mark of the previous run are scored, and they are
+        appended to the output tables, which are promoted so they outlive the session. Default: `None`
+    watermark_file : str
+        Only used with `watermark_column`. File the script keeps the high-water mark in. Default: `None`,
+        the name of `out_file` with a ".watermark.json" extension, next to the script
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Only for the SWAT scripts. Default: `None`
+    download_file : str
+        If set, the script downloads the whole output table (`out_castable_concepts`) to this local .parquet (needs pyarrow) or .csv
+        file, `download_page_rows` rows per fetch written as they arrive so memory use stays flat, and reports
+        the throughput and peak memory. Only for the SWAT scripts. Default: `None`
+    download_page_rows : int
+        Only used with `download_file`. Rows fetched per `table.fetch` call. Default: 100000
+    upload_file : str
+        If set, the script first builds the input table from this local .csv or .parquet (needs pyarrow) file,
+        read and uploaded `upload_chunk_rows` rows at a time so memory use stays flat, then promotes it.
+        Set INGEST_BINARY in the script when using the binary protocol. Only for the SWAT scripts. Default: `None`
+    upload_chunk_rows : int
+        Only used with `upload_file`. Rows read from the file and uploaded per call. Default: 100000
+    outputs : list
+        Names of the output tables needed, among "concepts" and "facts". The document level table is always written, the
+        action is only given the other ones listed, so the large tables nobody reads are not built.
+        Default: `None`, all of them
     
     Returns
     -------
@@ -654,25 +1209,50 @@ def nlp_concepts_translate(
     nlp_concepts_translate("filepath.zip")
     """
 
+    arguments = dict(locals())
+    _check_incremental(watermark_column, asynchronous)
+    _check_metrics(metrics_file, asynchronous)
+    _check_download(download_file, asynchronous)
+    _check_ingest(upload_file, asynchronous)
+
 ## reading score code
     if out_castable_concepts is None:
         raise Exception("out_castable_concepts must be defined.")
     if out_castable_facts is None:
         out_castable_facts = out_castable_concepts + "_facts"
+    planned = _plan_outputs("nlp_concepts_translate", outputs)
 
     if in_file is None:
         raise Exception("Read file must be specified")
 
-    archives = zipfile.ZipFile(in_file, "r")
-    rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
+## writing the shared connection pool or asyncio client module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+    if asynchronous:
+        _check_asynchronous(connection_pool)
+        write_async_module(os.path.dirname(out_file))
+
+## looking for a previous translation of the same code and arguments
+    cache = _open_cache(cache)
+    if cache is not None:
+        cache_key = cache.key(in_file, "ScoreCode.sas", "nlp_concepts_translate", arguments)
+        cached = cache.get(cache_key, out_file)
+        if cached is not None:
+            return cached
+
+    with zipfile.ZipFile(in_file, "r") as archives:
+        rawScore = archives.read("ScoreCode.sas").decode("UTF-8")
+
+## reading the %let macro variables once
+    macros = macro_variables(rawScore)
 
 ### getting hostname
     if hostname is None:
-        hostname = re.search('(?<=%let cas_server_hostname = ")(.*)(?=";)', rawScore).group(0)
+        hostname = macro_variable(macros, "cas_server_hostname")
 
 ## getting binaries/astore path
-    liti_binary_caslib = re.search('(?<=%let liti_binary_caslib = ")(.*)(?=";)', rawScore).group(0)
-    liti_binary_table_name = re.search('(?<=%let liti_binary_table_name = ")(.*)(?=";)', rawScore).group(0)
+    liti_binary_caslib = macro_variable(macros, "liti_binary_caslib")
+    liti_binary_table_name = macro_variable(macros, "liti_binary_table_name")
 
 ## writing code header 
     pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
@@ -684,6 +1264,9 @@ import swat \n
 
 ###### writing score code
 
+    if asynchronous:
+        pyscore = _async_header_code()
+
 ## defining variables
     pyscore += """## Defining tables and models variables\n
 
@@ -703,9 +1286,26 @@ liti_binary_table_name = \"{}\"\n
             liti_binary_table_name
             )
 
+## writing the asyncio coroutine, the CAS calls are awaited inside `score()`
+    if asynchronous:
+        pyscore += _async_score_code(hostname, """## loading textRuleScore actionset and scoring
+await cas.action("builtins.loadActionSet", actionSet = "textRuleScore")
+
+await cas.action("textRuleScore.applyConcept",
+                 model = {"caslib": liti_binary_caslib, "name": liti_binary_table_name},
+                 table = {"name": in_castable, "caslib": in_caslib},
+                 docId = key_column,
+                 text = document_column,
+                 """ + _out_parameters_code(planned, ",\n" + " " * 17) + """)
+""", [("out_caslib", "out_castable_concepts")])
+
+    else:
 ## Writing connection
 
-    pyscore += """## Connecting to SAS Viya \n
+        if connection_pool:
+            pyscore += _pooled_connection_code(hostname)
+        else:
+            pyscore += """## Connecting to SAS Viya \n
 conn = swat.CAS(hostname = \"{}\", ## change if needed
                 port = 8777,
                 protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
@@ -714,24 +1314,34 @@ conn = swat.CAS(hostname = \"{}\", ## change if needed
 
 """.format(hostname)
 
+        tables = ("in_caslib", "in_castable", _out_tables(planned))
+## uploading the local input data first, the scoring reads it from the input table
+        if upload_file is not None:
+            pyscore += _ingest_code(tables[0], tables[1], upload_file, upload_chunk_rows)
+
+        if watermark_column is not None:
+            pyscore += _incremental_start_code(watermark_column, _watermark_file_code(out_file, watermark_file), *tables)
+
 ## score Code apply textRuleScore
 
-    pyscore += """## loading textRuleScore actionset and scoring\n
+        pyscore += """## loading textRuleScore actionset and scoring\n
 conn.loadActionSet("textRuleScore") \n
 conn.textRuleScore.applyConcept(
         model = {"caslib": liti_binary_caslib, "name": liti_binary_table_name},
         table = {"name": in_castable, "caslib": in_caslib},
         docId = key_column,
         text = document_column,
-        casOut = {"caslib": out_caslib, "name": out_castable_concepts, "replace": True},
-        factOut = {"caslib": out_caslib, "name": out_castable_facts, "replace": True}
+        """ + _out_parameters_code(planned, ",\n" + " " * 8) + """
     )\n
     
     """
 
+        if watermark_column is not None:
+            pyscore += _incremental_end_code(*tables)
+
 ## reading output table
 
-    pyscore += """
+        pyscore += """
 ## Defining the scored cas table in Python (output)\n
 
 scored_concepts_table = conn.CASTable(name = \"{}\",
@@ -739,6 +1349,17 @@ scored_concepts_table = conn.CASTable(name = \"{}\",
 scored_concepts_table.head()
 """.format(out_castable_concepts, out_caslib)
 
+## downloading the output table to a local file, page by page
+        if download_file is not None:
+            pyscore += _download_code("out_caslib", "out_castable_concepts", download_file, download_page_rows)
+
+        if connection_pool:
+            pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, os.path.basename(in_file))
+
 ## saving to file
 
     f = open(out_file, "wt")
@@ -747,10 +1368,231 @@ scored_concepts_table.head()
 
     print("The file was successfully written to {}".format(out_file))
 
-    return dict({
+    out = dict({
                 "out_file": out_file,
                 "py_code": pyscore,
                 "out_caslib": out_caslib,
                 "out_castable_sentiment": out_castable_concepts,
-                "out_castable_facts": out_castable_facts
-    })
\ No newline at end of file
+                "out_castable_facts": out_castable_facts if ("facts", "factOut", "out_castable_facts") in planned else None
+    })
+
+    if cache is not None:
+        cache.put(cache_key, out)
+
+    return out
+
+
+##################################
+### NLP Translate             ####
+### combined pipeline         ####
+##################################
+
+def nlp_pipeline_translate(
+                            in_files,
+                            key_column, # ID column
+                            document_column, # Text variable column
+                            in_caslib, in_castable,
+                            out_caslib, out_castable,
+                            hostname = None,
+                            out_file = "nlpPipelineScoreCode.py",
+                            copyVars = None,
+                            outputs = None,
+                            connection_pool = False,
+                            metrics_file = None
+):
+    """Writes one python script scoring the same document table with several VTA models, any mix of the
+       exports handled by `nlp_sentiment_translate`, `nlp_category_translate`, `nlp_concepts_translate` and
+       `nlp_topics_translate`. The independent applySent, applyCategory, applyConcept and astore.score
+       actions run at the same time, each stage on its own session, and the script prints the time of
+       every stage.
+
+    Parameters
+    ----------
+    in_files : list
+        The filepaths of the .zip files downloaded through the SAS Viya GUI
+    key_column  : str
+        The ID column of the documents, copied to the topics output
+    document_column  : str
+        The text column of the documents
+    in_caslib : str
+        Name of the input table caslib, the table must be global to be read from every session
+    in_castable : str
+        Name of the input table
+    out_caslib : str
+        Name of the output tables caslib
+    out_castable : str
+        Prefix of the output tables, each stage writes `out_castable` + "_" + its stage name ("_sentiment",
+        "_category", "_concepts", "_topics", numbered from the second model of a kind on, e.g. "_category2")
+        and its other outputs with their name added, e.g. "_sentiment_matches"
+    hostname : str
+        Name of the hostname. Default: None, will try to guess from the first file.
+    out_file : str
+        Name and path of the output file. Default: "nlpPipelineScoreCode.py"
+    copyVars : list
+        Columns copied to the topics output, with `key_column`, if "ALL" will copy all score table data
+        (resolved from inputVar.json when the export has it). Default: `None`, only `key_column`
+    outputs : dict
+        Output tables needed by kind of model, e.g. {"sentiment": [], "category": ["matches"]}, see `outputs`
+        in the translator of each kind. Default: `None`, all of them
+    connection_pool : bool
+        If `True` the stages borrow their sessions from a shared, thread safe pool module (cas_pool.py,
+        written once next to `out_file`, see `write_connection_pool`) instead of opening their own. Default: `False`
+    metrics_file : str
+        If set, the script times every CAS action and appends one JSON line per run to this file, with the
+        client wall time and the performance CAS reports for each action. Default: `None`
+
+    Returns
+    -------
+    Dict
+        A dict with the python score code, out caslib, the written file path, the tables of each stage in
+        "out_castables" and the translator matching each file of `in_files` in "translators".
+
+    Example
+    -------
+    nlp_pipeline_translate(["sentiment.zip", "categories.zip", "topics.zip"], "ID", "text",
+                           "public", "reports", "casuser", "reports")
+    """
+
+    if not in_files:
+        raise Exception("in_files must list at least one .zip file")
+
+## writing the shared connection pool module, only once
+    if connection_pool:
+        write_connection_pool(os.path.dirname(out_file))
+
+## reading which model each file holds and its %let macro variables
+    translators = []
+    stages = []
+    for in_file in in_files:
+        translator = score_code_type(in_file)
+        if translator not in _STAGES:
+            raise Exception("{} is not a VTA export, it is handled by {}".format(in_file, translator))
+        translators.append(translator)
+
+        with zipfile.ZipFile(in_file, "r") as archives:
+            member = "AstoreScoreCode.sas" if translator == "nlp_topics_translate" else "ScoreCode.sas"
+            macros = macro_variables(archives.read(member).decode("UTF-8"))
+            variables = input_variables(archives)
+
+        kind = _STAGES[translator]
+        count = len([stage for stage in stages if stage[1] == translator]) + 1
+        name = kind if count == 1 else "{}{}".format(kind, count)
+        stages.append((name, translator, macros, variables))
+
+### getting hostname
+    if hostname is None:
+        hostname = macro_variable(stages[0][2], "cas_server_hostname")
+
+## writing one scoring function per stage, with only the output tables needed
+    stages_code = ""
+    columns_code = ""
+    out_castables = {}
+    for name, translator, macros, variables in stages:
+        table = out_castable + "_" + name
+        if translator == "nlp_topics_translate":
+            planned = [("topics", "casOut", "\"{}\"".format(table))]
+        else:
+            ## the other outputs are named after the document level table
+            planned = _plan_outputs(translator, (outputs or {}).get(_STAGES[translator]))
+            planned = [(output, parameter, "\"{}\"".format(table if parameter == "casOut" else table + "_" + output))
+                       for output, parameter, variable in planned]
+        out_castables[name] = [castable.strip("\"") for output, parameter, castable in planned]
+        out_parameters = [_out_parameters_code([output], "") for output in planned]
+
+        documents = ["table = {\"name\": in_castable, \"caslib\": in_caslib}",
+                     "docId = key_column",
+                     "text = document_column"]
+
+        if translator == "nlp_sentiment_translate":
+            stages_code += _stage_function_code(name, "sentimentAnalysis", "applySent",
+                                                documents + ["language = \"{}\"".format(macro_variable(macros, "language"))]
+                                                + out_parameters)
+
+        elif translator == "nlp_category_translate":
+            model = "model = {{\"caslib\": \"{}\", \"name\": \"{}\"}}".format(macro_variable(macros, "mco_binary_caslib"),
+                                                                       macro_variable(macros, "mco_binary_table_name"))
+            stages_code += _stage_function_code(name, "textRuleScore", "applyCategory", [model] + documents + out_parameters)
+
+        elif translator == "nlp_concepts_translate":
+            model = "model = {{\"caslib\": \"{}\", \"name\": \"{}\"}}".format(macro_variable(macros, "liti_binary_caslib"),
+                                                                       macro_variable(macros, "liti_binary_table_name"))
+            stages_code += _stage_function_code(name, "textRuleScore", "applyConcept", [model] + documents + out_parameters)
+
+        else:
+            ## the astore must already be inside the server, as for nlp_topics_translate
+            column_names = resolve_copy_vars(copyVars or [], variables, key_column)
+            if column_names == "ALL":
+                columns_code = """## Defining scoring table obtaining column names\n
+score_table = conn.CASTable(name = in_castable,
+                            caslib = in_caslib)
+
+column_names = score_table.columns.tolist()\n
+
+"""
+                column_names = "column_names"
+            rstore = "rstore = {{\"caslib\": \"{}\", \"name\": \"{}\"}}".format(macro_variable(macros, "input_astore_caslib_name"),
+                                                                         macro_variable(macros, "input_astore_name"))
+            stages_code += _stage_function_code(name, "astore", "score",
+                                                [documents[0]] + out_parameters + ["copyVars = {}".format(column_names), rstore])
+
+## writing code header
+    pyscore = """## SWAT package needed to run the codes, below the packages in pip and conda
+# documentation: https://github.com/sassoftware/python-swat/
+# pip install swat
+# conda install -c sas-institute swat \n
+import swat \n
+"""
+
+## defining variables
+    pyscore += """## Defining tables variables\n
+
+in_caslib = \"{}\"
+in_castable = \"{}\"
+out_caslib = \"{}\"
+key_column = \"{}\"
+document_column = \"{}\"\n
+
+""".format(in_caslib, in_castable, out_caslib, key_column, document_column)
+
+## Writing connection, only to read the input columns before the stages open their own sessions
+    if columns_code and connection_pool:
+        pyscore += _pooled_connection_code(hostname)
+    elif columns_code:
+        pyscore += """## Connecting to SAS Viya \n
+conn = swat.CAS(hostname = \"{}\", ## change if needed
+                port = 8777,
+                protocol='http',  ## change protocol to cas and port to 5570 if using binary connection (unix)
+                username='username', ## use your own credentials
+                password='password') ## we encorage using .authinfo \n
+
+""".format(hostname)
+    elif connection_pool:
+        pyscore += "## The stages borrow their sessions from the shared connection pool (cas_pool.py, next to this file)\n"
+        pyscore += "import cas_pool\n\n"
+
+    pyscore += columns_code
+    pyscore += "## {} models scoring the same input table\n".format(len(stages))
+    pyscore += _nlp_stages_code(hostname, stages_code, [stage[0] for stage in stages], connection_pool = connection_pool)
+
+    if columns_code and connection_pool:
+        pyscore += _pooled_release_code()
+
+## timing every CAS action of the script
+    if metrics_file is not None:
+        pyscore = _instrument_code(pyscore, metrics_file, ", ".join(os.path.basename(in_file) for in_file in in_files))
+
+## saving to file
+
+    f = open(out_file, "wt")
+    f.writelines(pyscore)
+    f.close()
+
+    print("The file was successfully written to {}".format(out_file))
+
+    return dict({
+                "out_file": out_file,
+                "py_code": pyscore,
+                "out_caslib": out_caslib,
+                "out_castables": out_castables,
+                "translators": translators
+    })
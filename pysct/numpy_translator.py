@@ -0,0 +1,1066 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import zipfile
+
+from .datastep_parser import tokenize
+from .tree_compiler import _TREE_RUNTIME, extract_tree, tree_code
+
+__all__ = ["DS_translate_numpy"]
+
+## SAS comparison operators and their python names used by `_cmp` in the generated code
+_COMPARISONS = {"=": "eq", "eq": "eq", "^=": "ne", "~=": "ne", "ne": "ne",
+                "<": "lt", "lt": "lt", ">": "gt", "gt": "gt",
+                "<=": "le", "le": "le", ">=": "ge", "ge": "ge"}
+
+## SAS functions available in the generated code, each one is a `_f_<name>` runtime helper
+_FUNCTIONS = {"missing", "exp", "log", "sqrt", "abs", "int", "floor", "ceil", "round",
+              "sum", "min", "max", "mean", "probnorm", "left", "trim", "strip",
+              "upcase", "lowcase", "substr", "put"}
+
+## functions (and operators) whose result is a boolean mask rather than a SAS number
+_BOOLEAN_FUNCTIONS = {"missing"}
+_CHARACTER_FUNCTIONS = {"left", "trim", "strip", "upcase", "lowcase", "substr", "put"}
+
+## statements that only carry metadata for the scoring function
+_IGNORED = {"label", "format", "informat", "attrib"}
+
+## statements that need row by row (not vectorized) execution or change the rows written
+_UNSUPPORTED = {"retain", "stop", "delete", "output", "return", "link", "set", "merge", "update",
+                "modify", "by", "data", "run", "put", "input", "call", "file", "infile", "abort",
+                "leave", "continue", "where"}
+
+## runtime helpers written at the top of the generated module
+_RUNTIME = '''
+_NAN = float("nan")
+_OPERATORS = {"eq": operator.eq, "ne": operator.ne, "lt": operator.lt,
+              "gt": operator.gt, "le": operator.le, "ge": operator.ge}
+
+
+def _column(data, columns, name, char):
+    """ Input column as a float (numeric) or object (character) array, missing if absent. """
+    column = columns.get(name)
+    if column is None:
+        return "" if char else _NAN
+    values = np.asarray(data[column])
+    if values.dtype.kind in "biuf":
+        return values.astype(np.float64, copy = False)
+    return np.where(pd.isna(values), "", values).astype(object)
+
+
+def _broadcast(value, n):
+    value = np.asarray(value)
+    if value.dtype == bool:
+        value = value.astype(np.float64)
+    return np.broadcast_to(value, (n,)).copy() if value.ndim == 0 else value
+
+
+def _is_char(value):
+    return np.asarray(value).dtype.kind in "OUS"
+
+
+def _text(value):
+    return np.char.rstrip(np.asarray(value, dtype = str))
+
+
+def _num(value):
+    """ SAS stores comparisons as 1 or 0. """
+    return np.asarray(value, dtype = np.float64)
+
+
+def _true(value):
+    value = np.asarray(value)
+    if value.dtype == bool:
+        return value
+    return np.nan_to_num(value, nan = 0.0) != 0
+
+
+def _cmp(a, b, op):
+    """ SAS comparison: missing values are smaller than any number, trailing blanks are ignored. """
+    if _is_char(a) or _is_char(b):
+        return _OPERATORS[op](_text(a), _text(b))
+    a = np.nan_to_num(np.asarray(a, dtype = np.float64), nan = -np.inf)
+    b = np.nan_to_num(np.asarray(b, dtype = np.float64), nan = -np.inf)
+    return _OPERATORS[op](a, b)
+
+
+def _in(value, items):
+    result = _cmp(value, items[0], "eq")
+    for item in items[1:]:
+        result = result | _cmp(value, item, "eq")
+    return result
+
+
+def _div(a, b):
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        return np.where(np.asarray(b) == 0, _NAN, np.true_divide(a, b))
+
+
+def _pow(a, b):
+    with np.errstate(invalid = "ignore", over = "ignore"):
+        return np.power(np.asarray(a, dtype = np.float64), b)
+
+
+def _cat(a, b):
+    return np.char.add(np.asarray(a, dtype = str), np.asarray(b, dtype = str)).astype(object)
+
+
+def _sum_statement(total, value):
+    """ `total + value;` skips missing values. """
+    return np.where(np.isnan(value), total, np.where(np.isnan(total), value, total + value))
+
+
+def _f_missing(value):
+    if _is_char(value):
+        return _text(value) == ""
+    return np.isnan(np.asarray(value, dtype = np.float64))
+
+
+def _f_exp(value):
+    with np.errstate(over = "ignore"):
+        return np.exp(value)
+
+
+def _f_log(value):
+    value = np.asarray(value, dtype = np.float64)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        return np.where(value > 0, np.log(value), _NAN)
+
+
+def _f_sqrt(value):
+    value = np.asarray(value, dtype = np.float64)
+    with np.errstate(invalid = "ignore"):
+        return np.where(value >= 0, np.sqrt(value), _NAN)
+
+
+def _f_abs(value):
+    return np.abs(value)
+
+
+def _f_int(value):
+    return np.trunc(value)
+
+
+def _f_floor(value):
+    return np.floor(value)
+
+
+def _f_ceil(value):
+    return np.ceil(value)
+
+
+def _f_round(value, unit = 1.0):
+    """ SAS rounds halves away from zero. """
+    return np.sign(value) * np.floor(np.abs(value) / unit + 0.5) * unit
+
+
+def _stacked(values):
+    return np.stack(np.broadcast_arrays(*[np.asarray(value, dtype = np.float64) for value in values]))
+
+
+def _f_sum(*values):
+    values = _stacked(values)
+    return np.where(np.isnan(values).all(axis = 0), _NAN, np.nansum(values, axis = 0))
+
+
+def _f_min(*values):
+    return functools.reduce(np.fmin, values)
+
+
+def _f_max(*values):
+    return functools.reduce(np.fmax, values)
+
+
+def _f_mean(*values):
+    values = _stacked(values)
+    count = (~np.isnan(values)).sum(axis = 0)
+    return np.where(count == 0, _NAN, np.nansum(values, axis = 0) / np.maximum(count, 1))
+
+
+_erfc = np.vectorize(math.erfc, otypes = [np.float64])
+
+
+def _f_probnorm(value):
+    return 0.5 * _erfc(-np.asarray(value, dtype = np.float64) / math.sqrt(2.0))
+
+
+def _f_left(value):
+    return np.char.lstrip(np.asarray(value, dtype = str)).astype(object)
+
+
+def _f_trim(value):
+    return _text(value).astype(object)
+
+
+def _f_strip(value):
+    return np.char.strip(np.asarray(value, dtype = str)).astype(object)
+
+
+def _f_upcase(value):
+    return np.char.upper(np.asarray(value, dtype = str)).astype(object)
+
+
+def _f_lowcase(value):
+    return np.char.lower(np.asarray(value, dtype = str)).astype(object)
+
+
+def _f_substr(value, position, length = None):
+    start = int(position) - 1
+    stop = None if length is None else start + int(length)
+    return np.array([text[start:stop] for text in np.atleast_1d(np.asarray(value, dtype = str))], dtype = object)
+
+
+def _f_put(value, width, char):
+    """ Only the width of the format is applied. """
+    if char or _is_char(value):
+        text = np.asarray(value, dtype = str)
+    else:
+        text = np.array(["" if np.isnan(number) else "{:.{}g}".format(number, max(width - 1, 1))
+                         for number in np.atleast_1d(np.asarray(value, dtype = np.float64))])
+    return np.array([item[:width] for item in np.atleast_1d(text)], dtype = object)
+'''
+
+##################################
+###### DATA step parser     ######
+##################################
+
+class _Parser(object):
+    """ Recursive descent parser of the DATA step subset used by regression score codes. """
+
+    def __init__(self, code):
+        self.tokens = [(kind, text) for kind, text in tokenize(code) if kind not in ("space", "comment")]
+        self.position = 0
+        self.arrays = {}
+        self.char_vars = set()
+        self.drop = []
+        self.keep = []
+        self.labels = []
+        self.spelling = {}
+
+    ## token helpers
+
+    def peek(self, offset = 0):
+        position = self.position + offset
+        if position < len(self.tokens):
+            return self.tokens[position]
+        return (None, None)
+
+    def peek_word(self, offset = 0):
+        kind, text = self.peek(offset)
+        return text.lower() if kind == "name" else text
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise Exception("Unexpected end of the score code")
+        self.position += 1
+        return token
+
+    def expect(self, text):
+        kind, found = self.next()
+        if (found.lower() if kind == "name" else found) != text:
+            raise Exception("Expected `{}` but found `{}` in the score code".format(text, found))
+
+    def name(self):
+        kind, text = self.next()
+        if kind != "name":
+            raise Exception("Expected a name but found `{}` in the score code".format(text))
+        self.spelling.setdefault(text.lower(), text)
+        return text.lower()
+
+    ## statements
+
+    def program(self):
+        statements = []
+        while self.peek()[0] is not None:
+            statements.append(self.statement())
+        return statements
+
+    def statement(self):
+        kind, text = self.peek()
+        word = self.peek_word()
+
+        if text == ";":
+            self.next()
+            return ("nop",)
+        if kind != "name":
+            raise Exception("Unsupported statement starting with `{}` in the score code".format(text))
+
+        if self.peek(1)[1] == ":":
+            label = self.name()
+            self.next()
+            self.labels.append(label)
+            return ("label", label)
+        if word == "if":
+            self.next()
+            condition = self.expression()
+            self.expect("then")
+            then = self.statement()
+            otherwise = None
+            if self.peek_word() == "else":
+                self.next()
+                otherwise = self.statement()
+            return ("if", condition, then, otherwise)
+        if word == "do":
+            return self.do()
+        if word == "select":
+            return self.select()
+        if word in ("goto", "go"):
+            self.next()
+            if word == "go":
+                self.expect("to")
+            label = self.name()
+            self.expect(";")
+            return ("goto", label)
+        if word == "array":
+            return self.array()
+        if word == "length":
+            return self.length()
+        if word in ("drop", "keep"):
+            self.next()
+            names = self.drop if word == "drop" else self.keep
+            while self.peek()[1] != ";":
+                names.append(self.next()[1].lower())
+            self.next()
+            return ("nop",)
+        if word in _IGNORED:
+            while self.next()[1] != ";":
+                pass
+            return ("nop",)
+        if word in _UNSUPPORTED:
+            raise Exception("The `{}` statement is not supported by the NumPy translator".format(text))
+
+        ## assignment or sum statement
+        target = self.target()
+        kind, operator_ = self.next()
+        value = self.expression()
+        self.expect(";")
+        if operator_ == "=":
+            return ("assign", target, value)
+        if operator_ == "+":
+            return ("sum", target, value)
+        raise Exception("Unsupported statement `{} {}` in the score code".format(target[1], operator_))
+
+    def block(self):
+        statements = []
+        while self.peek_word() != "end":
+            if self.peek()[0] is None:
+                raise Exception("Missing `end` in the score code")
+            statements.append(self.statement())
+        self.next()
+        self.expect(";")
+        return statements
+
+    def do(self):
+        self.next()
+        if self.peek()[1] == ";":
+            self.next()
+            return ("block", self.block())
+        if self.peek_word() in ("while", "until"):
+            raise Exception("DO WHILE/UNTIL loops are not supported by the NumPy translator")
+
+        variable = self.name()
+        self.expect("=")
+        start = self.expression()
+        self.expect("to")
+        stop = self.expression()
+        step = ("num", 1.0)
+        if self.peek_word() == "by":
+            self.next()
+            step = self.expression()
+        self.expect(";")
+        return ("loop", variable, start, stop, step, self.block())
+
+    def select(self):
+        self.next()
+        selector = None
+        if self.peek()[1] == "(":
+            self.next()
+            selector = self.expression()
+            self.expect(")")
+        self.expect(";")
+
+        whens = []
+        otherwise = None
+        while self.peek_word() != "end":
+            word = self.peek_word()
+            self.next()
+            if word == "when":
+                self.expect("(")
+                values = [self.expression()]
+                while self.peek()[1] == ",":
+                    self.next()
+                    values.append(self.expression())
+                self.expect(")")
+                whens.append((values, self.statement()))
+            elif word == "otherwise":
+                otherwise = self.statement()
+            else:
+                raise Exception("Unexpected `{}` inside a SELECT group".format(word))
+        self.next()
+        self.expect(";")
+        return ("select", selector, whens, otherwise)
+
+    def array(self):
+        self.next()
+        name = self.name()
+        self.expect({"{": "{", "[": "[", "(": "("}.get(self.peek()[1], "{"))
+        size = self.next()[1]
+        self.next()
+
+        char = False
+        if self.peek()[1] == "$":
+            self.next()
+            char = True
+            if self.peek()[0] == "number":
+                self.next()
+
+        temporary = False
+        elements = []
+        initial = []
+        while self.peek()[1] != ";":
+            kind, text = self.next()
+            if kind == "name" and text.lower() == "_temporary_":
+                temporary = True
+            elif kind == "name":
+                self.spelling.setdefault(text.lower(), text)
+                elements.append(text.lower())
+            elif text == "(":
+                while self.peek()[1] != ")":
+                    kind, text = self.next()
+                    if text == ",":
+                        continue
+                    if text == "-" and self.peek()[0] == "number":
+                        initial.append(-float(self.next()[1]))
+                    elif kind == "number":
+                        initial.append(float(text))
+                    elif kind == "string":
+                        initial.append(_string_value(text))
+                    elif text == ".":
+                        initial.append(float("nan"))
+                self.next()
+        self.next()
+
+        size = len(elements) if size == "*" else int(float(size))
+        if temporary or not elements:
+            elements = ["{}__{}".format(name, index + 1) for index in range(size)]
+            temporary = True
+        if char:
+            self.char_vars.update(elements)
+
+        self.arrays[name] = {"elements": elements, "temporary": temporary,
+                             "initial": initial, "char": char}
+        return ("nop",)
+
+    def length(self):
+        self.next()
+        names = []
+        while self.peek()[1] != ";":
+            kind, text = self.next()
+            if kind == "name":
+                self.spelling.setdefault(text.lower(), text)
+                names.append(text.lower())
+            elif text == "$":
+                self.char_vars.update(names)
+                names = []
+            elif kind == "number":
+                names = []
+        self.next()
+        return ("nop",)
+
+    def target(self):
+        name = self.name()
+        if name in self.arrays and self.peek()[1] in ("{", "[", "("):
+            return ("element", name, self.subscript())
+        return ("var", name)
+
+    def subscript(self):
+        closing = {"{": "}", "[": "]", "(": ")"}[self.next()[1]]
+        index = self.expression()
+        self.expect(closing)
+        return index
+
+    ## expressions, from the lowest to the highest SAS precedence
+
+    def expression(self):
+        left = self.conjunction()
+        while self.peek_word() in ("or", "|", "!"):
+            self.next()
+            left = ("or", left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.comparison()
+        while self.peek_word() in ("and", "&"):
+            self.next()
+            left = ("and", left, self.comparison())
+        return left
+
+    def comparison(self):
+        left = self.concatenation()
+        while True:
+            word = self.peek_word()
+            if word in _COMPARISONS:
+                self.next()
+                left = ("cmp", _COMPARISONS[word], left, self.concatenation())
+            elif word == "in" or (word in ("not", "^", "~") and self.peek_word(1) == "in"):
+                negate = word != "in"
+                if negate:
+                    self.next()
+                self.next()
+                self.expect("(")
+                items = [self.concatenation()]
+                while self.peek()[1] != ")":
+                    if self.peek()[1] == ",":
+                        self.next()
+                    items.append(self.concatenation())
+                self.next()
+                left = ("in", left, items, negate)
+            else:
+                return left
+
+    def concatenation(self):
+        left = self.additive()
+        while self.peek()[1] in ("||", "!!"):
+            self.next()
+            left = ("cat", left, self.additive())
+        return left
+
+    def additive(self):
+        left = self.multiplicative()
+        while self.peek()[1] in ("+", "-"):
+            operator_ = self.next()[1]
+            left = ("arith", operator_, left, self.multiplicative())
+        return left
+
+    def multiplicative(self):
+        left = self.unary()
+        while self.peek()[1] in ("*", "/"):
+            operator_ = self.next()[1]
+            left = ("arith", operator_, left, self.unary())
+        return left
+
+    def unary(self):
+        word = self.peek_word()
+        if word in ("-", "+"):
+            self.next()
+            operand = self.unary()
+            return ("neg", operand) if word == "-" else operand
+        if word in ("not", "^", "~"):
+            self.next()
+            return ("not", self.unary())
+        return self.power()
+
+    def power(self):
+        base = self.primary()
+        if self.peek()[1] == "**":
+            self.next()
+            return ("arith", "**", base, self.unary())
+        return base
+
+    def primary(self):
+        kind, text = self.peek()
+
+        if kind == "number":
+            self.next()
+            return ("num", float(text))
+        if kind == "string":
+            self.next()
+            return ("str", _string_value(text))
+        if text == ".":
+            self.next()
+            return ("num", float("nan"))
+        if text == "(":
+            self.next()
+            inner = self.expression()
+            self.expect(")")
+            return inner
+        if kind != "name":
+            raise Exception("Unexpected `{}` in a score code expression".format(text))
+
+        name = self.name()
+        if name in self.arrays and self.peek()[1] in ("{", "[", "("):
+            return ("element", name, self.subscript())
+        if self.peek()[1] == "(":
+            return self.call(name)
+        return ("var", name)
+
+    def call(self, function):
+        if function not in _FUNCTIONS:
+            raise Exception("The SAS function `{}` is not supported by the NumPy translator".format(function))
+        self.expect("(")
+        arguments = []
+        if function == "put":
+            arguments.append(self.expression())
+            self.expect(",")
+            char = self.peek()[1] == "$"
+            format_text = ""
+            while self.peek()[1] != ")":
+                format_text += self.next()[1]
+            width = "".join(character for character in format_text.split(".")[0] if character.isdigit())
+            self.next()
+            return ("call", "put", arguments + [("num", float(width or 12)), ("num", float(char))])
+
+        while self.peek()[1] != ")":
+            arguments.append(self.expression())
+            if self.peek()[1] == ",":
+                self.next()
+        self.next()
+        return ("call", function, arguments)
+
+
+def _string_value(text):
+    quote = text[0]
+    end = text.rindex(quote)
+    return text[1:end].replace(quote * 2, quote)
+
+##################################
+###### NumPy code generator ######
+##################################
+
+class _Compiler(object):
+    """ Turns the parsed statements into vectorized python: each statement runs on every row at
+    once under a boolean mask of the rows where it applies (IF/ELSE, SELECT and GOTO). """
+
+    def __init__(self, parser, tree_arrays = True):
+        self.parser = parser
+        self.tree_arrays = tree_arrays
+        self.arrays = parser.arrays
+        self.lines = []
+        self.temporaries = 0
+        self.constants = {}
+        self.live = False
+        self.defined = []
+        self.referenced = []
+        self.char_vars = set(parser.char_vars)
+        self.jumped = set()
+        self.read_first = []
+        self.trees = []
+
+    def temporary(self):
+        self.temporaries += 1
+        return "_m{}".format(self.temporaries)
+
+    def emit(self, line, depth = 1):
+        self.lines.append("    " * depth + line)
+
+    def use(self, name, defined = False):
+        if not defined and name not in self.defined and name not in self.read_first:
+            self.read_first.append(name)
+        names = self.defined if defined else self.referenced
+        if name not in names:
+            names.append(name)
+
+    ## variables
+
+    def variable(self, name):
+        return "v_" + name
+
+    def element(self, array, index):
+        position = self.constant(index)
+        if position is None:
+            raise Exception("Array `{}` is indexed by a value only known at run time, "
+                            "which the NumPy translator does not support".format(array))
+        elements = self.arrays[array]["elements"]
+        if not 1 <= position <= len(elements) or position != int(position):
+            raise Exception("Array subscript out of range for `{}`".format(array))
+        return elements[int(position) - 1]
+
+    def constant(self, node):
+        kind = node[0]
+        if kind == "num":
+            return node[1]
+        if kind == "var" and node[1] in self.constants:
+            return self.constants[node[1]]
+        if kind == "neg":
+            value = self.constant(node[1])
+            return None if value is None else -value
+        if kind == "arith":
+            left = self.constant(node[2])
+            right = self.constant(node[3])
+            if left is None or right is None:
+                return None
+            return {"+": left + right, "-": left - right, "*": left * right,
+                    "/": left / right if right else float("nan"), "**": left ** right}[node[1]]
+        return None
+
+    ## expressions
+
+    def is_char(self, node):
+        kind = node[0]
+        if kind == "str" or kind == "cat":
+            return True
+        if kind == "var":
+            return node[1] in self.char_vars
+        if kind == "element":
+            return self.arrays[node[1]]["char"]
+        if kind == "call":
+            return node[1] in _CHARACTER_FUNCTIONS
+        return False
+
+    def is_boolean(self, node):
+        return node[0] in ("cmp", "in", "and", "or", "not") or \
+               (node[0] == "call" and node[1] in _BOOLEAN_FUNCTIONS)
+
+    def number(self, node):
+        """ Expression used as a SAS number, booleans become 1 or 0. """
+        code = self.expression(node)
+        return "_num({})".format(code) if self.is_boolean(node) else code
+
+    def condition(self, node):
+        code = self.expression(node)
+        return code if self.is_boolean(node) else "_true({})".format(code)
+
+    def expression(self, node):
+        kind = node[0]
+
+        if kind == "num":
+            return "_NAN" if node[1] != node[1] else repr(node[1])
+        if kind == "str":
+            return repr(node[1])
+        if kind == "var":
+            if node[1] in self.constants:
+                return repr(self.constants[node[1]])
+            self.use(node[1])
+            return self.variable(node[1])
+        if kind == "element":
+            name = self.element(node[1], node[2])
+            self.use(name)
+            return self.variable(name)
+        if kind == "neg":
+            return "(-{})".format(self.number(node[1]))
+        if kind == "not":
+            return "(~{})".format(self.condition(node[1]))
+        if kind == "and":
+            return "({} & {})".format(self.condition(node[1]), self.condition(node[2]))
+        if kind == "or":
+            return "({} | {})".format(self.condition(node[1]), self.condition(node[2]))
+        if kind == "cmp":
+            return "_cmp({}, {}, \"{}\")".format(self.number(node[2]), self.number(node[3]), node[1])
+        if kind == "in":
+            code = "_in({}, [{}])".format(self.number(node[1]), ", ".join(self.number(item) for item in node[2]))
+            return "(~{})".format(code) if node[3] else code
+        if kind == "cat":
+            return "_cat({}, {})".format(self.expression(node[1]), self.expression(node[2]))
+        if kind == "arith":
+            left = self.number(node[2])
+            right = self.number(node[3])
+            if node[1] == "/":
+                return "_div({}, {})".format(left, right)
+            if node[1] == "**":
+                return "_pow({}, {})".format(left, right)
+            return "({} {} {})".format(left, node[1], right)
+        if kind == "call":
+            arguments = [self.number(argument) for argument in node[2]]
+            if node[1] == "put":
+                arguments = [arguments[0], repr(int(node[2][1][1])), repr(bool(node[2][2][1]))]
+            return "_f_{}({})".format(node[1], ", ".join(arguments))
+
+        raise Exception("Unsupported expression in the score code")
+
+    ## statements
+
+    def mask(self, mask):
+        """ Rows where a statement runs, `None` meaning every row. """
+        if self.live:
+            return "_live" if mask is None else "({} & _live)".format(mask)
+        return mask
+
+    def assign(self, name, value, mask):
+        self.use(name, defined = True)
+        target = self.variable(name)
+        mask = self.mask(mask)
+        if mask is None:
+            self.emit("{} = _broadcast({}, n)".format(target, value))
+        else:
+            self.emit("{} = np.where({}, {}, {})".format(target, mask, value, target))
+
+    def statement(self, node, mask = None):
+        kind = node[0]
+
+        if kind == "nop":
+            return
+        if kind == "block":
+            for statement in node[1]:
+                self.statement(statement, mask)
+            return
+
+        if kind in ("assign", "sum"):
+            target = node[1]
+            name = self.element(target[1], target[2]) if target[0] == "element" else target[1]
+            if self.is_char(node[2]):
+                self.char_vars.add(name)
+            value = self.number(node[2])
+            if kind == "sum":
+                if name not in self.defined:
+                    raise Exception("`{} + ...;` accumulates across rows, which the NumPy translator "
+                                    "does not support".format(self.parser.spelling.get(name, name)))
+                self.use(name)
+                value = "_sum_statement({}, {})".format(self.variable(name), value)
+            self.assign(name, value, mask)
+            return
+
+        if kind == "if":
+            tree = extract_tree(node) if self.tree_arrays else None
+            if tree is not None:
+                self.tree(tree, mask)
+                return
+            condition = self.temporary()
+            self.emit("{} = {}".format(condition, self.condition(node[1])))
+            self.statement(node[2], condition if mask is None else "({} & {})".format(mask, condition))
+            if node[3] is not None:
+                otherwise = "~" + condition
+                self.statement(node[3], otherwise if mask is None else "({} & {})".format(mask, otherwise))
+            return
+
+        if kind == "loop":
+            variable, start, stop, step = node[1], self.constant(node[2]), self.constant(node[3]), self.constant(node[4])
+            if start is None or stop is None or not step:
+                raise Exception("DO loops need constant bounds in the NumPy translator")
+            value = start
+            while (value <= stop) if step > 0 else (value >= stop):
+                self.constants[variable] = value
+                for statement in node[5]:
+                    self.statement(statement, mask)
+                value += step
+            del self.constants[variable]
+            self.assign(variable, repr(float(value)), mask)
+            return
+
+        if kind == "select":
+            remaining = self.temporary()
+            self.emit("{} = {}".format(remaining, "np.ones(n, dtype = bool)" if mask is None else mask))
+            selector = None
+            if node[1] is not None:
+                selector = self.temporary()
+                self.emit("{} = {}".format(selector, self.number(node[1])))
+            for values, statement in node[2]:
+                chosen = self.temporary()
+                if selector is None:
+                    test = " | ".join(self.condition(value) for value in values)
+                else:
+                    test = "_in({}, [{}])".format(selector, ", ".join(self.number(value) for value in values))
+                self.emit("{} = {} & ({})".format(chosen, remaining, test))
+                self.statement(statement, chosen)
+                self.emit("{} = {} & ~{}".format(remaining, remaining, chosen))
+            if node[3] is not None:
+                self.statement(node[3], remaining)
+            return
+
+        if kind == "goto":
+            label = node[1]
+            if label not in self.parser.labels or label in self.jumped:
+                raise Exception("Only forward GOTO jumps are supported by the NumPy translator")
+            rows = self.mask(mask)
+            if not self.live:
+                self.emit("_live = np.ones(n, dtype = bool)")
+                self.live = True
+            rows = "_live" if rows is None else rows
+            self.emit("_goto_{0} = _goto_{0} | {1}".format(label, rows))
+            self.emit("_live = _live & ~({})".format(rows))
+            return
+
+        if kind == "label":
+            self.jumped.add(node[1])
+            if self.live:
+                self.emit("_live = _live | _goto_{}".format(node[1]))
+            return
+
+        raise Exception("Unsupported statement in the score code")
+
+    def tree(self, tree, mask):
+        """ Decision tree scored from flat node arrays instead of one masked statement per node. """
+
+        name = "_TREE_{}".format(len(self.trees) + 1)
+        self.trees.append(tree_code(tree, name))
+
+        columns = []
+        for variable in tree["features"]:
+            self.use(variable)
+            columns.append(self.variable(variable))
+        leaf = self.temporary()
+        self.emit("{} = {}.leaves([{}], n)".format(leaf, name, ", ".join(columns)))
+
+        for variable, leaves in tree["values"].items():
+            if leaves["char"]:
+                self.char_vars.add(variable)
+            values = "{}_{}[0][{}]".format(name, variable, leaf)
+            if all(leaves["assigned"]) and self.mask(mask) is None:
+                self.assign(variable, values, None)
+            else:
+                assigned = "{}_{}[1][{}]".format(name, variable, leaf)
+                self.assign(variable, values, assigned if mask is None else "({} & {})".format(mask, assigned))
+
+    def compile(self, statements, function_name):
+        for statement in statements:
+            self.statement(statement)
+
+        spelling = self.parser.spelling
+        temporary = {element for array in self.arrays.values() if array["temporary"]
+                     for element in array["elements"]}
+
+        ## outputs: what the code defines, minus temporary arrays and dropped variables
+        outputs = [name for name in self.defined if name not in temporary]
+        if self.parser.keep:
+            outputs = [name for name in outputs if _listed(name, self.parser.keep)]
+        outputs = [name for name in outputs if not _listed(name, self.parser.drop)]
+
+        body = []
+        body.append("    n = len(data)")
+        body.append("    columns = {str(column).lower(): column for column in data.keys()}")
+        body.append("")
+        body.append("    ## input columns, or missing values when the table does not have them")
+        seen = set()
+        for name in self.referenced + self.defined:
+            if name in seen or name in temporary:
+                continue
+            seen.add(name)
+            body.append("    {} = _column(data, columns, \"{}\", {})".format(
+                self.variable(name), name, name in self.char_vars))
+
+        initial_lines = []
+        for array in self.arrays.values():
+            if not array["temporary"]:
+                continue
+            for position, name in enumerate(array["elements"]):
+                if position < len(array["initial"]):
+                    value = array["initial"][position]
+                    value = repr(value) if isinstance(value, str) else ("_NAN" if value != value else repr(value))
+                else:
+                    value = '""' if array["char"] else "_NAN"
+                initial_lines.append("    {} = {}".format(self.variable(name), value))
+        if initial_lines:
+            body.append("")
+            body.append("    ## temporary arrays")
+            body.extend(initial_lines)
+
+        for label in self.parser.labels:
+            body.append("    _goto_{} = np.zeros(n, dtype = bool)".format(label))
+
+        body.append("")
+        body.append("    ## score code")
+        body.extend(self.lines)
+        body.append("")
+        body.append("    return pd.DataFrame({")
+        for name in outputs:
+            body.append("        \"{}\": _broadcast({}, n),".format(spelling.get(name, name), self.variable(name)))
+        body.append("    }, index = getattr(data, \"index\", None))")
+
+        source = "def {}(data):\n".format(function_name)
+        source += "    \"\"\" Scores a pandas DataFrame (or a dict of arrays) and returns a DataFrame with the\n"
+        source += "    score code outputs, in the same row order. \"\"\"\n\n"
+        source += "\n".join(body) + "\n"
+
+        input_names = [spelling.get(name, name) for name in self.read_first if name not in temporary]
+
+        return source, input_names, [spelling.get(name, name) for name in outputs]
+
+
+def _listed(name, names):
+    """ Whether a variable is in a DROP/KEEP list, `prefix:` lists included. """
+    for listed in names:
+        if listed.endswith(":") and name.startswith(listed[:-1]):
+            return True
+        if listed == name:
+            return True
+    return False
+
+##################################
+###### NumPy Translate      ######
+##################################
+
+def DS_translate_numpy(in_file,
+                       out_file = "dmcas_scorecode_numpy.py",
+                       function_name = "score",
+                       tree_arrays = True):
+    """ Writes a .py file with a vectorized NumPy/pandas scoring function compiled from a DataStep
+    score code (dmcas_scorecode.sas), so models such as linear and logistic regressions can score
+    pandas DataFrames locally, without a CAS server. Every statement runs on all the rows at once
+    under a mask of the rows it applies to.
+
+    The supported subset is what regression exports use: assignments and sum statements, IF/ELSE,
+    DO blocks, DO loops with constant bounds, SELECT/WHEN, forward GOTO, arrays indexed by constants
+    or loop indexes, LENGTH/LABEL/FORMAT/DROP/KEEP and the functions missing, exp, log, sqrt, abs,
+    int, floor, ceil, round, sum, min, max, mean, probnorm, left, trim, strip, upcase, lowcase, substr
+    and put (only the format width is used). Anything else raises an Exception naming it.
+
+    Decision tree node logic (nested IF/ELSE splits on single variables ending in constant
+    assignments) is compiled into flat node arrays: feature, threshold or category subset, the side
+    missing values go to, children and leaf values. All the rows walk down the tree together, one
+    level per step, so the work and memory grow with the number of nodes rather than the code size.
+
+    Parameters
+    ----------
+    in_file : str
+        The filepath of the .zip file downloaded through the SAS Viya GUI
+    out_file : str
+        Name and path of the output file. Default: "dmcas_scorecode_numpy.py"
+    function_name : str
+        Name of the scoring function in the output file. Default: "score"
+    tree_arrays : bool
+        If `True` decision trees are scored from flat node arrays, otherwise with one masked
+        statement per node. Default: `True`
+
+    Returns
+    -------
+    Dict
+        A dict with the python score code, the written file path, the input and output variables
+        and the number of trees compiled into node arrays.
+
+    Example
+    -------
+    DS_translate_numpy("filepath.zip")
+    """
+
+## reading score code
+    with zipfile.ZipFile(in_file, "r") as archives:
+        rawScore = archives.read("dmcas_scorecode.sas").decode("UTF-8")
+
+## parsing and compiling
+    parser = _Parser(rawScore)
+    statements = parser.program()
+    compiler = _Compiler(parser, tree_arrays = tree_arrays)
+    function, inputs, outputs = compiler.compile(statements, function_name)
+
+## writing code header
+    pyscore = """## NumPy and pandas are needed to run the scoring function, no SAS Viya connection is used
+# pip install numpy pandas
+# translated from dmcas_scorecode.sas of {}
+
+import functools
+import math
+import operator
+
+import numpy as np
+import pandas as pd
+
+INPUTS = {}
+OUTPUTS = {}
+""".format(os.path.basename(in_file), inputs, outputs)
+
+    pyscore += _RUNTIME
+    if compiler.trees:
+        pyscore += _TREE_RUNTIME
+        pyscore += "\n## decision trees as flat node arrays\n"
+        pyscore += "".join(compiler.trees)
+    pyscore += "\n\n" + function
+    pyscore += """
+
+## Example:
+## scored = {}(pd.read_csv("hmeq.csv"))
+""".format(function_name)
+
+## saving to file
+
+    f = open(out_file, "wt")
+    f.write(pyscore)
+    f.close()
+
+    print("The file was successfully written to {}".format(out_file))
+
+    return dict({"py_code": pyscore,
+                 "out_file": out_file,
+                 "inputs": inputs,
+                 "outputs": outputs,
+                 "trees": len(compiler.trees)})
@@ -0,0 +1,148 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import textwrap
+
+## scores the parts of the input table on their own sessions and appends them into the output table
+_PARTITIONED_CODE = '''## Partitioned scoring: the input table is split in PARTITIONS parts scored at the same time, each
+## on its own session, then the parts are appended into the output table. A failed part is scored
+## again on a new session, the parts already scored are kept.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PARTITIONS = {partitions} ## number of parts, and of sessions scoring them side by side
+PARTITION_COLUMN = {partition_column} ## numeric column splitting the input with mod(), None numbers the rows in a copy of the input
+RETRIES = {retries} ## times a failed part is scored again
+
+
+{session_code}
+
+def check(result, action):
+    """ SWAT does not raise on failed actions, a failed part must raise to be scored again. """
+    if result.severity > 1:
+        raise RuntimeError("{{}} failed: {{}}".format(action, result.status))
+    return result
+
+
+if PARTITION_COLUMN is None:
+    ## numbering the rows in a global copy of the input table, visible from every session
+    part_caslib, part_castable = out_caslib, out_castable + "_pysct_in"
+    conn.table.dropTable(caslib = part_caslib, name = part_castable, quiet = True)
+    check(conn.dataStep.runCode(code = "data {{}}.{{}}(promote=yes); set {{}}.{{}}; _pysct_part_ = mod(_n_ - 1, {{}}); run;"
+                                       .format(part_caslib, part_castable, in_caslib, in_castable, PARTITIONS)),
+          "dataStep.runCode")
+    part_where = "_pysct_part_ = {{}}"
+else:
+    part_caslib, part_castable = in_caslib, in_castable
+    part_where = "mod(" + PARTITION_COLUMN + ", " + str(PARTITIONS) + ") = {{}}"
+
+
+def score_partition(part):
+    part_out = "{{}}_pysct_part{{}}".format(out_castable, part)
+    where = part_where.format(part)
+    started = time.time()
+    for attempt in range(1, RETRIES + 2):
+        session = open_session()
+        try:
+            session.table.dropTable(caslib = out_caslib, name = part_out, quiet = True)
+{score_code}
+            break
+        except Exception as error:
+            print("Partition {{}} failed (attempt {{}}): {{}}".format(part, attempt, error))
+            if attempt > RETRIES:
+                raise
+        finally:
+            close_session(session)
+    return {{"partition": part, "seconds": time.time() - started, "attempts": attempt}}
+
+
+with ThreadPoolExecutor(PARTITIONS) as executor:
+    partition_timings = list(executor.map(score_partition, range(PARTITIONS)))
+
+## appending the parts into the output table, then dropping them
+parts = " ".join("{{}}.{{}}_pysct_part{{}}".format(out_caslib, out_castable, part) for part in range(PARTITIONS))
+check(conn.dataStep.runCode(code = "data {{}}.{{}}; set {{}}; {{}}run;"
+                                   .format(out_caslib, out_castable, parts, {drop_code})),
+      "dataStep.runCode")
+for part in range(PARTITIONS):
+    conn.table.dropTable(caslib = out_caslib, name = "{{}}_pysct_part{{}}".format(out_castable, part), quiet = True)
+if PARTITION_COLUMN is None:
+    conn.table.dropTable(caslib = part_caslib, name = part_castable, quiet = True)
+
+for timing in partition_timings:
+    print("Partition {{partition}} scored in {{seconds:.2f}}s ({{attempts}} attempt(s))".format(**timing))
+
+'''
+
+##################################
+###### Partitioned scoring  ######
+##################################
+
+def _session_code(hostname, connection_pool = False, module_name = "cas_pool"):
+    """ Python code defining `open_session()` and `close_session(session)`, giving every thread of the
+    script its own session, from the shared pool module when `connection_pool`. """
+
+    if connection_pool:
+        return """def open_session():
+    return {0}.acquire(hostname = \"{1}\", ## change if needed
+{2}port = 8777,
+{2}protocol='http',
+{2}username='username', ## use your own credentials
+{2}password='password')
+
+
+def close_session(session):
+    {0}.release(session)
+""".format(module_name, hostname, " " * len("    return {}.acquire(".format(module_name)))
+    return """def open_session():
+    return swat.CAS(hostname = \"{0}\", ## change if needed
+                    port = 8777,
+                    protocol='http',
+                    username='username', ## use your own credentials
+                    password='password')
+
+
+def close_session(session):
+    session.close()
+""".format(hostname)
+
+
+def _partitioned_code(hostname, score_code,
+                      partitions = 4,
+                      partition_column = None,
+                      retries = 1,
+                      connection_pool = False,
+                      drop_partition_column = False,
+                      module_name = "cas_pool"):
+    """ Python code scoring the input table in `partitions` parts on as many sessions with a thread pool,
+    written after the script opened `conn`. `score_code` scores the part `where` of `part_caslib.part_castable`
+    on `session` into a promoted `out_caslib.part_out` table, raising (e.g. with `check`) when it fails. """
+
+    session_code = _session_code(hostname, connection_pool, module_name)
+
+    drop_code = '"drop _pysct_part_; " if PARTITION_COLUMN is None else ""' if drop_partition_column else '""'
+
+    return _PARTITIONED_CODE.format(partitions = partitions,
+                                    partition_column = "None" if partition_column is None else "\"{}\"".format(partition_column),
+                                    retries = retries,
+                                    session_code = session_code,
+                                    score_code = textwrap.indent(score_code.strip("\n"), " " * 12),
+                                    drop_code = drop_code)
+
+
+def _promote_astore_code(astore_caslib, astore_name):
+    """ Promotes the astore loaded by the script, the scoring sessions only see global tables. """
+
+    return """## promoting the astore to global scope, the scoring sessions only see global tables
+if conn.table.tableExists(caslib = {0}, name = {1}).exists == 1:
+    conn.table.promote(caslib = {0}, name = {1})
+
+""".format(astore_caslib, astore_name)
+
+
+def _check_partitions(partitions, asynchronous):
+    if partitions is not None and partitions < 1:
+        raise Exception("partitions must be a positive number of parts")
+    if partitions and asynchronous:
+        raise Exception("partitions is only available for the SWAT scripts, the asyncio scripts can score "
+                        "the parts as concurrent jobs with cas_async.run_all")
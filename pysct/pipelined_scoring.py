@@ -0,0 +1,227 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import textwrap
+
+from .ingest import _READ_CHUNKS_CODE
+from .partitioned_scoring import _session_code
+
+## uploads, scores and downloads the chunks of a local file at the same time, on three threads
+_PIPELINED_CODE = '''## Pipelined scoring: the local file is read in chunks of PIPELINE_CHUNK_ROWS rows going through three
+## stages, each on its own thread and session. Chunk N+1 is uploaded while chunk N is scored and chunk
+## N-1 downloaded, so the run takes about the time of the slowest stage instead of the sum of the three.
+## At most PIPELINE_DEPTH chunks wait between two stages, the memory used does not depend on the file size.
+import queue
+import threading
+import time
+import pandas
+
+PIPELINE_IN_FILE = "{upload_file}" ## .csv or .parquet (pip install pyarrow)
+PIPELINE_OUT_FILE = "{download_file}" ## .csv or .parquet (pip install pyarrow)
+PIPELINE_CHUNK_ROWS = {chunk_rows} ## rows per chunk
+PIPELINE_DEPTH = {depth} ## chunks waiting between two stages
+COPY_VARS = {copy_vars} ## columns copied to the scored rows, None, "ALL" or a list
+chunk_caslib = out_caslib
+
+
+{session_code}
+
+def check(result, action):
+    """ SWAT does not raise on failed actions, a failed chunk must stop the pipeline. """
+    if result.severity > 1:
+        raise RuntimeError("{{}} failed: {{}}".format(action, result.status))
+    return result
+
+
+def copy_vars(columns):
+    if COPY_VARS == "ALL":
+        return columns
+    return COPY_VARS
+
+
+{read_chunks_code}
+
+## state shared by the stages, the chunk tables left behind are dropped when a stage fails
+failure = threading.Event()
+errors = []
+chunk_tables = set()
+stage_seconds = {{"upload": 0.0, "score": 0.0, "download": 0.0}}
+output = {{"rows": 0, "writer": None}}
+DONE = None ## put after the last chunk
+
+
+def received(source):
+    """ The chunks the previous stage put in `source`, until it is done or a stage failed. """
+    while not failure.is_set():
+        try:
+            item = source.get(timeout = 0.5)
+        except queue.Empty:
+            continue
+        if item is DONE:
+            return
+        yield item
+
+
+def send(target, item):
+    """ Waits for room in `target`, gives up when a stage failed as the next one may have stopped reading. """
+    while not failure.is_set():
+        try:
+            target.put(item, timeout = 0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def stage(name, work, items, target, prepare = None):
+    """ Runs `work(session, item)` on every item on a session of its own, sending the results to `target`. """
+    session = open_session()
+    try:
+        if prepare is not None:
+            prepare(session)
+        for item in items:
+            if failure.is_set():
+                break
+            started = time.perf_counter()
+            result = work(session, item)
+            stage_seconds[name] += time.perf_counter() - started
+            if target is not None:
+                send(target, result)
+    except Exception as error:
+        errors.append("{{}} stage failed: {{}}".format(name, error))
+        failure.set()
+    finally:
+        if target is not None:
+            send(target, DONE)
+        close_session(session)
+
+
+def upload(session, item):
+    number, chunk = item
+    chunk_in = "{{}}_pysct_in{{}}".format(out_castable, number)
+    chunk_tables.add(chunk_in)
+    session.table.dropTable(caslib = chunk_caslib, name = chunk_in, quiet = True)
+    ## promoted, the scoring session only sees global tables
+    session.upload_frame(chunk, casout = {{"caslib": chunk_caslib, "name": chunk_in, "replace": True, "promote": True}})
+    return number, chunk_in, len(chunk), chunk.columns.tolist()
+
+
+def prepare_scoring(session):
+{prepare_code}
+
+
+def score(session, item):
+    number, chunk_in, rows, columns = item
+    chunk_out = "{{}}_pysct_out{{}}".format(out_castable, number)
+    chunk_tables.add(chunk_out)
+    session.table.dropTable(caslib = chunk_caslib, name = chunk_out, quiet = True)
+{score_code}
+    session.table.dropTable(caslib = chunk_caslib, name = chunk_in, quiet = True)
+    chunk_tables.discard(chunk_in)
+    return number, chunk_out, rows
+
+
+def write_chunk(frame):
+    if PIPELINE_OUT_FILE.lower().endswith(".parquet"):
+        import pyarrow
+        import pyarrow.parquet
+        table = pyarrow.Table.from_pandas(frame, preserve_index = False)
+        if output["writer"] is None:
+            output["writer"] = pyarrow.parquet.ParquetWriter(PIPELINE_OUT_FILE, table.schema)
+        output["writer"].write_table(table.cast(output["writer"].schema))
+    else:
+        frame.to_csv(PIPELINE_OUT_FILE, mode = "a" if output["rows"] else "w", header = not output["rows"], index = False)
+    output["rows"] += len(frame)
+
+
+def download(session, item):
+    number, chunk_out, rows = item
+    frame = check(session.table.fetch(table = {{"caslib": chunk_caslib, "name": chunk_out}},
+                                      to = rows,
+                                      maxRows = rows,
+                                      index = False),
+                  "table.fetch")["Fetch"]
+    session.table.dropTable(caslib = chunk_caslib, name = chunk_out, quiet = True)
+    chunk_tables.discard(chunk_out)
+    ## the chunks arrive in order, there is a single thread per stage
+    write_chunk(frame)
+
+
+to_score = queue.Queue(PIPELINE_DEPTH)
+to_download = queue.Queue(PIPELINE_DEPTH)
+pipeline_started = time.perf_counter()
+threads = [threading.Thread(target = stage, args = ("upload", upload,
+                                                    enumerate(read_chunks(PIPELINE_IN_FILE, PIPELINE_CHUNK_ROWS,
+                                                                          csv_dtypes(PIPELINE_IN_FILE,
+                                                                                     PIPELINE_CHUNK_ROWS))),
+                                                    to_score)),
+           threading.Thread(target = stage, args = ("score", score, received(to_score), to_download,
+                                                    prepare_scoring)),
+           threading.Thread(target = stage, args = ("download", download, received(to_download), None))]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+if output["writer"] is not None:
+    output["writer"].close()
+
+for name in chunk_tables:
+    conn.table.dropTable(caslib = chunk_caslib, name = name, quiet = True)
+if errors:
+    raise RuntimeError("; ".join(errors))
+
+pipeline_seconds = max(time.perf_counter() - pipeline_started, 1e-9)
+print("Scored {{}} rows from {{}} to {{}} in {{:.2f}}s: {{:.0f}} rows/s, stages busy upload {{:.2f}}s, "
+      "score {{:.2f}}s, download {{:.2f}}s".format(output["rows"], PIPELINE_IN_FILE, PIPELINE_OUT_FILE,
+                                                pipeline_seconds, output["rows"] / pipeline_seconds,
+                                                stage_seconds["upload"], stage_seconds["score"],
+                                                stage_seconds["download"]))
+
+'''
+
+##################################
+###### Pipelined scoring    ######
+##################################
+
+def _pipelined_code(hostname, score_code, upload_file, download_file,
+                    chunk_rows = 100000,
+                    depth = 2,
+                    prepare_code = None,
+                    copyVars = None,
+                    connection_pool = False,
+                    module_name = "cas_pool"):
+    """ Python code scoring the local `upload_file` into the local `download_file` chunk by chunk, the upload,
+    the scoring and the download of consecutive chunks overlapping on three threads, written after the script
+    opened `conn` and defined `out_caslib` and `out_castable`. `score_code` scores `chunk_caslib.chunk_in` on
+    `session` into a promoted `chunk_caslib.chunk_out` table, copying the `copy_vars(columns)`, and raises
+    (e.g. with `check`) when it fails. `prepare_code` runs once on the scoring `session`, e.g. loading an
+    action set. """
+
+    for path, argument in [(upload_file, "upload_file"), (download_file, "download_file")]:
+        if not path.lower().endswith((".parquet", ".csv")):
+            raise Exception("{} must be a .parquet or a .csv file".format(argument))
+
+    if isinstance(copyVars, str) and copyVars != "ALL":
+        copyVars = [copyVars]
+
+    return _PIPELINED_CODE.format(upload_file = upload_file.replace("\\", "/"),
+                                  download_file = download_file.replace("\\", "/"),
+                                  chunk_rows = chunk_rows,
+                                  depth = depth,
+                                  copy_vars = repr(copyVars),
+                                  session_code = _session_code(hostname, connection_pool, module_name),
+                                  read_chunks_code = _READ_CHUNKS_CODE,
+                                  prepare_code = textwrap.indent((prepare_code or "pass").strip("\n"), " " * 4),
+                                  score_code = textwrap.indent(score_code.strip("\n"), " " * 4))
+
+
+def _check_pipelined(pipelined, upload_file, download_file, asynchronous,
+                     partitions = None,
+                     watermark_column = None):
+    if not pipelined:
+        return
+    if asynchronous:
+        raise Exception("pipelined is only available for the SWAT scripts, not with asynchronous or service")
+    if upload_file is None or download_file is None:
+        raise Exception("pipelined scores a local file into a local file, it needs upload_file and download_file")
+    if partitions or watermark_column is not None:
+        raise Exception("pipelined can not be used with partitions nor watermark_column")
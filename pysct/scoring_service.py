@@ -0,0 +1,295 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import textwrap
+
+## the service around the model specific `load_model` and `score_table` coroutines
+_SERVICE_CODE = '''
+## Service settings
+PORT = {port} ## port the service listens on
+SESSIONS = {sessions} ## CAS sessions scoring batches side by side, CAS runs one action at a time per session
+MAX_BATCH_ROWS = {max_batch_rows} ## a batch is scored as soon as it has this many rows...
+MAX_WAIT_MS = {max_wait_ms} ## ...or when its first request waited this long
+ROW_ID = "_pysct_row_" ## column added to the batch tables to give each caller its own rows back
+KEY_COLUMN = {key_column} ## caller column copied back to the scored rows
+COPY_VARS = {copy_vars} ## columns copied to the scored rows, None, "ALL" or a list
+batch_caslib = "casuser"
+
+
+def copy_vars(columns):
+    if COPY_VARS == "ALL":
+        return columns
+    return [ROW_ID] + list(COPY_VARS or [])
+
+
+{model_code}
+
+async def score_batch(cas, rows, table):
+    """ Scores a list of rows (dicts) with one CAS action, returns the scored rows in the same order. """
+
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow([ROW_ID] + columns)
+    for number, row in enumerate(rows):
+        writer.writerow([number] + [row.get(column, "") for column in columns])
+
+    await cas.upload(text.getvalue().encode("UTF-8"), batch_caslib, table, "CSV")
+    await score_table(cas, table, table + "_out", [ROW_ID] + columns)
+    results = await cas.action("table.fetch", table = {{"caslib": batch_caslib, "name": table + "_out"}},
+                               to = len(rows), maxRows = len(rows), index = False)
+
+    scored = [None] * len(rows)
+    for row in {module_name}._rows(results.get("Fetch")):
+        number = int(float(row.pop(ROW_ID)))
+        if KEY_COLUMN is not None:
+            row[KEY_COLUMN] = rows[number].get(KEY_COLUMN)
+        scored[number] = row
+    return scored
+
+
+class MicroBatcher(object):
+    """ Coalesces concurrent requests into batches of up to MAX_BATCH_ROWS rows, waiting at most
+    MAX_WAIT_MS for a batch to fill. Every session has a worker scoring one batch at a time. """
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.stats = {{"requests": 0, "rows": 0, "batches": 0, "errors": 0}}
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def next_batch(self):
+        requests = [await self.queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + MAX_WAIT_MS / 1000.0
+        while size < MAX_BATCH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    async def worker(self, number, ready):
+        try:
+            async with {module_name}.connect(hostname = HOSTNAME, ## change if needed
+                                     port = 8777,
+                                     protocol = "http",
+                                     username = "username", ## use your own credentials
+                                     password = "password") as cas:
+                ## the model is loaded once and stays resident for every batch of this session
+                await load_model(cas)
+                ready.set_result(True)
+
+                while True:
+                    requests = await self.next_batch()
+                    rows = [row for request_rows, future in requests for row in request_rows]
+                    try:
+                        scored = await score_batch(cas, rows, "pysct_batch_{{}}".format(number))
+                    except Exception as error:
+                        self.stats["errors"] += 1
+                        for request_rows, future in requests:
+                            if not future.done():
+                                future.set_exception(error)
+                        continue
+
+                    position = 0
+                    for request_rows, future in requests:
+                        if not future.done():
+                            future.set_result(scored[position:position + len(request_rows)])
+                        position += len(request_rows)
+                    self.stats["requests"] += len(requests)
+                    self.stats["rows"] += len(rows)
+                    self.stats["batches"] += 1
+        except Exception as error:
+            if not ready.done():
+                ready.set_exception(error)
+            raise
+
+
+async def score_handler(request):
+    """ POST /score with a row, a list of rows or {{"rows": [...]}}, answers {{"rows": [...]}}. """
+
+    body = await request.json()
+    rows = body.get("rows", body) if isinstance(body, dict) else body
+    rows = [rows] if isinstance(rows, dict) else rows
+    if not rows:
+        return web.json_response({{"rows": []}})
+    try:
+        scored = await request.app["batcher"].submit(rows)
+    except Exception as error:
+        return web.json_response({{"error": str(error)}}, status = 500)
+    return web.json_response({{"rows": scored}})
+
+
+async def metrics_handler(request):
+    stats = dict(request.app["batcher"].stats)
+    stats["mean_batch_rows"] = stats["rows"] / stats["batches"] if stats["batches"] else 0
+    return web.json_response(stats)
+
+
+async def health_handler(request):
+    return web.json_response({{"status": "ok"}})
+
+
+async def start(app):
+    batcher = MicroBatcher()
+    loop = asyncio.get_running_loop()
+    ready = [loop.create_future() for number in range(SESSIONS)]
+    app["batcher"] = batcher
+    app["workers"] = [asyncio.ensure_future(batcher.worker(number, ready[number])) for number in range(SESSIONS)]
+    await asyncio.gather(*ready)
+
+
+async def stop(app):
+    for worker in app["workers"]:
+        worker.cancel()
+    await asyncio.gather(*app["workers"], return_exceptions = True)
+
+
+def service():
+    app = web.Application()
+    app.router.add_post("/score", score_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    app.router.add_get("/health", health_handler)
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    return app
+
+
+async def load_test(url, rows, requests = 1000, concurrency = 64, rows_per_request = 1):
+    """ Sends `requests` POST /score requests, `concurrency` at a time, and reports the throughput
+    and the latency percentiles, with the mean batch size the service reached. """
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(connector = aiohttp.TCPConnector(limit = concurrency)) as http:
+
+        async def one(number):
+            start = number * rows_per_request
+            body = [rows[(start + offset) % len(rows)] for offset in range(rows_per_request)]
+            async with semaphore:
+                sent = time.perf_counter()
+                async with http.post(url + "/score", json = {{"rows": body}}) as response:
+                    response.raise_for_status()
+                    await response.json()
+                latencies.append(time.perf_counter() - sent)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(number) for number in range(requests)))
+        elapsed = time.perf_counter() - started
+
+        async with http.get(url + "/metrics") as response:
+            metrics = await response.json()
+
+    latencies.sort()
+
+    def percentile(p):
+        return 1000 * latencies[max(0, int(math.ceil(p / 100.0 * len(latencies))) - 1)]
+
+    report = {{"requests": requests,
+              "concurrency": concurrency,
+              "rows_per_request": rows_per_request,
+              "seconds": round(elapsed, 3),
+              "requests_per_second": round(requests / elapsed, 1),
+              "rows_per_second": round(requests * rows_per_request / elapsed, 1),
+              "p50_ms": round(percentile(50), 2),
+              "p95_ms": round(percentile(95), 2),
+              "p99_ms": round(percentile(99), 2),
+              "max_ms": round(1000 * latencies[-1], 2),
+              "mean_batch_rows": round(metrics["mean_batch_rows"], 1)}}
+    print(json.dumps(report, indent = 2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest = "command")
+    commands.add_parser("serve", help = "starts the scoring service")
+    load = commands.add_parser("load-test", help = "load tests a running service")
+    load.add_argument("rows_file", help = "JSON file with a list of input rows")
+    load.add_argument("--url", default = "http://localhost:{{}}".format(PORT))
+    load.add_argument("--requests", type = int, default = 1000)
+    load.add_argument("--concurrency", type = int, default = 64)
+    load.add_argument("--rows-per-request", type = int, default = 1)
+    args = parser.parse_args()
+
+    if args.command == "load-test":
+        with open(args.rows_file) as f:
+            asyncio.run(load_test(args.url, json.load(f), args.requests, args.concurrency, args.rows_per_request))
+    else:
+        web.run_app(service(), port = PORT)
+'''
+
+##################################
+###### Scoring service      ######
+##################################
+
+def _service_header_code(module_name = "cas_async"):
+    """ Imports of a script written with `service = True`, replaces the SWAT header. """
+
+    return """## Real time scoring service: the model is loaded once when the service starts and stays in memory,
+## concurrent requests are coalesced into micro-batches scored by a single CAS action and every
+## caller gets its own rows back. It uses the CAS REST API through {0}.py (next to this file).
+##   python this_file.py serve                      starts the service
+##   python this_file.py load-test rows.json        reports throughput and p50/p95/p99 latency
+# pip install aiohttp
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import math
+import time
+
+import aiohttp
+from aiohttp import web
+
+import {0}
+
+""".format(module_name)
+
+
+def _service_code(hostname, load_code, score_code,
+                  key_column = None,
+                  copyVars = None,
+                  module_name = "cas_async",
+                  port = 8080,
+                  sessions = 2,
+                  max_batch_rows = 256,
+                  max_wait_ms = 10):
+    """ The service part of a script written with `service = True`. `load_code` is the python code
+    loading the model (awaiting `cas` methods, as written for `asynchronous = True`) and
+    `score_code` the code scoring the `table` batch into `out`, copying the `copy_vars(columns)`. """
+
+    if isinstance(copyVars, str) and copyVars != "ALL":
+        copyVars = [copyVars]
+    if copyVars == ["ALL"]:
+        copyVars = "ALL"
+
+    model_code = "HOSTNAME = \"{}\"\n\n\n".format(hostname)
+    model_code += "async def load_model(cas):\n"
+    if "astore_name = " in load_code:
+        ## the residency check renames the astore after its checksum
+        model_code += "    global astore_name\n\n"
+    model_code += textwrap.indent(load_code.strip("\n") or "pass", "    ") + "\n\n\n"
+    model_code += "async def score_table(cas, table, out, columns):\n"
+    model_code += textwrap.indent(score_code.strip("\n"), "    ") + "\n"
+
+    return _SERVICE_CODE.format(port = port,
+                                sessions = sessions,
+                                max_batch_rows = max_batch_rows,
+                                max_wait_ms = max_wait_ms,
+                                key_column = repr(key_column),
+                                copy_vars = repr(copyVars),
+                                model_code = model_code,
+                                module_name = module_name)
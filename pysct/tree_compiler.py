@@ -0,0 +1,331 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+## IF/ELSE blocks with fewer splits than this are cheaper to run as masked statements
+_MIN_TREE_SPLITS = 3
+
+## node kinds of the flat tree arrays
+_LESS = 0
+_LESS_EQUAL = 1
+_SUBSET = 2
+
+## runtime class written in the generated module when the score code has decision trees
+_TREE_RUNTIME = '''
+
+class _Tree(object):
+    """ Decision tree stored as flat node arrays, every row walks down the tree at the same time,
+    one level per iteration. Features with `levels` are matched against category subsets. """
+
+    def __init__(self, levels, feature, kind, threshold, subset, missing_left, left, right, leaf, members):
+        self.levels = [None if level is None else np.array(level) for level in levels]
+        self.feature = np.array(feature, dtype = np.int64)
+        self.kind = np.array(kind, dtype = np.int8) ## 0: x < threshold, 1: x <= threshold, 2: x in subset
+        self.threshold = np.array(threshold, dtype = np.float64)
+        self.subset = np.array(subset, dtype = np.int64)
+        self.missing_left = np.array(missing_left, dtype = bool)
+        self.left = np.array(left, dtype = np.int64)
+        self.right = np.array(right, dtype = np.int64)
+        self.leaf = np.array(leaf, dtype = np.int64) ## -1 for split nodes
+        self.members = np.array(members or [[False]], dtype = bool) ## subset x (level code + 1)
+
+    def _codes(self, values, levels, n):
+        """ Level codes, -1 for unknown levels and NaN for missing values. """
+        if _is_char(levels):
+            values = np.broadcast_to(_text(values), (n,))
+            missing = values == ""
+        else:
+            values = np.broadcast_to(np.asarray(values, dtype = np.float64), (n,))
+            missing = np.isnan(values)
+        position = np.minimum(np.searchsorted(levels, values), len(levels) - 1)
+        codes = np.where(levels[position] == values, position, -1).astype(np.float64)
+        codes[missing] = _NAN
+        return codes
+
+    def leaves(self, columns, n):
+        x = np.empty((len(columns), n))
+        for index, (column, levels) in enumerate(zip(columns, self.levels)):
+            if levels is None:
+                x[index] = np.asarray(column, dtype = np.float64)
+            else:
+                x[index] = self._codes(column, levels, n)
+
+        node = np.zeros(n, dtype = np.int64)
+        rows = np.arange(n)
+        while rows.size:
+            current = node[rows]
+            values = x[self.feature[current], rows]
+            missing = np.isnan(values)
+            values = np.where(missing, 0.0, values)
+            kind = self.kind[current]
+            threshold = self.threshold[current]
+            go_left = np.where(kind == 0, values < threshold, values <= threshold)
+            in_subset = kind == 2
+            if in_subset.any():
+                go_left[in_subset] = self.members[self.subset[current[in_subset]],
+                                                  values[in_subset].astype(np.int64) + 1]
+            go_left = np.where(missing, self.missing_left[current], go_left)
+            node[rows] = np.where(go_left, self.left[current], self.right[current])
+            rows = rows[self.leaf[node[rows]] < 0]
+
+        return self.leaf[node]
+'''
+
+##################################
+###### Tree extraction      ######
+##################################
+
+class _Predicate(object):
+    """ A split on a single variable: `test` decides the rows with a value, `missing` is the
+    outcome for missing values. `test` is None when the outcome does not depend on the value. """
+
+    def __init__(self, variable, test, negate, missing, constant = None):
+        self.variable = variable
+        self.test = test
+        self.negate = negate
+        self.missing = missing
+        self.constant = constant
+
+
+def _constant(node):
+    if node[0] in ("num", "str"):
+        return node[1]
+    if node[0] == "neg" and node[1][0] == "num":
+        return -node[1][1]
+    return None
+
+
+def _is_missing_value(value):
+    return value != value or (isinstance(value, str) and value.strip() == "")
+
+
+def _predicate(node):
+    """ Reads an IF condition as a split, `None` if it is anything else. """
+
+    kind = node[0]
+
+    if kind == "not":
+        inner = _predicate(node[1])
+        if inner is None:
+            return None
+        return _Predicate(inner.variable, inner.test, not inner.negate, not inner.missing,
+                          None if inner.constant is None else not inner.constant)
+
+    if kind == "call" and node[1] == "missing" and len(node[2]) == 1 and node[2][0][0] == "var":
+        return _Predicate(node[2][0][1], None, False, True, constant = False)
+
+    if kind == "cmp":
+        operator_, left, right = node[1], node[2], node[3]
+        if left[0] != "var":
+            left, right = right, left
+            operator_ = {"lt": "gt", "gt": "lt", "le": "ge", "ge": "le"}.get(operator_, operator_)
+        value = _constant(right)
+        if left[0] != "var" or value is None or _is_missing_value(value):
+            return None
+        if operator_ in ("eq", "ne"):
+            test = ("in", (value,))
+            return _Predicate(left[1], test, operator_ == "ne", operator_ == "ne")
+        if isinstance(value, str):
+            return None
+        ## missing values are smaller than any number
+        test = {"lt": (_LESS, value), "ge": (_LESS, value), "le": (_LESS_EQUAL, value), "gt": (_LESS_EQUAL, value)}[operator_]
+        return _Predicate(left[1], test, operator_ in ("ge", "gt"), operator_ in ("lt", "le"))
+
+    if kind == "in":
+        values = [_constant(item) for item in node[2]]
+        if node[1][0] != "var" or any(value is None for value in values):
+            return None
+        missing = any(_is_missing_value(value) for value in values)
+        values = tuple(value for value in values if not _is_missing_value(value))
+        if not values:
+            return None
+        return _Predicate(node[1][1], ("in", values), node[3], missing != node[3])
+
+    if kind in ("and", "or"):
+        first = _predicate(node[1])
+        second = _predicate(node[2])
+        if first is None or second is None or first.variable != second.variable:
+            return None
+        if first.test is not None:
+            first, second = second, first
+        ## only `missing(x) or <split on x>` and `not missing(x) and <split on x>`
+        if first.test is not None or second.test is None:
+            return None
+        if (kind == "and") != bool(first.constant):
+            return None
+        missing = (first.missing and second.missing) if kind == "and" else (first.missing or second.missing)
+        return _Predicate(second.variable, second.test, second.negate, missing)
+
+    return None
+
+
+def _leaf(node):
+    """ Constant assignments of a leaf, `None` if the statement is anything else. """
+
+    if node is None or node[0] == "nop":
+        return {}
+    if node[0] == "assign" and node[1][0] == "var":
+        value = _constant(node[2])
+        return None if value is None else {node[1][1]: value}
+    if node[0] == "block":
+        values = {}
+        for statement in node[1]:
+            assigned = _leaf(statement)
+            if assigned is None:
+                return None
+            values.update(assigned)
+        return values
+    return None
+
+
+class _TreeBuilder(object):
+
+    def __init__(self):
+        self.features = [] ## (variable, is a subset feature)
+        self.levels = {} ## feature index -> set of values
+        self.nodes = []
+        self.subsets = []
+        self.leaves = []
+        self.splits = 0
+
+    def feature(self, variable, subset):
+        key = (variable, subset)
+        if key not in self.features:
+            self.features.append(key)
+            if subset:
+                self.levels[len(self.features) - 1] = set()
+        return self.features.index(key)
+
+    def subtree(self, node):
+        """ Adds a node and its children, returns its index or `None` when it is not a tree. """
+
+        while node is not None and node[0] == "block" and len(node[1]) == 1 and node[1][0][0] == "if":
+            node = node[1][0]
+
+        index = len(self.nodes)
+        if node is None or node[0] != "if":
+            values = _leaf(node)
+            if values is None:
+                return None
+            self.nodes.append({"leaf": len(self.leaves)})
+            self.leaves.append(values)
+            return index
+
+        predicate = _predicate(node[1])
+        if predicate is None or predicate.test is None:
+            return None
+
+        kind, value = predicate.test
+        subset = kind == "in"
+        if subset and len({isinstance(item, str) for item in value}) > 1:
+            return None
+        feature = self.feature(predicate.variable, subset)
+        if subset:
+            values = {item.rstrip() if isinstance(item, str) else float(item) for item in value}
+            if self.levels[feature] and \
+               isinstance(next(iter(self.levels[feature])), str) != isinstance(next(iter(values)), str):
+                return None
+            self.levels[feature].update(values)
+            self.subsets.append((feature, values))
+
+        split = {"feature": feature, "kind": _SUBSET if subset else kind,
+                 "threshold": 0.0 if subset else float(value),
+                 "subset": len(self.subsets) - 1 if subset else 0}
+        self.nodes.append(split)
+        self.splits += 1
+
+        ## `left` is where the test is true
+        then, otherwise = node[2], node[3]
+        if predicate.negate:
+            then, otherwise = otherwise, then
+            split["missing_left"] = not predicate.missing
+        else:
+            split["missing_left"] = predicate.missing
+
+        split["left"] = self.subtree(then)
+        split["right"] = self.subtree(otherwise)
+        if split["left"] is None or split["right"] is None:
+            return None
+        return index
+
+
+def extract_tree(node):
+    """ Reads an IF/ELSE statement made only of splits on single variables and leaves of
+    constant assignments, as written for decision trees, into flat node arrays.
+
+    Returns
+    -------
+    Dict
+        The node arrays, the features (lower case variable names) with their levels and, for every
+        variable the leaves assign, its value and whether it is assigned in each leaf. `None` if the
+        statement is not a tree or is too small to be worth it.
+    """
+
+    builder = _TreeBuilder()
+    if builder.subtree(node) is None or builder.splits < _MIN_TREE_SPLITS:
+        return None
+
+    levels = []
+    for index, (variable, subset) in enumerate(builder.features):
+        levels.append(sorted(builder.levels[index]) if subset else None)
+
+    members = []
+    for feature, values in builder.subsets:
+        row = [False] * (max(len(level) for level in levels if level is not None) + 1)
+        for value in values:
+            row[levels[feature].index(value) + 1] = True
+        members.append(row)
+
+    nodes = builder.nodes
+    tree = {"features": [variable for variable, subset in builder.features],
+            "levels": levels,
+            "feature": [node.get("feature", 0) for node in nodes],
+            "kind": [node.get("kind", 0) for node in nodes],
+            "threshold": [node.get("threshold", 0.0) for node in nodes],
+            "subset": [node.get("subset", 0) for node in nodes],
+            "missing_left": [node.get("missing_left", False) for node in nodes],
+            "left": [node.get("left", 0) for node in nodes],
+            "right": [node.get("right", 0) for node in nodes],
+            "leaf": [node.get("leaf", -1) for node in nodes],
+            "members": members,
+            "values": {}}
+
+    variables = []
+    for values in builder.leaves:
+        variables.extend(variable for variable in values if variable not in variables)
+
+    for variable in variables:
+        leaf_values = [values.get(variable) for values in builder.leaves]
+        char = any(isinstance(value, str) for value in leaf_values)
+        missing = "" if char else float("nan")
+        tree["values"][variable] = {
+            "char": char,
+            "values": [missing if value is None else value for value in leaf_values],
+            "assigned": [value is not None for value in leaf_values]}
+
+    return tree
+
+
+def tree_code(tree, name):
+    """ Python code of the module level constants holding a tree extracted by `extract_tree`. """
+
+    code = "\n{} = _Tree(levels = {},\n".format(name, _literal(tree["levels"]))
+    for array in ("feature", "kind", "threshold", "subset", "missing_left", "left", "right", "leaf", "members"):
+        code += "    {} = {},\n".format(array, _literal(tree[array]))
+    code = code.rstrip(",\n") + ")\n"
+
+    for variable, leaves in tree["values"].items():
+        code += "{}_{} = (np.array({}, dtype = {}),\n    np.array({}, dtype = bool))\n".format(
+            name, variable, _literal(leaves["values"]), "object" if leaves["char"] else "np.float64",
+            _literal(leaves["assigned"]))
+
+    return code
+
+
+def _literal(value):
+    """ repr with `nan` written as the `_NAN` constant of the generated module. """
+
+    if isinstance(value, float) and value != value:
+        return "_NAN"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_literal(item) for item in value) + "]"
+    return repr(value)
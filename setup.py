@@ -20,5 +20,11 @@ setuptools.setup(
     ],
     python_requires='>=3.6',
     install_requires=[],
+    extras_require={
+        "numpy": ["numpy", "pandas"],
+    },
+    entry_points={
+        "console_scripts": ["pysct=pysct.cli:main"],
+    },
 )
 
@@ -0,0 +1,40 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+from pysct.astore import astore_checksum, file_checksum
+from pysct.benchmark import synthetic_export
+
+
+def test_file_checksum_matches_the_zip_directory(tmp_path):
+    in_file = synthetic_export(str(tmp_path / "sentiment.zip"), "nlp_sentiment_translate", astore_mb = 2.5)
+    with zipfile.ZipFile(in_file, "r") as archives:
+        checksum = astore_checksum(archives)
+        archives.extract("SentimentModel.astore", str(tmp_path))
+
+    assert file_checksum(str(tmp_path / "SentimentModel.astore")) == checksum
+    assert file_checksum(str(tmp_path / "missing.astore")) is None
+
+
+def test_resident_astore_read_from_disk(tmp_path):
+    from pysct import nlp_sentiment_translate
+
+    export = synthetic_export(str(tmp_path / "export.zip"), "nlp_sentiment_translate", astore_mb = 0.01)
+    in_file = str(tmp_path / "sentiment.zip")
+    with zipfile.ZipFile(export, "r") as archives, zipfile.ZipFile(in_file, "w") as without_astore:
+        without_astore.writestr("AstoreScoreCode.sas", archives.read("AstoreScoreCode.sas"))
+        archives.extract("SentimentModel.astore", str(tmp_path))
+    astore_path = str(tmp_path / "SentimentModel.astore")
+
+    def code(path):
+        out = nlp_sentiment_translate(in_file, "id", "text", "public", "docs", "casuser", "sentiment",
+                                      out_file = str(tmp_path / "score.py"),
+                                      astore = True,
+                                      astore_path = path,
+                                      check_resident = True)
+        return out["py_code"]
+
+    assert 'astore_checksum = "{}"'.format(file_checksum(astore_path)) in code(astore_path)
+    ## an astore only there at run time is looked up by name
+    assert "astore_checksum" not in code(str(tmp_path / "elsewhere.astore"))
@@ -0,0 +1,28 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import collections
+
+import pytest
+
+from pysct import async_scoring
+
+_Version = collections.namedtuple("_Version", "major minor micro releaselevel serial")
+
+
+def test_async_module_needs_python_3_7(tmp_path, monkeypatch):
+    monkeypatch.setattr(async_scoring.sys, "version_info", _Version(3, 6, 15, "final", 0))
+
+    with pytest.raises(Exception, match = "python 3.7 or higher"):
+        async_scoring.write_async_module(str(tmp_path))
+    assert not (tmp_path / "cas_async.py").exists()
+
+
+def test_async_module_is_written_once(tmp_path):
+    out_file = async_scoring.write_async_module(str(tmp_path), limit = 4)
+    with open(out_file, "rt") as f:
+        module = f.read()
+
+    assert async_scoring.write_async_module(str(tmp_path), limit = 8) == out_file
+    with open(out_file, "rt") as f:
+        assert f.read() == module
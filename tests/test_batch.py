@@ -0,0 +1,86 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+
+from pysct.batch import batch_translate
+from pysct.benchmark import synthetic_export
+
+
+def _exports(tmp_path):
+    in_dir = tmp_path / "exports"
+    in_dir.mkdir()
+    synthetic_export(str(in_dir / "hmeq model.zip"), "DS_translate")
+    synthetic_export(str(in_dir / "reviews-sentiment.zip"), "nlp_sentiment_translate", astore_mb = 0.01)
+    (in_dir / "broken.zip").write_bytes(b"this is not a zip file")
+    return str(in_dir)
+
+
+def _without_timings(manifest):
+    return [dict(record, seconds = None) for record in manifest["files"]]
+
+
+def test_ok_and_failed_records(tmp_path):
+    manifest_file = str(tmp_path / "manifest.json")
+    manifest = batch_translate(_exports(tmp_path), str(tmp_path / "scripts"),
+                               "public", "docs", "casuser",
+                               key_column = "id", document_column = "text",
+                               max_workers = 1, manifest_file = manifest_file)
+
+    assert (manifest["succeeded"], manifest["failed"]) == (2, 1)
+    records = {os.path.basename(record["in_file"]): record for record in manifest["files"]}
+
+    assert records["broken.zip"]["status"] == "failed"
+    assert records["broken.zip"]["out_file"] is None
+    assert records["broken.zip"]["error"].startswith("BadZipFile")
+
+    ok = records["hmeq model.zip"]
+    assert ok["status"] == "ok" and ok["error"] is None
+    assert ok["translator"] == "DS_translate"
+    assert os.path.isfile(ok["out_file"])
+
+    with open(manifest_file, "rt") as f:
+        assert json.load(f)["files"] == manifest["files"]
+
+
+def test_out_castable_is_named_after_each_export(tmp_path):
+    manifest = batch_translate(_exports(tmp_path), str(tmp_path / "scripts"),
+                               "public", "docs", "casuser",
+                               key_column = "id", document_column = "text",
+                               max_workers = 1)
+    records = {os.path.basename(record["in_file"]): record for record in manifest["files"]}
+
+    with open(records["hmeq model.zip"]["out_file"], "rt") as f:
+        assert "hmeq_model" in f.read()
+    with open(records["reviews-sentiment.zip"]["out_file"], "rt") as f:
+        assert "reviews_sentiment" in f.read()
+
+
+def test_out_castable_given_is_used_for_every_export(tmp_path):
+    manifest = batch_translate(_exports(tmp_path), str(tmp_path / "scripts"),
+                               "public", "docs", "casuser", out_castable = "scored",
+                               key_column = "id", document_column = "text",
+                               max_workers = 1)
+
+    for record in manifest["files"]:
+        if record["status"] == "ok":
+            with open(record["out_file"], "rt") as f:
+                script = f.read()
+            assert "scored" in script and "hmeq_model" not in script
+
+
+def test_process_pool_gives_the_same_manifest(tmp_path):
+    in_dir = _exports(tmp_path)
+    arguments = dict(key_column = "id", document_column = "text")
+
+    serial = batch_translate(in_dir, str(tmp_path / "serial"), "public", "docs", "casuser",
+                             max_workers = 1, **arguments)
+    pooled = batch_translate(in_dir, str(tmp_path / "pooled"), "public", "docs", "casuser",
+                             max_workers = 2, **arguments)
+
+    for record in serial["files"] + pooled["files"]:
+        if record["out_file"] is not None:
+            record["out_file"] = os.path.basename(record["out_file"])
+    assert _without_timings(serial) == _without_timings(pooled)
+    assert (serial["succeeded"], serial["failed"]) == (pooled["succeeded"], pooled["failed"])
@@ -0,0 +1,38 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+
+from pysct.benchmark import _MOCK_METRICS, benchmark_translators, compare_baseline, save_baseline
+
+## written with: python -m pysct benchmark --sizes 0.001 --astore-mb 0.01 --repeat 1 --mock-cas
+##                   --baseline tests/benchmark_baseline.json --save-baseline
+BASELINE = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+
+def _counters(results):
+    """ The metrics that do not depend on the machine, times and memory are left to
+    `python -m pysct benchmark --baseline`. """
+
+    return {case: {metric: result[metric] for metric in _MOCK_METRICS} for case, result in results.items()}
+
+
+def test_no_regression_against_the_baseline(tmp_path):
+    results = benchmark_translators(sizes_mb = (0.001,), astore_mb = 0.01, repeat = 1, mock_cas = True)
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    assert sorted(results) == sorted(baseline)
+
+    baseline_file = save_baseline(_counters(baseline), str(tmp_path / "counters.json"))
+    assert compare_baseline(_counters(results), baseline_file) == []
+
+
+def test_any_extra_round_trip_is_a_regression(tmp_path):
+    baseline = {"DS_translate:1MB": {"seconds": 1.0, "round_trips": 10, "sessions": 1}}
+    baseline_file = save_baseline(baseline, str(tmp_path / "baseline.json"))
+
+    results = {"DS_translate:1MB": {"seconds": 1.1, "round_trips": 11, "sessions": 1}}
+    regressions = compare_baseline(results, baseline_file, tolerance = 0.25)
+
+    assert [(regression["metric"], regression["current"]) for regression in regressions] == [("round_trips", 11)]
@@ -0,0 +1,83 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import shutil
+
+from pysct import cache as cache_module
+from pysct.benchmark import synthetic_export
+from pysct.cache import TranslationCache
+
+MEMBER = "dmcas_epscorecode.sas"
+
+
+def _export(tmp_path, name = "model.zip"):
+    return synthetic_export(str(tmp_path / name), "EPS_translate", astore_mb = 0.01)
+
+
+def test_key_changes_with_the_export_path(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache"))
+    first = _export(tmp_path, "first.zip")
+    second = str(tmp_path / "second.zip")
+    shutil.copyfile(first, second)
+    arguments = {"in_caslib": "public", "in_castable": "input"}
+
+    assert cache.key(first, MEMBER, "EPS_translate", arguments) != cache.key(second, MEMBER, "EPS_translate", arguments)
+
+
+def test_key_changes_with_the_script_name_only(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache"))
+    in_file = _export(tmp_path)
+
+    def key(out_file):
+        return cache.key(in_file, MEMBER, "EPS_translate", {"out_file": out_file, "cache": cache})
+
+    assert key(str(tmp_path / "a" / "score.py")) == key(str(tmp_path / "b" / "score.py"))
+    assert key(str(tmp_path / "score.py")) != key(str(tmp_path / "other.py"))
+
+
+def test_key_changes_with_the_version(tmp_path, monkeypatch):
+    cache = TranslationCache(str(tmp_path / "cache"))
+    in_file = _export(tmp_path)
+    before = cache.key(in_file, MEMBER, "EPS_translate", {})
+    monkeypatch.setattr(cache_module, "__version__", "0.0.0")
+
+    assert cache.key(in_file, MEMBER, "EPS_translate", {}) != before
+
+
+def test_streamed_astores_are_read_from_their_own_export(tmp_path):
+    from pysct import EPS_translate
+
+    cache = TranslationCache(str(tmp_path / "cache"))
+    first = _export(tmp_path, "first.zip")
+    second = str(tmp_path / "second.zip")
+    shutil.copyfile(first, second)
+
+    codes = []
+    for in_file in (first, second):
+        out = EPS_translate(in_file, "public", "input", "casuser", "output",
+                            out_file = str(tmp_path / "score.py"),
+                            cache = cache,
+                            stream_upload = True)
+        with open(out["out_file"], "rt") as f:
+            codes.append(f.read())
+
+    assert first in codes[0] and second not in codes[0]
+    assert second in codes[1] and first not in codes[1]
+
+
+def test_metrics_name_the_translated_export(tmp_path):
+    from pysct import DS_translate
+
+    cache = TranslationCache(str(tmp_path / "cache"))
+    first = synthetic_export(str(tmp_path / "first.zip"), "DS_translate")
+    second = str(tmp_path / "second.zip")
+    shutil.copyfile(first, second)
+
+    for in_file in (first, second):
+        out = DS_translate(in_file, "public", "input", "casuser", "output",
+                           out_file = str(tmp_path / "score.py"),
+                           cache = cache,
+                           metrics_file = "metrics.jsonl")
+        with open(out["out_file"], "rt") as f:
+            assert 'METRICS_MODEL = "{}"'.format(os.path.basename(in_file)) in f.read()
@@ -0,0 +1,13 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+import sys
+
+
+def test_translating_does_not_import_the_benchmark_tools():
+    code = ("import sys, pysct.cli; "
+            "print(sorted(name for name in ('pysct.benchmark', 'pysct.mock_cas') if name in sys.modules))")
+    output = subprocess.check_output([sys.executable, "-c", code], universal_newlines = True)
+
+    assert output.strip() == "[]"
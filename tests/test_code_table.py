@@ -0,0 +1,73 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+import zipfile
+
+from pysct.code_table import _code_table_code
+from pysct.mock_cas import MockCAS
+
+## non-ASCII text, quotes and line breaks, repeated past several 4000 characters chunks
+SCORE_CODE = ("* Host: viya.example.com;\n* Encoding: utf-8;\n" +
+              "".join("label P_BAD{0} = 'Probabilité de défaut «{0}» – 確率 😀';\n"
+                      "if REASON = \"DebtCon\" then P_BAD{0} = 0.{0};\n".format(i) for i in range(300)))
+
+
+class _RecordingCAS(MockCAS):
+    """ Keeps the DATA step code sent to dataStep.runCode. """
+
+    def __init__(self):
+        super(_RecordingCAS, self).__init__()
+        self.codes = []
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if action == "dataStep.runCode":
+            self.codes.append(parameters["code"])
+        return super(_RecordingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+def _stored_code(store_code):
+    literals = re.findall(r'"([0-9a-f]*)"x;', store_code)
+    assert all(len(literal) <= 32767 for literal in literals)
+    return b"".join(bytes.fromhex(literal) for literal in literals).decode("UTF-8"), len(literals)
+
+
+def _store(cas, data_step):
+    namespace = {"DATA_STEP": data_step, "conn": cas.swat_module().CAS()}
+    exec(_code_table_code("casuser"), namespace)
+    return namespace["code_table"]
+
+
+def test_hex_literals_round_trip():
+    cas = _RecordingCAS()
+    _store(cas, SCORE_CODE)
+
+    stored, literals = _stored_code(cas.codes[0])
+    assert stored == SCORE_CODE
+    assert literals == -(-len(SCORE_CODE) // 4000) > 1
+
+
+def test_stored_code_is_not_sent_again():
+    cas = _RecordingCAS()
+    code_table = _store(cas, SCORE_CODE)
+    cas._tables.add(("casuser", code_table.lower()))
+
+    assert _store(cas, SCORE_CODE) == code_table
+    assert len(cas.codes) == 1
+
+
+def test_translated_script_stores_the_score_code(tmp_path):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "model.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", SCORE_CODE.encode("UTF-8"))
+    out_file = DS_translate(in_file, "public", "hmeq", "casuser", "hmeq_scored",
+                            out_file = str(tmp_path / "score.py"),
+                            code_table = True)["out_file"]
+
+    cas = _RecordingCAS()
+    cas.run(out_file)
+
+    assert SCORE_CODE.strip() in _stored_code(cas.codes[0])[0]
+    assert [call["action"] for call in cas.calls].count("dataStep.runCodeTable") == 1
@@ -0,0 +1,103 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib.util
+import sys
+import threading
+
+import pytest
+
+from pysct.connection_pool import write_connection_pool
+from pysct.mock_cas import MockCAS
+
+_SERVER = {"hostname": "viya.example.com", "port": 8777, "username": "username", "password": "password"}
+
+
+class _FailingCAS(MockCAS):
+    """ A server where the sessions in `dead` stopped answering. """
+
+    def __init__(self, **kwargs):
+        super(_FailingCAS, self).__init__(**kwargs)
+        self.dead = set()
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if session in self.dead:
+            raise ConnectionError("{} is closed".format(session))
+        return super(_FailingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+def _pool(tmp_path, monkeypatch, cas, **options):
+    monkeypatch.setitem(sys.modules, "swat", cas.swat_module())
+    spec = importlib.util.spec_from_file_location("cas_pool", write_connection_pool(str(tmp_path), **options))
+    pool = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pool)
+    return pool
+
+
+def test_released_session_is_reused(tmp_path, monkeypatch):
+    cas = MockCAS()
+    pool = _pool(tmp_path, monkeypatch, cas)
+
+    conn = pool.acquire(**_SERVER)
+    pool.release(conn)
+    assert pool.acquire(**_SERVER) is conn
+    assert cas.sessions == 1
+
+    ## another server or user gets its own session
+    other = pool.acquire(**dict(_SERVER, username = "other"))
+    assert other is not conn and cas.sessions == 2
+
+    pool.release(conn)
+    pool.release(other)
+    pool.close_all()
+    assert cas.open_sessions == 0
+
+
+def test_max_size(tmp_path, monkeypatch):
+    cas = MockCAS()
+    pool = _pool(tmp_path, monkeypatch, cas, max_size = 2)
+
+    first = pool.acquire(**_SERVER)
+    second = pool.acquire(**_SERVER)
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout = 0.05, **_SERVER)
+    assert cas.sessions == 2
+
+    ## a waiting acquire gets the session released by another thread
+    threading.Timer(0.05, pool.release, [first]).start()
+    assert pool.acquire(timeout = 5, **_SERVER) is first
+    assert cas.sessions == 2
+
+    pool.release(first)
+    pool.release(second)
+    pool.close_all()
+
+
+def test_dead_session_is_evicted(tmp_path, monkeypatch):
+    cas = _FailingCAS()
+    pool = _pool(tmp_path, monkeypatch, cas, max_size = 1, health_check_after = 0)
+
+    dead = pool.acquire(**_SERVER)
+    pool.release(dead)
+    cas.dead.add(dead._session)
+
+    ## the ping fails, the session is dropped and its place in the pool is given to a new one
+    conn = pool.acquire(timeout = 1, **_SERVER)
+    assert conn is not dead
+    assert cas.sessions == 2 and cas.open_sessions == 1
+    assert [call["action"] for call in cas.calls] == []
+
+    pool.release(conn)
+    assert pool.acquire(timeout = 1, **_SERVER) is conn
+    assert [call["action"] for call in cas.calls] == ["builtins.ping"]
+
+
+def test_idle_session_is_closed(tmp_path, monkeypatch):
+    cas = MockCAS()
+    pool = _pool(tmp_path, monkeypatch, cas, idle_timeout = 0)
+
+    conn = pool.acquire(**_SERVER)
+    pool.release(conn)
+
+    assert pool.acquire(**_SERVER) is not conn
+    assert cas.sessions == 2 and cas.open_sessions == 1
@@ -0,0 +1,64 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import shutil
+import zipfile
+
+from pysct.benchmark import synthetic_export
+from pysct.cache import TranslationCache
+from pysct.metadata import resolve_copy_vars
+
+VARIABLES = [{"name": "ID"}, {"name": "Text"}, {"name": "Source"}]
+
+
+def _export(path, variables = VARIABLES):
+    synthetic_export(path, "nlp_sentiment_translate", astore_mb = 0.01)
+    if variables is not None:
+        with zipfile.ZipFile(path, "a") as archives:
+            archives.writestr("inputVar.json", json.dumps(variables))
+    return path
+
+
+def _translate(tmp_path, in_file, **arguments):
+    from pysct import nlp_sentiment_translate
+
+    out = nlp_sentiment_translate(in_file, "id", "text", "public", "docs", "casuser", "sentiment",
+                                  out_file = str(tmp_path / "score.py"),
+                                  astore = True,
+                                  **arguments)
+    with open(out["out_file"], "rt") as f:
+        return f.read()
+
+
+def test_resolve_copy_vars():
+    variables = ["ID", "Text"]
+
+    assert resolve_copy_vars(None, variables) is None
+    assert resolve_copy_vars("ALL", None) == "ALL"
+    assert resolve_copy_vars("ALL", variables) == ["ID", "Text"]
+    assert resolve_copy_vars(["text"], variables) == ["Text"]
+    assert resolve_copy_vars(["text"], variables, key_column = "id") == ["ID", "Text"]
+
+
+def test_key_column_is_only_copied_when_asked(tmp_path):
+    in_file = _export(str(tmp_path / "sentiment.zip"))
+
+    assert "column_names = ['Source']" in _translate(tmp_path, in_file, copyVars = ["source"])
+    assert "column_names = ['ID', 'Source']" in _translate(tmp_path, in_file, copyVars = ["source"], copy_key = True)
+
+
+def test_cache_reads_the_input_variables(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache"))
+    in_file = str(tmp_path / "sentiment.zip")
+    model = _export(str(tmp_path / "model.zip"), None)
+
+    ## the same score code and astore, only inputVar.json changes
+    shutil.copyfile(model, in_file)
+    with zipfile.ZipFile(in_file, "a") as archives:
+        archives.writestr("inputVar.json", json.dumps(VARIABLES))
+    assert "column_names = ['ID', 'Text', 'Source']" in _translate(tmp_path, in_file, copyVars = "ALL", cache = cache)
+    shutil.copyfile(model, in_file)
+    with zipfile.ZipFile(in_file, "a") as archives:
+        archives.writestr("inputVar.json", json.dumps(VARIABLES[:2]))
+    assert "column_names = ['ID', 'Text']" in _translate(tmp_path, in_file, copyVars = "ALL", cache = cache)
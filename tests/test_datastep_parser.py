@@ -0,0 +1,74 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+from pysct.datastep_parser import tokenize, variable_usage
+
+## a tree scored with jumps, as in the exports of SAS Viya decision trees
+TREE_GOTO = """/* tree model */
+* Host: myviya.example.com;
+* Encoding: utf-8;
+drop _node_;
+if missing(LOAN) then goto skip_0_0;
+if LOAN < 15000 then do;
+   _node_ = 1;
+   goto leaf_0_1;
+end;
+skip_0_0: _node_ = 2;
+leaf_0_1:
+if _node_ = 1 then P_BAD1 = 0.3; else P_BAD1 = 0.1;
+length I_BAD $ 12;
+if P_BAD1 >= 0.5 then I_BAD = '1'; else I_BAD = '0';
+"""
+
+LOGISTIC = """/* logistic model */
+* Host: myviya.example.com;
+* Encoding: utf-8;
+length I_BAD $ 12;
+if missing(LOAN) then LOAN = 18000;
+P_BAD1 = 1 / (1 + exp(-(-1.5 + 0.00002 * LOAN)));
+if P_BAD1 >= 0.5 then I_BAD = '1'; else I_BAD = '0';
+"""
+
+
+def _export(path, code):
+    with zipfile.ZipFile(path, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", code)
+    return path
+
+
+def test_labels_are_not_variables():
+    defined, read_first, names, labels = variable_usage(tokenize(TREE_GOTO))
+
+    assert labels == {"skip_0_0", "leaf_0_1"}
+    assert defined == {"_node_", "p_bad1", "i_bad"}
+    assert read_first == set()
+    assert {"skip_0_0", "leaf_0_1", "loan"} <= names
+
+
+def test_imputed_inputs_are_read_first():
+    defined, read_first, names, labels = variable_usage(tokenize(LOGISTIC))
+
+    assert read_first == {"loan"}
+    assert labels == set()
+
+
+def test_multi_renames_labels_without_copying_them(tmp_path):
+    from pysct import DS_translate_multi
+
+    tree = _export(str(tmp_path / "tree.zip"), TREE_GOTO)
+    other_tree = _export(str(tmp_path / "other_tree.zip"), TREE_GOTO)
+    logistic = _export(str(tmp_path / "logistic.zip"), LOGISTIC)
+    out = DS_translate_multi([tree, other_tree, logistic], "public", "hmeq", "casuser", "hmeq_scored",
+                             out_file = str(tmp_path / "multi.py"))
+    with open(out["out_file"], "rt") as f:
+        code = f.read()
+
+    assert "goto M1_skip_0_0;" in code and "M1_skip_0_0: _M1_node_ = 2;" in code
+    assert "goto M2_leaf_0_1;" in code and "M2_leaf_0_1:" in code
+    assert "M1_skip_0_0 = skip_0_0;" not in code
+    assert "M1_I_BAD = I_BAD;" not in code and "M2_P_BAD1 = P_BAD1;" not in code
+    ## model 3 (logistic) imputes LOAN in place, so its LOAN is renamed to M3_LOAN (copied in)
+    ## and the trees read the original, un-imputed LOAN
+    assert "M3_LOAN = LOAN;" in code
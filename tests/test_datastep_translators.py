@@ -0,0 +1,45 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+import pytest
+
+from pysct import datastep_translators
+from pysct.benchmark import synthetic_export
+
+
+class _TrackedZipFile(zipfile.ZipFile):
+    """ Keeps the .zip files opened by the translator, to check they are all closed. """
+
+    opened = []
+
+    def __init__(self, *args, **kwargs):
+        super(_TrackedZipFile, self).__init__(*args, **kwargs)
+        self.opened.append(self)
+
+
+def _translate(tmp_path, out_name, **arguments):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "model.zip")
+    if not (tmp_path / "model.zip").exists():
+        synthetic_export(in_file, "DS_translate", size_mb = 0.2)
+    out = DS_translate(in_file, "public", "hmeq", "casuser", "hmeq_scored",
+                       out_file = str(tmp_path / out_name),
+                       return_code = True,
+                       **arguments)
+    return out["py_code"]
+
+
+def test_stream_writes_the_same_script(tmp_path):
+    assert _translate(tmp_path, "stream.py", stream = True, chunk_size = 4096) == _translate(tmp_path, "read.py")
+
+
+def test_stream_closes_the_export_on_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastep_translators.zipfile, "ZipFile", _TrackedZipFile)
+    _TrackedZipFile.opened = []
+
+    with pytest.raises(Exception, match = "upload_file"):
+        _translate(tmp_path, "stream.py", stream = True, upload_file = "hmeq.txt")
+    assert _TrackedZipFile.opened and all(archives.fp is None for archives in _TrackedZipFile.opened)
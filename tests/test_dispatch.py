@@ -0,0 +1,67 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+import pytest
+
+from pysct import dispatch
+from pysct.benchmark import synthetic_export
+from pysct.dispatch import _REGISTRY, score_code_type, translate
+
+## the VTA translators also need the columns of the documents
+_DOCUMENTS = {"key_column": "id", "document_column": "text"}
+
+
+@pytest.mark.parametrize("translator", sorted(_REGISTRY))
+def test_score_code_type(tmp_path, translator):
+    in_file = synthetic_export(str(tmp_path / "model.zip"), translator, astore_mb = 0.01)
+
+    assert score_code_type(in_file) == translator
+
+
+@pytest.mark.parametrize("translator", sorted(_REGISTRY))
+def test_translate_dispatches_to_the_translator(tmp_path, translator):
+    in_file = synthetic_export(str(tmp_path / "model.zip"), translator, astore_mb = 0.01)
+    arguments = {} if translator in ("DS_translate", "EPS_translate", "nlp_topics_translate") else _DOCUMENTS
+
+    out = translate(in_file, "public", "docs", "casuser", "docs_scored",
+                    out_file = str(tmp_path / "score.py"),
+                    **arguments)
+
+    assert out["translator"] == translator
+    with open(out["out_file"], "rt") as f:
+        assert "docs_scored" in f.read()
+
+
+def test_translator_is_not_read_again_when_given(tmp_path, monkeypatch):
+    in_file = synthetic_export(str(tmp_path / "model.zip"), "DS_translate")
+    monkeypatch.setattr(dispatch, "score_code_type", lambda in_file: pytest.fail("the export was sniffed"))
+
+    out = translate(in_file, "public", "hmeq", "casuser", "hmeq_scored",
+                    translator = "DS_translate",
+                    out_file = str(tmp_path / "score.py"))
+    assert out["translator"] == "DS_translate"
+
+
+def test_statement_cut_between_two_reads(tmp_path):
+    ## the %let of the category binary starts a few bytes before the end of the first chunk read
+    padding = "/*" + "x" * (dispatch._SNIFF_CHUNK - 10) + "*/\n"
+    in_file = str(tmp_path / "category.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("ScoreCode.sas", padding + '%let mco_binary_caslib = "Analytics_Project";\n'
+                                                     "data casuser.out; run;\n")
+
+    assert len(padding) == dispatch._SNIFF_CHUNK - 5
+    assert score_code_type(in_file) == "nlp_category_translate"
+
+
+def test_unknown_export(tmp_path):
+    in_file = str(tmp_path / "unknown.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("readme.txt", "not a score code")
+
+    with pytest.raises(Exception, match = "does not contain a known score code file"):
+        score_code_type(in_file)
+    with pytest.raises(Exception, match = "is not a translator"):
+        translate(in_file, "public", "hmeq", "casuser", "hmeq_scored", translator = "SQL_translate")
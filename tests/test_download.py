@@ -0,0 +1,45 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import pandas
+import pytest
+
+from pysct.benchmark import synthetic_export
+from pysct.mock_cas import MockCAS
+
+
+class _RecordingCAS(MockCAS):
+    """ Keeps the rows asked by the paged fetches of the download. """
+
+    def __init__(self, rows):
+        super(_RecordingCAS, self).__init__(rows = rows)
+        self.pages = []
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if action == "table.fetch" and "maxRows" in parameters:
+            self.pages.append((parameters["from"], parameters["to"]))
+        return super(_RecordingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+@pytest.mark.parametrize("rows, page_rows, fetches", [(90, 25, 4),    ## the last page is not full
+                                                      (100, 25, 5),   ## an empty page ends the download
+                                                      (10, 25, 1),
+                                                      (0, 25, 1)])
+def test_every_row_is_written_once(tmp_path, rows, page_rows, fetches):
+    from pysct import DS_translate
+
+    in_file = synthetic_export(str(tmp_path / "model.zip"), "DS_translate")
+    download_file = tmp_path / "scored.csv"
+    out_file = DS_translate(in_file, "public", "hmeq", "casuser", "hmeq_scored",
+                            out_file = str(tmp_path / "score.py"),
+                            download_file = str(download_file),
+                            download_page_rows = page_rows)["out_file"]
+
+    cas = _RecordingCAS(rows)
+    cas.run(out_file)
+
+    assert cas.pages == [(start + 1, start + page_rows) for start in range(0, fetches * page_rows, page_rows)]
+    if rows:
+        assert pandas.read_csv(download_file)["id"].tolist() == list(range(rows))
+    else:
+        assert not download_file.exists()
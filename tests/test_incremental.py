@@ -0,0 +1,57 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+from pysct.mock_cas import MockCAS
+
+SCORE_CODE = """/* linear model */
+* Host: myviya.example.com;
+* Encoding: utf-8;
+P_VALUE = 2 * LOAN;
+"""
+
+
+class _RecordingCAS(MockCAS):
+    """ Keeps the parameters of the actions called on the tables of new rows. """
+
+    def __init__(self):
+        super(_RecordingCAS, self).__init__()
+        self.new_rows = []
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if str(parameters.get("name", "")).endswith("_pysct_new"):
+            self.new_rows.append((action, parameters))
+        return super(_RecordingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+def _translate(tmp_path, **arguments):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "linear.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", SCORE_CODE)
+    return DS_translate(in_file, "public", "hmeq", "casuser", "hmeq_scored",
+                        out_file = str(tmp_path / "score.py"),
+                        watermark_column = "LOAN_DATE",
+                        **arguments)["out_file"]
+
+
+def test_partitions_see_the_new_rows(tmp_path):
+    cas = _RecordingCAS()
+    cas.run(_translate(tmp_path, partitions = 2, partition_column = "LOAN"))
+
+    views = [parameters for action, parameters in cas.new_rows if action == "table.view"]
+    assert len(views) == 1 and views[0]["promote"] is True
+    ## the promoted view outlives the session, it is dropped once the new rows are scored
+    view = cas.new_rows.index(("table.view", views[0]))
+    assert [parameters["caslib"] for action, parameters in cas.new_rows[view + 1:]
+            if action == "table.dropTable" and parameters["name"] == "hmeq_pysct_new"] == ["casuser"]
+
+
+def test_view_is_local_without_partitions(tmp_path):
+    cas = _RecordingCAS()
+    cas.run(_translate(tmp_path))
+
+    views = [parameters for action, parameters in cas.new_rows if action == "table.view"]
+    assert len(views) == 1 and "promote" not in views[0]
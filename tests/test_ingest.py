@@ -0,0 +1,82 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+from pysct import mock_cas
+from pysct.mock_cas import MockCAS
+
+SCORE_CODE = """/* linear model */
+* Host: myviya.example.com;
+* Encoding: utf-8;
+P_VALUE = 2 * LOAN;
+"""
+
+## LOAN is an integer until a missing value, REASON is missing until a text value
+ROWS = "LOAN,REASON\n1100,\n1300,\n1500,HomeImp\n,DebtCon\n1700,\n"
+
+
+def test_chunks_with_different_types(tmp_path, monkeypatch):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "linear.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", SCORE_CODE)
+    upload_file = tmp_path / "hmeq.csv"
+    upload_file.write_text(ROWS)
+
+    out = DS_translate(in_file, "casuser", "hmeq", "casuser", "hmeq_scored",
+                       out_file = str(tmp_path / "score.py"),
+                       upload_file = str(upload_file),
+                       upload_chunk_rows = 2)
+
+    uploaded = []
+    upload_frame = mock_cas._Connection.upload_frame
+
+    def record(self, frame, casout = None, **kwargs):
+        uploaded.append((len(frame), frame.dtypes.astype(str).to_dict()))
+        return upload_frame(self, frame, casout = casout, **kwargs)
+
+    monkeypatch.setattr(mock_cas._Connection, "upload_frame", record)
+    MockCAS().run(out["out_file"])
+
+    assert [rows for rows, dtypes in uploaded] == [2, 2, 1]
+    ## every chunk has the types of the whole file, text is "object" or "str" depending on pandas
+    assert all(dtypes == uploaded[0][1] for rows, dtypes in uploaded)
+    assert uploaded[0][1]["LOAN"] == "float64" and uploaded[0][1]["REASON"] in ("object", "str")
+
+
+class _RecordingCAS(MockCAS):
+    """ Keeps the DATA step code sent to dataStep.runCode. """
+
+    def __init__(self):
+        super(_RecordingCAS, self).__init__()
+        self.codes = []
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        if action == "dataStep.runCode":
+            self.codes.append(parameters["code"])
+        return super(_RecordingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+def test_text_columns_sized_over_the_whole_file(tmp_path):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "linear.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", SCORE_CODE)
+    upload_file = tmp_path / "hmeq.csv"
+    ## the longest REASON and JOB are in the last chunks, JOB looks numeric in the first one
+    upload_file.write_text("LOAN,REASON,JOB,NOTE\n1100,Home,12,\n1300,,7,\n1500,HomeImp,Office,\n"
+                           ",DebtCon,Mgr,\n1700,Débt consolidation,ProfExe,\n", encoding = "UTF-8")
+
+    out = DS_translate(in_file, "casuser", "hmeq", "casuser", "hmeq_scored",
+                       out_file = str(tmp_path / "score.py"),
+                       upload_file = str(upload_file),
+                       upload_chunk_rows = 2)
+    cas = _RecordingCAS()
+    cas.run(out["out_file"])
+
+    length = " length 'REASON'n $19; length 'JOB'n $7;"
+    assert cas.codes[:3] == ["data casuser.hmeq;{} set casuser.hmeq_pysct_chunk; run;".format(length)] + \
+                            ["data casuser.hmeq(append=yes);{} set casuser.hmeq_pysct_chunk; run;".format(length)] * 2
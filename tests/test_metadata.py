@@ -0,0 +1,48 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from pysct.metadata import macro_variables, macro_variable
+
+
+def test_quoted_and_unquoted_values():
+    macros = macro_variables('%let language = "ENGLISH";\n'
+                             "%let mco_binary_caslib = 'Analytics_Project';\n"
+                             "%let input_astore_name = _4ZQ0G2J5_ast ;\n")
+
+    assert macros == {"language": "ENGLISH",
+                      "mco_binary_caslib": "Analytics_Project",
+                      "input_astore_name": "_4ZQ0G2J5_ast"}
+
+
+def test_quotes_of_the_other_kind_are_kept():
+    macros = macro_variables('''%let a = "it's";\n%let b = 'say "hi"';\n''')
+
+    assert macros == {"a": "it's", "b": 'say "hi"'}
+
+
+def test_names_are_not_case_sensitive():
+    macros = macro_variables('%LET Cas_Server_Hostname = "viya.example.com";\n%Let LANGUAGE = ENGLISH;\n')
+
+    assert macros == {"cas_server_hostname": "viya.example.com", "language": "ENGLISH"}
+    assert macro_variable(macros, "CAS_SERVER_HOSTNAME") == "viya.example.com"
+
+
+def test_last_value_wins():
+    macros = macro_variables('%let language = "ENGLISH";\n'
+                             "data _null_; run;\n"
+                             "%let LANGUAGE = 'FRENCH';\n")
+
+    assert macro_variable(macros, "language") == "FRENCH"
+
+
+def test_other_macro_statements_are_skipped():
+    macros = macro_variables("%put 100% done;\n%include 'x.sas';\n%letter = 1;\n%let kept = 1;\n")
+
+    assert macros == {"kept": "1"}
+
+
+def test_missing_name():
+    with pytest.raises(Exception, match = "%let language was not found in the score code"):
+        macro_variable(macro_variables('%let mco_binary_caslib = "Analytics_Project";'), "language")
@@ -0,0 +1,55 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from pysct.benchmark import synthetic_export
+from pysct.mock_cas import MockCAS
+from pysct.nlp_outputs import _OUTPUTS
+
+## the output table parameters of each VTA action, the document level casOut first
+_PARAMETERS = {translator: [parameter for name, parameter, variable in planned]
+               for translator, planned in _OUTPUTS.items()}
+
+
+class _RecordingCAS(MockCAS):
+    """ Keeps the output table parameters of the action calls. """
+
+    def __init__(self):
+        super(_RecordingCAS, self).__init__()
+        self.out_parameters = set()
+
+    def _action(self, session, action, parameters, upload_bytes = 0, sleep = True):
+        self.out_parameters.update(name for name in parameters if name.endswith("Out"))
+        return super(_RecordingCAS, self)._action(session, action, parameters, upload_bytes, sleep)
+
+
+def _run(tmp_path, translator, **arguments):
+    import pysct
+
+    in_file = synthetic_export(str(tmp_path / "model.zip"), translator, astore_mb = 0.01)
+    out = getattr(pysct, translator)(in_file, "id", "text", "public", "docs", "casuser", "docs_scored",
+                                     out_file = str(tmp_path / "score.py"),
+                                     **arguments)
+    cas = _RecordingCAS()
+    cas.run(out["out_file"])
+    return cas.out_parameters
+
+
+@pytest.mark.parametrize("translator", sorted(_OUTPUTS))
+def test_every_table_by_default(tmp_path, translator):
+    assert _run(tmp_path, translator) == set(_PARAMETERS[translator])
+
+
+@pytest.mark.parametrize("translator", sorted(_OUTPUTS))
+def test_omitted_tables_are_not_requested(tmp_path, translator):
+    assert _run(tmp_path, translator, outputs = []) == {"casOut"}
+
+
+def test_only_the_tables_asked_are_requested(tmp_path):
+    assert _run(tmp_path, "nlp_sentiment_translate", outputs = ["features"]) == {"casOut", "featureOut"}
+
+
+def test_unknown_output(tmp_path):
+    with pytest.raises(Exception, match = "Unknown outputs of nlp_category_translate: facts"):
+        _run(tmp_path, "nlp_category_translate", outputs = ["facts"])
@@ -0,0 +1,37 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from pysct.benchmark import synthetic_export
+from pysct.mock_cas import MockCAS
+
+TRANSLATORS = ["nlp_sentiment_translate", "nlp_category_translate", "nlp_topics_translate"]
+
+
+def _pipeline(tmp_path, **arguments):
+    from pysct import nlp_pipeline_translate
+
+    in_files = [synthetic_export(str(tmp_path / "{}.zip".format(translator)), translator, astore_mb = 0.01)
+                for translator in TRANSLATORS]
+    return nlp_pipeline_translate(in_files, "id", "text", "public", "reports", "casuser", "reports",
+                                  out_file = str(tmp_path / "pipeline.py"),
+                                  **arguments)["out_file"]
+
+
+@pytest.mark.parametrize("connection_pool", [False, True])
+def test_one_session_per_stage(tmp_path, connection_pool):
+    cas = MockCAS()
+    cas.run(_pipeline(tmp_path, connection_pool = connection_pool))
+
+    ## pooled sessions are reused by the stages done first
+    assert cas.sessions == len(TRANSLATORS) or (connection_pool and cas.sessions < len(TRANSLATORS))
+    assert "table.columnInfo" not in [call["action"] for call in cas.calls]
+
+
+def test_columns_read_once_when_unknown(tmp_path):
+    cas = MockCAS()
+    cas.run(_pipeline(tmp_path, copyVars = "ALL"))
+
+    assert cas.sessions == len(TRANSLATORS) + 1
+    assert [call["action"] for call in cas.calls].count("table.columnInfo") == 1
@@ -0,0 +1,127 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import math
+import runpy
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+## logistic regression as exported by SAS Viya: imputation, a class variable and a GOTO past the
+## linear predictor for rows with missing inputs
+LOGISTIC = """/* logistic regression */
+drop _badval_ _linp_ _temp_ _i_;
+_badval_ = 0;
+_linp_ = 0;
+_temp_ = 0;
+_i_ = 0;
+array _xrow_0_0_{4} _temporary_;
+array _beta_0_0_{4} _temporary_ (   -2.5
+   0.4
+   -0.2
+   0.00002);
+if missing(VALUE) then VALUE = 90000;
+if missing(LOAN) then do;
+   _badval_ = 1;
+   goto skip_0_0;
+end;
+length _REASON_ $7; drop _REASON_;
+_REASON_ = left(trim(put(REASON, $7.)));
+do _i_=1 to 4; _xrow_0_0_{_i_} = 0; end;
+_xrow_0_0_[1] = 1;
+_temp_ = 1;
+select (_REASON_);
+   when ('DebtCon') _xrow_0_0_[2] = _temp_;
+   when ('HomeImp') _xrow_0_0_[3] = _temp_;
+   otherwise ;
+end;
+_xrow_0_0_[4] = LOAN;
+do _i_=1 to 4;
+   _linp_ + _xrow_0_0_{_i_} * _beta_0_0_{_i_};
+end;
+_linp_ = _linp_ - 0.00001 * VALUE;
+skip_0_0:
+label P_BAD1 = 'Predicted: BAD=1';
+length I_BAD $ 12;
+if (_badval_ eq 0) and not missing(_linp_) then do;
+   P_BAD1 = 1 / (1+exp(-_linp_));
+   P_BAD0 = 1 - P_BAD1;
+   if P_BAD1 >= 0.5 then I_BAD = '1'; else I_BAD = '0';
+end; else do;
+   P_BAD1 = .;
+   P_BAD0 = .;
+   I_BAD = ' ';
+end;
+"""
+
+LINEAR = """/* linear regression */
+drop _linp_;
+if missing(CLAGE) then CLAGE = 180;
+_linp_ = 1000 + 2.5 * LOAN + 10 * CLAGE;
+if DELINQ > 2 then _linp_ = _linp_ - 500;
+P_VALUE = _linp_;
+"""
+
+FRAME = pd.DataFrame({"LOAN": [1100.0, 25000.0, np.nan, 5000.0],
+                      "VALUE": [39025.0, np.nan, 70000.0, 120000.0],
+                      "REASON": ["HomeImp", "DebtCon", "DebtCon", ""],
+                      "CLAGE": [94.4, np.nan, 150.0, 300.0],
+                      "DELINQ": [0.0, 3.0, np.nan, 1.0]})
+
+
+def _score_function(tmp_path, code, **arguments):
+    from pysct import DS_translate_numpy
+
+    in_file = str(tmp_path / "model.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", code)
+    out = DS_translate_numpy(in_file, out_file = str(tmp_path / "score_numpy.py"), **arguments)
+    return runpy.run_path(out["out_file"])["score"]
+
+
+def _logistic(loan, value, reason):
+    """ The logistic model computed row by row. """
+
+    if loan != loan:
+        return float("nan"), " "
+    if value != value:
+        value = 90000
+    linp = -2.5 + {"DebtCon": 0.4, "HomeImp": -0.2}.get(reason, 0) + 0.00002 * loan - 0.00001 * value
+    probability = 1 / (1 + math.exp(-linp))
+    return probability, "1" if probability >= 0.5 else "0"
+
+
+def test_logistic_matches_the_score_code(tmp_path):
+    scored = _score_function(tmp_path, LOGISTIC)(FRAME)
+
+    expected = [_logistic(*row) for row in FRAME[["LOAN", "VALUE", "REASON"]].itertuples(index = False)]
+    np.testing.assert_allclose(scored["P_BAD1"], [probability for probability, label in expected])
+    np.testing.assert_allclose(scored["P_BAD0"], [1 - probability for probability, label in expected])
+    assert [label.strip() for label in scored["I_BAD"]] == [label.strip() for probability, label in expected]
+
+
+def test_missing_inputs(tmp_path):
+    scored = _score_function(tmp_path, LOGISTIC)(FRAME)
+
+    ## LOAN missing skips the model, VALUE missing is imputed
+    assert math.isnan(scored["P_BAD1"][2]) and scored["I_BAD"][2].strip() == ""
+    assert not math.isnan(scored["P_BAD1"][1])
+
+
+def test_linear_matches_the_score_code(tmp_path):
+    scored = _score_function(tmp_path, LINEAR)(FRAME)
+
+    expected = [1000 + 2.5 * 1100 + 10 * 94.4,
+                1000 + 2.5 * 25000 + 10 * 180 - 500,
+                float("nan"),
+                1000 + 2.5 * 5000 + 10 * 300]
+    np.testing.assert_allclose(scored["P_VALUE"], expected)
+
+
+def test_unsupported_statement(tmp_path):
+    with pytest.raises(Exception, match = "not supported by the NumPy translator"):
+        _score_function(tmp_path, LINEAR + "do while (_linp_ > 0); _linp_ = _linp_ - 1; end;\n")
+    with pytest.raises(Exception, match = "lag"):
+        _score_function(tmp_path, LINEAR + "P_LAG = lag(LOAN);\n")
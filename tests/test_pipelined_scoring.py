@@ -0,0 +1,48 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import zipfile
+
+from pysct import mock_cas
+from pysct.mock_cas import MockCAS
+
+SCORE_CODE = """/* linear model */
+* Host: myviya.example.com;
+* Encoding: utf-8;
+P_VALUE = 2 * LOAN;
+"""
+
+## LOAN is an integer until a missing value, REASON is missing until a text value
+ROWS = "LOAN,REASON\n1100,\n1300,\n1500,HomeImp\n,DebtCon\n1700,\n"
+
+
+def test_chunks_with_different_types(tmp_path, monkeypatch):
+    from pysct import DS_translate
+
+    in_file = str(tmp_path / "linear.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", SCORE_CODE)
+    upload_file = tmp_path / "hmeq.csv"
+    upload_file.write_text(ROWS)
+
+    out = DS_translate(in_file, "casuser", "hmeq", "casuser", "hmeq_scored",
+                       out_file = str(tmp_path / "score.py"),
+                       pipelined = True,
+                       upload_file = str(upload_file),
+                       download_file = str(tmp_path / "hmeq_scored.csv"),
+                       upload_chunk_rows = 2)
+
+    uploaded = []
+    upload_frame = mock_cas._Connection.upload_frame
+
+    def record(self, frame, casout = None, **kwargs):
+        uploaded.append((len(frame), frame.dtypes.astype(str).to_dict()))
+        return upload_frame(self, frame, casout = casout, **kwargs)
+
+    monkeypatch.setattr(mock_cas._Connection, "upload_frame", record)
+    MockCAS().run(out["out_file"])
+
+    assert [rows for rows, dtypes in uploaded] == [2, 2, 1]
+    ## every chunk has the types of the whole file, text is "object" or "str" depending on pandas
+    assert all(dtypes == uploaded[0][1] for rows, dtypes in uploaded)
+    assert uploaded[0][1]["LOAN"] == "float64" and uploaded[0][1]["REASON"] in ("object", "str")
@@ -0,0 +1,103 @@
+# Copyright © 2020, SAS Institute Inc., Cary, NC, USA.  All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import itertools
+import runpy
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+## a decision tree and two boosted trees as exported by SAS Viya: splits sending missing values
+## either way, category subsets and numeric IN lists
+TREES = """/* decision tree */
+length I_BAD $ 12 _ARBFMT_12 $ 7;
+drop _ARBFMT_12 _T1 _T2;
+_ARBFMT_12 = PUT( REASON , $7.);
+IF  NOT MISSING(DEBTINC ) AND DEBTINC  <     45.1 THEN DO;
+  IF _ARBFMT_12 IN ('DebtCon' ) THEN DO;
+    IF MISSING(LOAN) OR LOAN < 5000 THEN DO;
+      _NODE_ = 4; _LEAF_ = 1; P_BAD1 = 0.25; P_BAD0 = 0.75; I_BAD = '0';
+    END;
+    ELSE DO;
+      _NODE_ = 5; _LEAF_ = 2; P_BAD1 = 0.05; P_BAD0 = 0.95; I_BAD = '0';
+    END;
+  END;
+  ELSE IF LOAN >= 20000 THEN DO;
+    _NODE_ = 6; _LEAF_ = 3; P_BAD1 = 0.6; P_BAD0 = 0.4; I_BAD = '1';
+  END;
+  ELSE DO;
+    _NODE_ = 7; _LEAF_ = 4; P_BAD1 = 0.1; P_BAD0 = 0.9; I_BAD = '0';
+  END;
+END;
+ELSE DO;
+  IF DELINQ IN (0, 1) THEN DO;
+    _NODE_ = 8; _LEAF_ = 5; P_BAD1 = 0.4; P_BAD0 = 0.6; I_BAD = '0';
+  END;
+  ELSE DO;
+    _NODE_ = 9; _LEAF_ = 6; P_BAD1 = 0.8; P_BAD0 = 0.2; I_BAD = '1';
+  END;
+END;
+/* boosting: two trees */
+_T1 = 0; _T2 = 0;
+if LOAN <= 10000 then do;
+   if VALUE > 50000 then _T1 = 0.1; else _T1 = -0.1;
+end; else do;
+   if ^missing(CLAGE) and CLAGE < 100 then _T1 = 0.3; else if CLAGE ne 500 then _T1 = -0.3;
+end;
+if JOB = 'Mgr' then _T2 = 0.2;
+else if JOB in ('Office', 'Sales') then do; if YOJ < 3 then _T2 = 0.1; else _T2 = 0.05; end;
+else if YOJ > 10 then _T2 = -0.2;
+EM_P = 1 / (1 + exp(-(_T1 + _T2)));
+"""
+
+VALUES = {"DEBTINC": [30.0, 50.0, np.nan],
+          "REASON": ["DebtCon", "HomeImp", ""],
+          "LOAN": [1000.0, 8000.0, 30000.0, np.nan],
+          "DELINQ": [0.0, 1.0, 2.0, np.nan],
+          "VALUE": [40000.0, 90000.0, np.nan],
+          "CLAGE": [50.0, 500.0, 700.0, np.nan],
+          "JOB": ["Mgr", "Office", "Sales", "Other", ""],
+          "YOJ": [1.0, 5.0, 20.0, np.nan]}
+
+
+def _frame():
+    return pd.DataFrame(list(itertools.product(*VALUES.values())), columns = list(VALUES))
+
+
+def _scored(tmp_path, tree_arrays):
+    from pysct import DS_translate_numpy
+
+    in_file = str(tmp_path / "trees.zip")
+    with zipfile.ZipFile(in_file, "w") as archives:
+        archives.writestr("dmcas_scorecode.sas", TREES)
+    out_file = str(tmp_path / "trees_{}.py".format(tree_arrays))
+    out = DS_translate_numpy(in_file, out_file = out_file, tree_arrays = tree_arrays)
+    return out, runpy.run_path(out_file)["score"](_frame())
+
+
+def test_tree_arrays_match_the_masked_statements(tmp_path):
+    arrays, by_arrays = _scored(tmp_path, True)
+    masked, by_statements = _scored(tmp_path, False)
+
+    assert arrays["trees"] >= 1 and masked["trees"] == 0
+    pd.testing.assert_frame_equal(by_arrays, by_statements)
+
+
+def test_missing_values_and_category_subsets(tmp_path):
+    frame = _frame()
+    out, scored = _scored(tmp_path, True)
+
+    def leaf(**values):
+        rows = np.logical_and.reduce([(frame[name] == value) if value == value else frame[name].isna()
+                                      for name, value in values.items()])
+        return set(scored["_LEAF_"][rows])
+
+    ## DEBTINC missing fails NOT MISSING(DEBTINC), a missing LOAN goes with the small loans
+    assert leaf(DEBTINC = np.nan, DELINQ = 0.0) == {5}
+    assert leaf(DEBTINC = np.nan, DELINQ = np.nan) == {6}
+    assert leaf(DEBTINC = 30.0, REASON = "DebtCon", LOAN = np.nan) == {1}
+    assert leaf(DEBTINC = 30.0, REASON = "DebtCon", LOAN = 8000.0) == {2}
+    ## REASON outside of the subset, missing included, takes the other branch
+    assert leaf(DEBTINC = 30.0, REASON = "", LOAN = 30000.0) == {3}
+    assert leaf(DEBTINC = 30.0, REASON = "HomeImp", LOAN = np.nan) == {4}